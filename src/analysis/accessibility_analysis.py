@@ -0,0 +1,79 @@
+import geopandas as gpd
+import numpy as np
+import argparse
+import os
+import shapely
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.accessibility import distance_to_nearest, walking_minutes
+from utils.graph_store import load_or_build
+from utils.instrumentation import phase
+from utils.isochrones import WALK_SPEED_KMPH, meters_per_minute
+from utils.kde import RasterGrid
+from utils.raster import Raster, write_raster
+from utils.region import boundary_path
+from utils.snapping import snap_layer, snap_points
+from utils.storage import read_layer
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Gehzeit von jeder Rasterzelle zum nächsten POI je Kategorie")
+    parser.add_argument('--cell-size', type=float, default=100, help="Zellgrösse des Rasters in Metern")
+    parser.add_argument('--max-minutes', type=float, default=60,
+                        help="Suche nach so vielen Gehminuten abbrechen (weiter entfernt: NaN)")
+    parser.add_argument('--max-snap', type=float, default=300,
+                        help="Zellen weiter als so viele Meter vom Fusswegnetz erhalten NaN")
+    args = parser.parse_args()
+
+    print("Lade Daten...")
+    zurich_boundary = gpd.read_file(boundary_path())
+    pois = read_layer('categorized_pois', columns=['category', 'element_type', 'osmid'])
+    store = load_or_build()
+    print(f"Fusswegenetz geladen: {store.n_nodes} Knoten, {store.n_edges} Kanten")
+
+    # POIs (Flächen über einen inneren Punkt) an das Netz anbinden
+    poi_nodes, poi_snap = snap_layer(store, pois, 'categorized_pois')
+
+    # Alle Rasterzellen innerhalb der Stadtgrenze auf einmal anbinden
+    boundary = zurich_boundary.to_crs(store.crs)
+    grid = RasterGrid.from_bounds(boundary.total_bounds, args.cell_size)
+    x_centers, y_centers = grid.centers()
+    X, Y = np.meshgrid(x_centers, y_centers)
+    boundary_geom = boundary.union_all()
+    shapely.prepare(boundary_geom)
+    inside = shapely.contains_xy(boundary_geom, X.ravel(), Y.ravel())
+    cell_nodes, cell_snap = snap_points(store, X.ravel()[inside], Y.ravel()[inside])
+    print(f"Raster: {grid.n_cols}x{grid.n_rows} Zellen, {inside.sum()} innerhalb der Stadtgrenze")
+
+    speed = meters_per_minute(WALK_SPEED_KMPH)
+    limit = args.max_minutes * speed
+
+    # Eine Mehrquellen-Suche pro Kategorie (und eine über alle POIs)
+    groups = {'alle': np.ones(len(pois), dtype=bool)}
+    for category in sorted(pois['category'].dropna().unique()):
+        groups[category] = (pois['category'] == category).to_numpy()
+
+    bands = {}
+    for group, mask in groups.items():
+        print(f"Berechne Gehzeiten zu '{group}' ({mask.sum()} POIs)...")
+        with phase(f'multi_source_search:{group}', rows_in=int(mask.sum())) as record:
+            node_distances = distance_to_nearest(store, poi_nodes[mask], poi_snap[mask], limit=limit)
+            record.rows_out = int(np.isfinite(node_distances).sum())
+        minutes = np.full(grid.n_rows * grid.n_cols, np.nan)
+        minutes[inside] = walking_minutes(node_distances, cell_nodes, cell_snap,
+                                          speed, max_snap=args.max_snap)
+        minutes[minutes > args.max_minutes] = np.nan
+        bands[f'minutes_{group}'] = minutes.reshape(grid.shape)
+        print(f"  Median: {np.nanmedian(minutes):.1f} Minuten")
+
+    raster = Raster.from_grid(bands, grid, store.crs,
+                              meta={'speed_kmph': WALK_SPEED_KMPH, 'graph_version': store.version,
+                                    'max_minutes': args.max_minutes, 'unit': 'Minuten'})
+    output_path = write_raster(raster, 'accessibility')
+    print(f"Erreichbarkeitsraster gespeichert unter: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
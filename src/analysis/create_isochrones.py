@@ -1,63 +1,57 @@
-import geopandas as gpd
-import osmnx as ox
-import networkx as nx
-from shapely.geometry import Polygon
+import argparse
 import os
-
-print("Lade Daten...")
-pois = gpd.read_file("data/processed/categorized_pois.geojson")
-boundary = gpd.read_file("data/raw/zurich_boundary.geojson")
-
-# Nur Punktgeometrien verwenden
-pois = pois[pois.geometry.geom_type == "Point"]
-
-# Auswahl: 6 POIs aus verschiedenen Kategorien (zufällig für Vielfalt)
-categories = ["Kultur", "Attraktion", "Unterkunft", "Gastronomie"]
-selected_pois = pois[pois["category"].isin(categories)].sample(n=6, random_state=42)
-
-print("Ausgewählte POIs:")
-print(selected_pois[["category"]])
-
-# 🚶 Fussweg-Netzwerk für Zürich laden
-print("Lade Fusswegenetz...")
-G = ox.graph_from_polygon(boundary.unary_union, network_type="walk")
-
-# Funktion für Isochronen
-def make_iso_polygons(G, center_node, times=[5, 10, 15], speed_kmph=4.5):
-    meters_per_minute = speed_kmph * 1000 / 60
-    time_polys = []
-
-    for minutes in times:
-        cutoff = minutes * meters_per_minute
-        subgraph = nx.ego_graph(G, center_node, radius=cutoff, distance="length")
-        nodes = ox.graph_to_gdfs(subgraph, edges=False)
-        polygon = nodes.unary_union.convex_hull
-        time_polys.append((minutes, polygon))
-
-    return time_polys
-
-# Isochronen berechnen
-isochrones = []
-print("Berechne Isochronen...")
-for idx, poi in selected_pois.iterrows():
-    point = poi.geometry
-    node = ox.distance.nearest_nodes(G, point.x, point.y)
-
-    for minutes, polygon in make_iso_polygons(G, node):
-        isochrones.append({
-            "category": poi["category"],
-            "time": minutes,
-            "geometry": polygon
-        })
-
-# GeoDataFrame erstellen
-gdf_iso = gpd.GeoDataFrame(isochrones)
-gdf_iso.set_crs(G.graph['crs'], inplace=True)
-gdf_iso = gdf_iso.to_crs(epsg=4326)
-
-# Speichern
-output_path = "data/processed/isochrones.geojson"
-os.makedirs("data/processed", exist_ok=True)
-gdf_iso.to_file(output_path, driver="GeoJSON")
-
-print(f"Isochronen gespeichert unter: {output_path}")
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.graph_store import load_or_build
+from utils.instrumentation import phase
+from utils.isochrones import ISOCHRONES_PATH, TRAVEL_TIMES, WALK_SPEED_KMPH, IsochroneService, poi_names
+from utils.snapping import snap_layer
+from utils.storage import read_layer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Isochronen um ausgewählte POIs berechnen")
+    parser.add_argument('--all', action='store_true',
+                        help="Isochronen für alle POIs statt für eine Stichprobe berechnen")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Anzahl Worker-Prozesse (Standard: alle Kerne)")
+    args = parser.parse_args()
+
+    print("Lade Daten...")
+    # Auswahl: 6 POIs aus verschiedenen Kategorien (zufällig für Vielfalt)
+    categories = ["Kultur", "Attraktion", "Unterkunft", "Gastronomie"]
+    pois = read_layer("categorized_pois", columns=["name", "category", "element_type", "osmid"],
+                      filters=[("category", "in", categories)])
+    # Nur Punktgeometrien verwenden
+    pois = pois[pois.geometry.geom_type == "Point"]
+
+    selected_pois = pois if args.all else pois.sample(n=6, random_state=42)
+
+    print(f"Ausgewählte POIs: {len(selected_pois)}")
+    print(selected_pois["category"].value_counts())
+
+    # 🚶 Fussweg-Netzwerk für Zürich laden (einmal aufgebaut, danach aus dem Graphspeicher)
+    print("Lade Fusswegenetz...")
+    store = load_or_build()
+    print(f"Fusswegenetz geladen: {store.n_nodes} Knoten, {store.n_edges} Kanten")
+
+    # Isochronen über den gemeinsamen Dienst: eine Suche pro POI für alle
+    # Zeitbänder, bereits berechnete Knoten kommen aus dem Cache
+    print(f"Berechne Isochronen ({WALK_SPEED_KMPH} km/h, {TRAVEL_TIMES} Minuten)...")
+    nodes, _ = snap_layer(store, selected_pois, "categorized_pois")
+    service = IsochroneService(store)
+    gdf_iso = service.frame(nodes, poi_names(selected_pois), selected_pois["category"],
+                            processes=args.processes)
+
+    # Speichern
+    output_path = ISOCHRONES_PATH
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with phase('write_isochrones', rows_in=len(gdf_iso)):
+        gdf_iso.to_file(output_path, driver="GeoJSON")
+
+    print(f"Isochronen gespeichert unter: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,41 @@
 import geopandas as gpd
-import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
-from scipy.stats import gaussian_kde
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.instrumentation import phase
+from utils.kde import RasterGrid, kde_surfaces
+from utils.raster import Raster, write_raster
+from utils.region import boundary_path
+from utils.storage import read_layer
+
+# Metrisches Koordinatensystem für Raster und Bandbreite
+METRIC_CRS = 2056  # CH1903+ / LV95
+
+parser = argparse.ArgumentParser(description="Hotspot-Analyse mit gebinnter Kernel Density Estimation")
+parser.add_argument('--cell-size', type=float, default=100, help="Zellgrösse des Rasters in Metern")
+parser.add_argument('--bandwidth', type=float, default=None,
+                    help="Bandbreite des Gausskerns in Metern (Standard: Scott-Regel)")
+parser.add_argument('--weight', default=None,
+                    help="Gewichtsspalte aus seasonal_pois, z.B. weight_sommer oder weight_m07")
+parser.add_argument('--geotiff', default=None,
+                    help="Zusätzlich als GeoTIFF speichern (Pfad, benötigt rasterio)")
+args = parser.parse_args()
 
 print("Lade POI-Daten...")
-# Kategorisierte POIs laden
-pois = gpd.read_file('data/processed/categorized_pois.geojson')
+# Kategorisierte POIs laden (bzw. saisonale POIs, wenn gewichtet wird)
+if args.weight:
+    pois = read_layer('seasonal_pois', columns=['category', args.weight])
+    if args.weight not in pois.columns:
+        print(f"Gewichtsspalte '{args.weight}' nicht in den saisonalen POIs vorhanden.")
+        sys.exit(1)
+else:
+    pois = read_layer('categorized_pois', columns=['category'])
 
-print("Lade Stadtgrenze Zürich...")
+print("Lade Stadtgrenze...")
 # Stadtgrenze laden
-zurich_boundary = gpd.read_file('data/raw/zurich_boundary.geojson')
+zurich_boundary = gpd.read_file(boundary_path())
 
 # POIs auf Stadtgrenze beschränken
 print("Filtere POIs innerhalb der Stadtgrenze...")
@@ -26,38 +51,40 @@ if len(pois) < 5:
 
 print(f"Anzahl analysierter POIs: {len(pois)}")
 
-# Umwandlung der Geometrien in Punkte für die KDE-Analyse
-points = np.vstack([pois.geometry.x, pois.geometry.y]).T
-
-# Kernel Density Estimation durchführen
-print("Führe Kernel Density Estimation (KDE) durch...")
-kde = gaussian_kde(points.T)
-
-# Raster für die Visualisierung erstellen
-x_min, y_min, x_max, y_max = pois.total_bounds
-x_grid = np.linspace(x_min, x_max, 100)
-y_grid = np.linspace(y_min, y_max, 100)
-X, Y = np.meshgrid(x_grid, y_grid)
-positions = np.vstack([X.ravel(), Y.ravel()])
-
-# KDE auf dem Raster berechnen
-Z = kde(positions)
-
-# Resultate in ein DataFrame umwandeln für die Speicherung
-kde_results = pd.DataFrame({
-    'x': X.ravel(),
-    'y': Y.ravel(),
-    'density': Z
-})
-
-# In GeoDataFrame umwandeln
-gdf_kde = gpd.GeoDataFrame(
-    kde_results, geometry=gpd.points_from_xy(kde_results.x, kde_results.y),
-    crs=pois.crs
-)
-
-# Ergebnisse speichern
-output_path = 'data/processed/hotspot_analysis.geojson'
-gdf_kde.to_file(output_path, driver='GeoJSON')
+# In LV95 rechnen, damit Zellgrösse und Bandbreite in Metern gelten
+pois = pois.to_crs(METRIC_CRS)
+boundary = zurich_boundary.to_crs(METRIC_CRS)
+grid = RasterGrid.from_bounds(boundary.total_bounds, args.cell_size)
+weights = pois[args.weight].fillna(0).to_numpy() if args.weight else None
+
+# Kernel Density Estimation durchführen (gesamt und je Kategorie)
+print(f"Führe Kernel Density Estimation (KDE) durch ({grid.n_cols}x{grid.n_rows} Zellen)...")
+with phase('kde', rows_in=len(pois)) as record:
+    try:
+        surfaces, bandwidth = kde_surfaces(
+            pois.geometry.x.to_numpy(), pois.geometry.y.to_numpy(), grid,
+            bandwidth=args.bandwidth, weights=weights, groups=pois['category'].astype(object)
+        )
+    except ValueError as e:
+        # z.B. eine Gewichtsspalte, die für alle POIs 0 ist
+        print(f"KDE nicht möglich: {e} (Option --bandwidth in Metern).")
+        sys.exit(1)
+    record.rows_out = len(surfaces) * grid.n_rows * grid.n_cols
+print(f"Bandbreite: {bandwidth:.0f} m")
+
+# Resultate als georeferenziertes Raster speichern (ein Band pro Fläche)
+bands = {'density': surfaces[None]}
+for category, surface in surfaces.items():
+    if category is not None:
+        bands[f'density_{category}'] = surface
+# smooth() normiert jede Fläche auf das Gesamtgewicht: Wahrscheinlichkeitsdichte,
+# deren Integral je Band 1 ergibt (mal Anzahl bzw. Gewicht = POIs pro m²)
+raster = Raster.from_grid(bands, grid, f'EPSG:{METRIC_CRS}',
+                          meta={'bandwidth': bandwidth, 'weight': args.weight,
+                                'unit': 'normierte Dichte pro m² (Integral 1 je Band)'})
+output_path = write_raster(raster, 'hotspot_analysis')
+if args.geotiff:
+    raster.to_geotiff(args.geotiff)
+    print(f"GeoTIFF gespeichert unter: {args.geotiff}")
 
 print(f"Hotspot-Analyse abgeschlossen und gespeichert unter: {output_path}")
@@ -1,83 +1,197 @@
 import geopandas as gpd
 import numpy as np
-from shapely.geometry import Point
 import pandas as pd
-
-print("Identifiziere Gebiete mit touristischem Potenzial...")
-
-# Daten laden
-zurich_boundary = gpd.read_file('data/raw/zurich_boundary.geojson')
-hotspots = gpd.read_file('data/processed/hotspot_analysis.geojson')
-pois = gpd.read_file('data/processed/categorized_pois.geojson')
-
-# Alle Datensätze auf das gleiche CRS bringen
-common_crs = zurich_boundary.crs
-hotspots = hotspots.to_crs(common_crs)
-pois = pois.to_crs(common_crs)
-
-print("Erstelle Grid über Zürich...")
-# Grid über Zürich erstellen
-minx, miny, maxx, maxy = zurich_boundary.total_bounds
-cell_size = 0.005  # Ungefähr 500m bei geografischen Koordinaten
-x_points = np.arange(minx, maxx, cell_size)
-y_points = np.arange(miny, maxy, cell_size)
-
-# Grid-Punkte erstellen
-grid_points = []
-for x in x_points:
-    for y in y_points:
-        point = Point(x, y)
-        if zurich_boundary.contains(point).any():
-            grid_points.append({
-                'geometry': point,
-                'grid_id': f'grid_{len(grid_points)}'
-            })
-
-print(f"Grid mit {len(grid_points)} Punkten erstellt.")
-grid_gdf = gpd.GeoDataFrame(grid_points, crs=common_crs)
-
-# POI-Dichte pro Grid-Zelle berechnen
-print("Berechne POI-Dichte...")
-def count_pois_in_buffer(point, poi_gdf, buffer_distance=0.005):
-    buffer = point.buffer(buffer_distance)
-    return len(poi_gdf[poi_gdf.intersects(buffer)])
-
-grid_gdf['poi_count'] = grid_gdf.geometry.apply(
-    lambda x: count_pois_in_buffer(x, pois)
-)
-
-# Hotspot-Wert für jede Grid-Zelle berechnen
-print("Berechne Hotspot-Werte...")
-def get_hotspot_value(point, hotspot_gdf, buffer_distance=0.005):
-    buffer = point.buffer(buffer_distance)
-    nearby_hotspots = hotspot_gdf[hotspot_gdf.intersects(buffer)]
-    if len(nearby_hotspots) > 0:
-        return nearby_hotspots.density.mean()
-    return 0
-
-grid_gdf['hotspot_value'] = grid_gdf.geometry.apply(
-    lambda x: get_hotspot_value(x, hotspots)
-)
-
-# Potenzialwert berechnen
-print("Berechne Potenzialwerte...")
-# Gebiete mit wenigen POIs aber in der Nähe von Hotspots haben hohes Potenzial
-if grid_gdf['poi_count'].max() > 0 and grid_gdf['hotspot_value'].max() > 0:
-    grid_gdf['potential'] = (1 - grid_gdf['poi_count'] / grid_gdf['poi_count'].max()) * \
-                           (grid_gdf['hotspot_value'] / grid_gdf['hotspot_value'].max())
-else:
-    grid_gdf['potential'] = 0
-
-# Null-Werte ersetzen
-grid_gdf['potential'] = grid_gdf['potential'].fillna(0)
-
-# Top-Potenzialgebiete identifizieren (oberste 10%)
-potential_threshold = grid_gdf['potential'].quantile(0.9)
-high_potential_areas = grid_gdf[grid_gdf['potential'] >= potential_threshold]
-
-print(f"{len(high_potential_areas)} Gebiete mit hohem Potenzial identifiziert.")
-
-# Ergebnisse speichern
-high_potential_areas.to_file('data/processed/high_potential_areas.geojson', driver='GeoJSON')
-
-print("Potenzialanalyse abgeschlossen und gespeichert unter 'data/processed/high_potential_areas.geojson'")
\ No newline at end of file
+import shapely
+import argparse
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.instrumentation import phase
+from utils.potential import grid_points, poi_counts, potential_scores
+from utils.raster import raster_paths, read_raster
+from utils.region import boundary_path, current_region
+from utils.storage import LayerWriter, read_layer, write_layer
+from utils.tiled_potential import (CHUNK_SIZE, PARTS_DIR, TILED_MIN_CELLS, grid_shape,
+                                   high_potential_cells, score_tiled)
+
+# Metrisches Koordinatensystem für Grid und Distanzen
+METRIC_CRS = 2056  # CH1903+ / LV95
+
+
+def select_access(args):
+    """
+    Erreichbarkeit: Gehzeit im Fusswegnetz zum nächsten POI der gewählten
+    Kategorie. Liefert (Bandname, Raster) oder (None, None), wenn das
+    Kriterium abgeschaltet ist oder Daten fehlen.
+    """
+    if args.access_category == 'keine':
+        return None, None
+    if not os.path.exists(raster_paths('accessibility')[1]):
+        print("Kein Erreichbarkeitsraster gefunden (accessibility_analysis.py), "
+              "Kriterium wird nicht verwendet.")
+        return None, None
+    access_band = f'minutes_{args.access_category}'
+    accessibility = read_raster('accessibility')
+    if access_band not in accessibility.bands:
+        print(f"Kategorie '{args.access_category}' fehlt im Erreichbarkeitsraster, "
+              f"Kriterium wird nicht verwendet.")
+        return None, None
+    return access_band, accessibility
+
+
+def score_partitioned(args, boundary, pois, access_band, output_crs):
+    """
+    Gekachelte Bewertung (utils.tiled_potential): Kacheln parallel bewerten,
+    Schwelle aus der Quantilskizze, Top-Zellen Teil für Teil in den Layer schreiben
+    """
+    n_x, n_y = grid_shape(boundary.bounds, args.cell_size)
+    print(f"Bewerte Grid über {current_region()['name']} gekachelt "
+          f"({n_x} x {n_y} Zellen, Kacheln à {args.chunk_size:.0f} m)...")
+    # Flächen-POIs zählen über ihren repräsentativen Punkt
+    geometry = pois.geometry
+    points = geometry.where(geometry.geom_type == 'Point', geometry.representative_point())
+    poi_xy = shapely.get_coordinates(points.values)
+    threshold, parts = score_tiled(boundary, poi_xy, args.cell_size, args.buffer,
+                                   access_band=access_band,
+                                   access_minutes=args.access_minutes,
+                                   chunk_size=args.chunk_size, processes=args.processes)
+    print(f"Schwelle für die obersten 10%: {threshold:.4f}")
+
+    # Ergebnisse im Koordinatensystem der Stadtgrenze speichern
+    with LayerWriter('high_potential_areas') as writer:
+        for cells in high_potential_cells(parts, threshold, METRIC_CRS):
+            writer.write(cells.to_crs(output_crs))
+    if writer.rows == 0:
+        write_layer(gpd.GeoDataFrame({'grid_id': [], 'poi_count': [], 'hotspot_value': [],
+                                      'potential': []}, geometry=[], crs=output_crs),
+                    'high_potential_areas')
+    shutil.rmtree(PARTS_DIR, ignore_errors=True)
+    return writer.path, writer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gebiete mit touristischem Potenzial identifizieren")
+    parser.add_argument('--cell-size', type=float, default=500, help="Zellgrösse des Grids in Metern")
+    parser.add_argument('--buffer', type=float, default=500, help="Suchradius um jede Zelle in Metern")
+    parser.add_argument('--access-category', default='Attraktion',
+                        help="Kategorie, deren Gehzeit (accessibility-Raster) das Potenzial gewichtet; "
+                             "'keine' schaltet das Kriterium ab")
+    parser.add_argument('--access-minutes', type=float, default=15,
+                        help="Ab so vielen Gehminuten zur Kategorie ist das Potenzial 0")
+    parser.add_argument('--backend', choices=['geopandas', 'postgis'], default='geopandas',
+                        help="postgis: Berechnung in der Datenbank (Tabellen aus import_to_postgis.py)")
+    parser.add_argument('--tiled', action='store_true',
+                        help="Grid in Kacheln bewerten (automatisch ab "
+                             f"{TILED_MIN_CELLS} Zellen in der Bounding Box)")
+    parser.add_argument('--chunk-size', type=float, default=CHUNK_SIZE,
+                        help="Kantenlänge einer Kachel in Metern")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Anzahl Worker-Prozesse im gekachelten Modus")
+    args = parser.parse_args()
+
+    print("Identifiziere Gebiete mit touristischem Potenzial...")
+
+    if args.backend == 'postgis':
+        from utils.db_analysis import potential_areas
+        from utils.postgis import connect
+
+        if args.tiled:
+            parser.error("--tiled gilt nur für das Backend geopandas; "
+                         "in PostGIS rechnet die Datenbank mengenbasiert")
+        # Gleiches Erreichbarkeitskriterium, gelesen aus der importierten Tabelle 'accessibility'
+        access_band, accessibility = select_access(args)
+
+        # Grid, Zählung und Bewertung laufen als SQL, zurück kommen nur die Top-Zellen
+        print("Berechne Potenzialwerte in PostGIS...")
+        conn = connect()
+        try:
+            high_potential_areas = potential_areas(
+                conn, cell_size=args.cell_size, buffer=args.buffer, access_band=access_band,
+                access_minutes=args.access_minutes,
+                access_cell_size=accessibility.cell_size if access_band else None)
+        finally:
+            conn.close()
+        print(f"{len(high_potential_areas)} Gebiete mit hohem Potenzial identifiziert.")
+        output_path = write_layer(high_potential_areas, 'high_potential_areas')
+        print(f"Potenzialanalyse abgeschlossen und gespeichert unter '{output_path}'")
+        return
+
+    # Daten laden
+    zurich_boundary = gpd.read_file(boundary_path())
+    hotspots = read_raster('hotspot_analysis')
+    pois = read_layer('categorized_pois', columns=['geometry'])
+
+    # Alle Datensätze in LV95 bringen, damit Zellgrösse und Radius in Metern gelten
+    output_crs = zurich_boundary.crs
+    boundary = zurich_boundary.to_crs(METRIC_CRS).union_all()
+    pois = pois.to_crs(METRIC_CRS)
+    if hotspots.crs != f'EPSG:{METRIC_CRS}':
+        print(f"Hotspot-Raster muss in EPSG:{METRIC_CRS} vorliegen, nicht {hotspots.crs}.")
+        sys.exit(1)
+
+    access_band, accessibility = select_access(args)
+    use_access = access_band is not None
+
+    n_x, n_y = grid_shape(boundary.bounds, args.cell_size)
+    if args.tiled or n_x * n_y > TILED_MIN_CELLS:
+        output_path, n_high = score_partitioned(args, boundary, pois, access_band, output_crs)
+        print(f"{n_high} Gebiete mit hohem Potenzial identifiziert.")
+        print(f"Potenzialanalyse abgeschlossen und gespeichert unter '{output_path}'")
+        return
+
+    print(f"Erstelle Grid über {current_region()['name']}...")
+    # Grid vektorisiert erzeugen und an der (vorbereiteten) Stadtgrenze zuschneiden
+    with phase('grid') as record:
+        grid_x, grid_y = grid_points(boundary, args.cell_size)
+        record.rows_out = len(grid_x)
+    grid_gdf = gpd.GeoDataFrame(
+        {'grid_id': 'grid_' + pd.RangeIndex(len(grid_x)).astype(str)},
+        geometry=gpd.points_from_xy(grid_x, grid_y),
+        crs=METRIC_CRS
+    )
+    print(f"Grid mit {len(grid_gdf)} Punkten erstellt ({args.cell_size:.0f} m Zellgrösse).")
+
+    # POI-Dichte pro Grid-Zelle berechnen
+    print("Berechne POI-Dichte...")
+    with phase('poi_density', rows_in=len(pois)) as record:
+        grid_gdf['poi_count'] = poi_counts(grid_gdf.geometry.values, pois.geometry.values, args.buffer)
+        record.rows_out = len(grid_gdf)
+
+    # Hotspot-Wert für jede Grid-Zelle berechnen (Mittel der Dichte im Umkreis):
+    # gleitendes Mittel über das Hotspot-Raster, gelesen an den Grid-Punkten
+    print("Berechne Hotspot-Werte...")
+    with phase('hotspot_values', rows_in=len(grid_gdf)):
+        focal_density = hotspots.focal_mean(args.buffer)
+        grid_gdf['hotspot_value'] = hotspots.sample(grid_gdf.geometry.x, grid_gdf.geometry.y,
+                                                    values=focal_density)
+
+    if use_access:
+        print(f"Berechne Gehzeiten zu '{args.access_category}'...")
+        grid_gdf['walk_minutes'] = accessibility.sample(grid_gdf.geometry.x, grid_gdf.geometry.y,
+                                                        band=access_band, fill=np.nan)
+        grid_gdf['access'] = (1 - grid_gdf['walk_minutes'] / args.access_minutes).clip(0, 1).fillna(0)
+
+    # Potenzialwert berechnen
+    print("Berechne Potenzialwerte...")
+    # Gebiete mit wenigen POIs aber in der Nähe von Hotspots haben hohes Potenzial;
+    # Zellen, die zu Fuss weit von der gewählten Kategorie entfernt sind, verlieren Potenzial
+    with phase('scoring', rows_in=len(grid_gdf)) as record:
+        grid_gdf['potential'] = potential_scores(grid_gdf['poi_count'], grid_gdf['hotspot_value'],
+                                                 grid_gdf['access'] if use_access else None)
+
+        # Top-Potenzialgebiete identifizieren (oberste 10%)
+        potential_threshold = grid_gdf['potential'].quantile(0.9)
+        high_potential_areas = grid_gdf[grid_gdf['potential'] >= potential_threshold]
+        record.rows_out = len(high_potential_areas)
+
+    print(f"{len(high_potential_areas)} Gebiete mit hohem Potenzial identifiziert.")
+
+    # Ergebnisse im Koordinatensystem der Stadtgrenze speichern
+    output_path = write_layer(high_potential_areas.to_crs(output_crs), 'high_potential_areas')
+
+    print(f"Potenzialanalyse abgeschlossen und gespeichert unter '{output_path}'")
+
+if __name__ == "__main__":
+    main()
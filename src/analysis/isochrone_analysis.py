@@ -1,92 +1,70 @@
-import osmnx as ox
-import geopandas as gpd
-import networkx as nx
 import pandas as pd
-from shapely.geometry import Point, Polygon
+import argparse
+import os
+import sys
 
-# Straßennetzwerk und POIs laden
-print("Straßennetzwerk für Zürich laden...")
-G = ox.graph_from_place('Zürich, Switzerland', network_type='walk')
-pois = gpd.read_file('data/processed/categorized_pois.geojson')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.graph_store import load_or_build
+from utils.instrumentation import phase
+from utils.isochrones import ISOCHRONES_PATH, IsochroneService, poi_names
+from utils.snapping import snap_layer
+from utils.storage import read_layer
 
-# Verfügbare Kategorien ausgeben
-print("\nVerfügbare Kategorien in den POI-Daten:")
-categories = pois['category'].unique()
-for i, cat in enumerate(categories):
-    print(f"{i+1}. {cat}")
 
-# Top-POIs auswählen, unabhängig von der Kategorie, wenn keine 'Attraktion' vorhanden ist
-if 'Attraktion' in categories:
-    print("\nWähle Top-Attraktionen aus...")
-    top_attractions = pois[pois['category'] == 'Attraktion'].head(5)
-else:
-    print("\nKeine 'Attraktion'-Kategorie gefunden. Wähle Top-POIs aus jeder Kategorie...")
-    # Nehme die ersten POIs aus jeder Kategorie
-    top_attractions = pd.concat([pois[pois['category'] == cat].head(1) for cat in categories])
+def main():
+    parser = argparse.ArgumentParser(description="Isochronen um Top-Attraktionen berechnen")
+    parser.add_argument('--all', action='store_true',
+                        help="Isochronen für alle POIs statt nur für die Top-POIs berechnen")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Anzahl Worker-Prozesse (Standard: alle Kerne)")
+    args = parser.parse_args()
 
-print(f"Anzahl ausgewählter POIs für Isochrone: {len(top_attractions)}")
+    # Straßennetzwerk und POIs laden
+    print("Straßennetzwerk laden...")
+    store = load_or_build()
+    pois = read_layer('categorized_pois', columns=['name', 'category', 'element_type', 'osmid'])
 
-# Funktion zur Erstellung von Isochronen
-def create_isochrones(G, point, travel_times=[5, 10, 15]): # Zeit in Minuten
-    # Nächsten Knoten zum POI finden
-    nearest_node = ox.distance.nearest_nodes(G, point.x, point.y)
-    
-    # Erreichbare Knoten in den angegebenen Zeitintervallen finden
-    isochrones = []
-    for time in travel_times:
-        # Zeit in Sekunden umrechnen (Gehgeschwindigkeit ~1.4 m/s)
-        max_dist = time * 60 * 1.4
-        
-        # Erreichbare Knoten finden
-        subgraph = nx.ego_graph(G, nearest_node, radius=max_dist, distance='length')
-        node_points = [Point(data['x'], data['y']) for node, data in subgraph.nodes(data=True)]
-        
-        if len(node_points) > 3: # Mindestens 3 Punkte für ein Polygon
-            # Konvexe Hülle bilden (vereinfachte Methode)
-            try:
-                convex_hull = gpd.GeoSeries(node_points).unary_union.convex_hull
-                isochrones.append({
-                    'geometry': convex_hull,
-                    'time': time
-                })
-            except Exception as e:
-                print(f"Fehler beim Erstellen der Konvexen Hülle: {e}")
-    
-    return gpd.GeoDataFrame(isochrones, crs=G.graph['crs']) if isochrones else None
+    # Verfügbare Kategorien ausgeben
+    print("\nVerfügbare Kategorien in den POI-Daten:")
+    categories = pois['category'].unique()
+    for i, cat in enumerate(categories):
+        print(f"{i+1}. {cat}")
 
-# Prüfen, ob POIs Point-Geometrie haben oder umgewandelt werden müssen
-def ensure_point_geometry(geom):
-    if geom.geom_type == 'Point':
-        return geom
+    # Top-POIs auswählen, unabhängig von der Kategorie, wenn keine 'Attraktion' vorhanden ist
+    if args.all:
+        print("\nWähle alle POIs aus...")
+        top_attractions = pois
+    elif 'Attraktion' in categories:
+        print("\nWähle Top-Attraktionen aus...")
+        top_attractions = pois[pois['category'] == 'Attraktion'].head(5)
     else:
-        return geom.representative_point()
+        print("\nKeine 'Attraktion'-Kategorie gefunden. Wähle Top-POIs aus jeder Kategorie...")
+        # Nehme die ersten POIs aus jeder Kategorie
+        top_attractions = pd.concat([pois[pois['category'] == cat].head(1) for cat in categories])
 
-# Sicherstellen, dass alle POIs Point-Geometrien haben
-top_attractions.geometry = top_attractions.geometry.apply(ensure_point_geometry)
+    print(f"Anzahl ausgewählter POIs für Isochrone: {len(top_attractions)}")
 
-# Isochronen für jede Top-Attraktion erstellen
-if len(top_attractions) > 0:
+    if len(top_attractions) == 0:
+        print("Keine POIs für die Isochron-Analyse gefunden.")
+        return
+
+    # Isochronen für jede Top-Attraktion über den gemeinsamen Dienst (gleiche
+    # Geschwindigkeit und Zeitbänder wie create_isochrones.py, mit Cache)
+    # (Flächen-POIs werden über einen inneren Punkt ans Netz angebunden)
     print("Isochronen erstellen...")
-    all_isochrones = []
-    for idx, attraction in top_attractions.iterrows():
-        poi_name = attraction.get('name', str(idx))
-        print(f"Bearbeite POI: {poi_name} ({idx})...")
-        poi_point = attraction.geometry
-        try:
-            isochrones = create_isochrones(G, poi_point)
-            if isochrones is not None:
-                isochrones['poi_name'] = poi_name
-                all_isochrones.append(isochrones)
-        except Exception as e:
-            print(f"Fehler bei der Isochron-Erstellung für {poi_name}: {e}")
+    nodes, _ = snap_layer(store, top_attractions, 'categorized_pois')
+    service = IsochroneService(store)
+    combined_isochrones = service.frame(nodes, poi_names(top_attractions),
+                                        top_attractions['category'], processes=args.processes)
 
     # Alle Isochronen zusammenführen
-    if all_isochrones:
+    if len(combined_isochrones) > 0:
         print("Speichere Isochronen...")
-        combined_isochrones = pd.concat(all_isochrones)
-        combined_isochrones.to_file('data/processed/isochrones.geojson', driver='GeoJSON')
+        with phase('write_isochrones', rows_in=len(combined_isochrones)):
+            combined_isochrones.to_file(ISOCHRONES_PATH, driver='GeoJSON')
         print(f"Isochron-Analyse abgeschlossen. {len(combined_isochrones)} Isochronen erstellt.")
     else:
         print("Keine Isochronen erstellt. Überprüfen Sie die POI-Daten und das Netzwerk.")
-else:
-    print("Keine POIs für die Isochron-Analyse gefunden.")
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
-import geopandas as gpd
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.instrumentation import phase
+from utils.seasonal import load_monthly_profile, anchor_weights, monthly_weights, season_weights
+from utils.storage import read_layer, write_layer
 
 print("Lade kategorisierte POIs...")
-pois = gpd.read_file('data/processed/categorized_pois.geojson')
+pois = read_layer('categorized_pois', columns=['name', 'category', 'tourism', 'leisure', 'amenity'])
 
 # Gewichtungsregeln
-season_weights = {
+season_weights_by_category = {
     'Kultur':       {'sommer': 0.4, 'winter': 0.9},
     'Unterkunft':   {'sommer': 0.5, 'winter': 0.5},
     'Gastronomie':  {'sommer': 0.6, 'winter': 0.6},
@@ -12,38 +18,36 @@ season_weights = {
     'Attraktion':   {'sommer': 0.6, 'winter': 0.6},
     'Sonstiges':    {'sommer': 0.3, 'winter': 0.3}
 }
+default_weights = {'sommer': 0.4, 'winter': 0.4}
 
-# Optional: Spezielle Tags berücksichtigen
+# Weitere Differenzierung je nach Tags (erste zutreffende Regel gewinnt)
 # Beispiel: Parks → Sommerwert höher
-for idx, row in pois.iterrows():
-    sommer = 0.5
-    winter = 0.5
-
-    cat = row.get("category", "Sonstiges")
-    w = season_weights.get(cat, {'sommer': 0.4, 'winter': 0.4})
-    sommer = w['sommer']
-    winter = w['winter']
-
-    # Weitere Differenzierung je nach Tags
-    tourism = row.get("tourism", "")
-    leisure = row.get("leisure", "")
-    amenity = row.get("amenity", "")
-
-    if leisure in ["park", "garden"]:
-        sommer = 1.0
-        winter = 0.2
-    elif tourism in ["viewpoint"]:
-        sommer = 0.8
-        winter = 0.1
-    elif amenity in ["theatre", "cinema", "nightclub"]:
-        sommer = 0.3
-        winter = 0.9
-
-    pois.at[idx, 'weight_sommer'] = round(sommer, 2)
-    pois.at[idx, 'weight_winter'] = round(winter, 2)
+tag_overrides = [
+    ('leisure', ['park', 'garden'], {'sommer': 1.0, 'winter': 0.2}),
+    ('tourism', ['viewpoint'], {'sommer': 0.8, 'winter': 0.1}),
+    ('amenity', ['theatre', 'cinema', 'nightclub'], {'sommer': 0.3, 'winter': 0.9}),
+]
+
+# Zusätzliche Saisons als Monatslisten (sommer/winter bleiben die Ankerwerte)
+extra_seasons = {
+    'fruehling': [3, 4, 5],
+    'herbst': [9, 10, 11],
+}
+
+print("Lade monatliches Saisonprofil...")
+profile = load_monthly_profile('data/raw/seasonal_distribution.csv')
+
+print("Berechne saisonale Gewichte...")
+with phase('seasonal_weights', rows_in=len(pois)) as record:
+    anchors = anchor_weights(pois, season_weights_by_category, tag_overrides, default_weights)
+    monthly = monthly_weights(anchors, profile)
+    record.rows_out = len(monthly)
+
+pois['weight_sommer'] = anchors['sommer'].round(2)
+pois['weight_winter'] = anchors['winter'].round(2)
+pois = pois.join(monthly).join(season_weights(monthly, extra_seasons))
 
 # Speichern
-output_path = 'data/processed/seasonal_pois.geojson'
-pois.to_file(output_path, driver='GeoJSON')
+output_path = write_layer(pois, 'seasonal_pois')
 
 print(f"Saisonale POI-Daten gespeichert unter: {output_path}")
@@ -0,0 +1,385 @@
+"""
+Benchmarks der Pipeline-Stufen auf synthetischen Daten
+
+Für jede Grösse (Anzahl POIs) werden synthetische POIs, eine Gemeindegrenze
+und ein Strassengraph erzeugt (utils.synthetic) und die Kernfunktionen der
+Stufen gemessen: Kategorisierung, saisonale Gewichtung, KDE,
+Grid-Bewertung, Isochronen und Kartenaufbau (interaktive Folium-Karte mit
+FastMarkerCluster sowie Vector Tiles). Die Zeit ist das
+Minimum über --repeat Läufe ohne Tracing. Speicher wird in zusätzlichen
+Läufen gemessen, damit die Messung die Zeiten nicht verfälscht:
+    peak_mb        Spitze der von tracemalloc verfolgten Allokationen (Python
+                   und NumPy; ohne GEOS/shapely, scipy.sparse und folium)
+    rss_growth_mb  Zuwachs des RSS-Höchststands während der Stufe, gemessen
+                   in einem geforkten Kindprozess (erfasst auch C-Speicher)
+    peak_rss_mb    RSS-Höchststand des Kindprozesses samt Eingaben
+Ohne fork (Windows) fehlen die RSS-Werte. Überschreitet eine Stufe --max-seconds, werden grössere
+Stufen-Grössen übersprungen.
+
+Ergebnisse landen als JSON unter results/benchmarks/<commit>.json; mit
+--compare werden sie mit einem früheren Lauf verglichen (Exit-Code 1 bei
+Verschlechterungen über --threshold).
+
+Aufruf (aus dem Projektverzeichnis):
+    python src/benchmarks/run_benchmarks.py --sizes 1000 10000 100000
+    python src/benchmarks/run_benchmarks.py --stages kde grid_scoring --compare results/benchmarks/<alt>.json
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils import synthetic
+from utils.categorization import categorize, load_rules
+from utils.graph_store import STORE_CRS
+from utils.instrumentation import max_rss_mb
+from utils.isochrones import (MIN_HULL_NODES, TRAVEL_TIMES, WALK_SPEED_KMPH, cutoffs_in_meters,
+                              isochrones_for_sources, meters_per_minute)
+from utils.kde import RasterGrid, kde_surfaces
+from utils.potential import grid_points, poi_counts, potential_scores
+from utils.raster import Raster
+from utils.seasonal import anchor_weights, monthly_weights, season_weights
+from utils.tiles import tiles_for_bounds
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                          'data_processing', 'category_rules.csv')
+RESULTS_DIR = 'results/benchmarks'
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Gewichte wie in seasonal_analysis.py
+SEASON_WEIGHTS = {
+    'Kultur':       {'sommer': 0.4, 'winter': 0.9},
+    'Unterkunft':   {'sommer': 0.5, 'winter': 0.5},
+    'Gastronomie':  {'sommer': 0.6, 'winter': 0.6},
+    'Shopping':     {'sommer': 0.7, 'winter': 0.7},
+    'Attraktion':   {'sommer': 0.6, 'winter': 0.6},
+    'Sonstiges':    {'sommer': 0.3, 'winter': 0.3},
+}
+DEFAULT_WEIGHTS = {'sommer': 0.4, 'winter': 0.4}
+TAG_OVERRIDES = [
+    ('leisure', ['park', 'garden'], {'sommer': 1.0, 'winter': 0.2}),
+    ('tourism', ['viewpoint'], {'sommer': 0.8, 'winter': 0.1}),
+    ('amenity', ['theatre', 'cinema', 'nightclub'], {'sommer': 0.3, 'winter': 0.9}),
+]
+EXTRA_SEASONS = {'fruehling': [3, 4, 5], 'herbst': [9, 10, 11]}
+
+
+class Workload:
+    """Synthetische Eingaben einer Grösse; teure Teile werden erst bei Bedarf erzeugt"""
+
+    def __init__(self, size, seed):
+        self.size = size
+        self.seed = seed
+        self.bounds = synthetic.region_bounds(size)
+        self.boundary = synthetic.region_boundary(self.bounds)
+        self.pois = synthetic.synthetic_pois(size, self.bounds, seed=seed)
+        self.pois['category'] = categorize(self.pois, load_rules(RULES_PATH))
+        self._graph = None
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = synthetic.synthetic_graph(self.size, self.bounds, seed=self.seed)
+        return self._graph
+
+
+# Jede Stufe bereitet ihre Eingaben vor (nicht gemessen) und liefert eine
+# Funktion ohne Argumente, die gemessen wird und die Anzahl Ergebniszeilen liefert
+
+def stage_categorize(work, args):
+    rules = load_rules(RULES_PATH)
+    return lambda: len(categorize(work.pois, rules))
+
+
+def stage_seasonal(work, args):
+    profile = synthetic.synthetic_profile()
+
+    def run():
+        anchors = anchor_weights(work.pois, SEASON_WEIGHTS, TAG_OVERRIDES, DEFAULT_WEIGHTS)
+        monthly = monthly_weights(anchors, profile)
+        return len(monthly.join(season_weights(monthly, EXTRA_SEASONS)))
+    return run
+
+
+def stage_kde(work, args):
+    grid = RasterGrid.from_bounds(work.bounds, args.kde_cell_size)
+    x, y = work.pois.geometry.x.to_numpy(), work.pois.geometry.y.to_numpy()
+
+    def run():
+        surfaces, _ = kde_surfaces(x, y, grid, groups=work.pois['category'])
+        return len(surfaces) * grid.n_rows * grid.n_cols
+    return run
+
+
+def stage_grid_scoring(work, args):
+    grid = RasterGrid.from_bounds(work.bounds, args.kde_cell_size)
+    x, y = work.pois.geometry.x.to_numpy(), work.pois.geometry.y.to_numpy()
+    surfaces, _ = kde_surfaces(x, y, grid)
+    hotspots = Raster.from_grid({'density': surfaces[None]}, grid, STORE_CRS)
+    poi_geoms = work.pois.geometry.values
+
+    def run():
+        grid_x, grid_y = grid_points(work.boundary, args.cell_size)
+        counts = poi_counts(shapely.points(grid_x, grid_y), poi_geoms, args.buffer)
+        hotspot_value = hotspots.sample(grid_x, grid_y, values=hotspots.focal_mean(args.buffer))
+        potential = potential_scores(counts, hotspot_value)
+        return int((potential >= np.quantile(potential, 0.9)).sum()) if len(potential) else 0
+    return run
+
+
+def stage_isochrones(work, args):
+    store = work.graph
+    rng = np.random.default_rng(work.seed)
+    sources = rng.choice(store.n_nodes, size=min(args.sources, store.n_nodes), replace=False)
+    cutoffs = cutoffs_in_meters(TRAVEL_TIMES, meters_per_minute(WALK_SPEED_KMPH))
+    store.matrix()
+
+    def run():
+        results = isochrones_for_sources(store, sources, cutoffs, min_nodes=MIN_HULL_NODES,
+                                         processes=1)
+        return sum(len(polygons) for polygons in results)
+    return run
+
+
+def stage_interactive_map(work, args):
+    # Wie create_interactive_map.py: Cluster-Layer pro Kategorie und Heatmap, als HTML gerendert
+    import folium
+    from folium import plugins
+    from utils.interactive_map import add_category_clusters, marker_rows
+
+    points = work.pois[['name', 'category', 'geometry']].to_crs(epsg=4326)
+    points = points.assign(name=points['name'].fillna('POI'))
+    center = [points.geometry.y.mean(), points.geometry.x.mean()]
+
+    def run():
+        m = folium.Map(location=center, zoom_start=13, tiles='CartoDB positron')
+        add_category_clusters(m, points)
+        plugins.HeatMap(marker_rows(points), radius=25, blur=15, max_zoom=14).add_to(m)
+        folium.LayerControl(collapsed=False).add_to(m)
+        m.get_root().render()
+        return len(points)
+    return run
+
+
+def stage_map_tiles(work, args):
+    # Erst hier importieren: mapbox_vector_tile wird nur für diese Stufe gebraucht
+    from utils.vector_tiles import MERCATOR_CRS, prepare_layer, render_tile, use_layers
+
+    pois = work.pois[['name', 'category', 'geometry']]
+    bounds = pois.to_crs(MERCATOR_CRS).total_bounds
+    tiles = [tile for z in args.tile_zooms for tile in tiles_for_bounds(bounds, z)]
+
+    def run():
+        use_layers({'pois': prepare_layer(pois, ['name', 'category'])})
+        return sum(render_tile(tile)[1] is not None for tile in tiles)
+    return run
+
+
+STAGES = {
+    'categorize': stage_categorize,
+    'seasonal': stage_seasonal,
+    'kde': stage_kde,
+    'grid_scoring': stage_grid_scoring,
+    'isochrones': stage_isochrones,
+    'interactive_map': stage_interactive_map,
+    'map_tiles': stage_map_tiles,
+}
+
+
+def measure_rss(run):
+    """
+    (RSS-Höchststand, Zuwachs während run()) in MB, gemessen in einem
+    geforkten Kindprozess, dessen Höchststand beim Start dem aktuellen RSS
+    entspricht. (None, None) ohne fork oder wenn run() fehlschlägt.
+    """
+    if resource is None or not hasattr(os, 'fork'):
+        return None, None
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            gc.collect()
+            before = max_rss_mb(resource.RUSAGE_SELF)
+            run()
+            after = max_rss_mb(resource.RUSAGE_SELF)
+            message = {'peak': after, 'growth': after - before}
+        except BaseException as e:
+            message = {'error': f"{type(e).__name__}: {e}"}
+        finally:
+            os.write(write_fd, json.dumps(message).encode('utf-8'))
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, 'rb') as f:
+        data = f.read()
+    os.waitpid(pid, 0)
+    message = json.loads(data) if data else {'error': 'keine Antwort'}
+    if 'error' in message:
+        print(f"  WARNUNG: RSS-Messung im Kindprozess fehlgeschlagen ({message['error']})")
+        return None, None
+    return message['peak'], message['growth']
+
+
+def measure(run, repeat):
+    """
+    (Wandzeit, CPU-Zeit, tracemalloc-Spitze in MB, Zeilen); Zeiten als
+    Minimum über repeat
+    """
+    best_wall, best_cpu, rows = math.inf, math.inf, None
+    for _ in range(repeat):
+        gc.collect()
+        wall, cpu = time.perf_counter(), time.process_time()
+        rows = run()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        if wall < best_wall:
+            best_wall, best_cpu = wall, cpu
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best_wall, best_cpu, peak / 1024 ** 2, rows
+
+
+def git_revision():
+    """(Commit-Hash, True falls es lokale Änderungen gibt); ohne git ('unknown', False)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, bool(status.strip())
+
+
+def scaling_exponent(results, stage, size, wall):
+    """Steigung im log-log-Diagramm gegenüber der vorherigen Grösse (1 = linear)"""
+    previous = [r for r in results if r['stage'] == stage and r['size'] < size and r['wall_s'] > 0]
+    if not previous or wall <= 0:
+        return None
+    prev = max(previous, key=lambda r: r['size'])
+    return round(math.log(wall / prev['wall_s']) / math.log(size / prev['size']), 2)
+
+
+def compare(results, baseline_path, threshold):
+    """Vergleicht mit einem früheren Lauf; liefert die Liste der Verschlechterungen"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['stage'], r['size']): r for r in baseline['results']}
+    print(f"\nVergleich mit {baseline['commit'][:12]} ({baseline_path}):")
+    print(f"{'Stufe':<14}{'Grösse':>10}{'Zeit':>10}{'Speicher':>10}{'RSS':>10}")
+    regressions = []
+    for result in results:
+        old = previous.get((result['stage'], result['size']))
+        if old is None:
+            continue
+        time_ratio = result['wall_s'] / old['wall_s'] if old['wall_s'] > 0 else 1.0
+        mem_ratio = result['peak_mb'] / old['peak_mb'] if old['peak_mb'] > 0 else 1.0
+        # RSS-Zuwachs nur vergleichen, wenn beide Läufe ihn haben (ältere Ergebnisse nicht)
+        rss, old_rss = result.get('rss_growth_mb'), old.get('rss_growth_mb')
+        rss_ratio = rss / old_rss if rss is not None and old_rss else None
+        flag = ''
+        if time_ratio > threshold or mem_ratio > threshold or (rss_ratio or 0) > threshold:
+            flag = '  <- schlechter'
+            regressions.append(result)
+        rss_column = f"{rss_ratio:>9.2f}x" if rss_ratio is not None else f"{'-':>10}"
+        print(f"{result['stage']:<14}{result['size']:>10}{time_ratio:>9.2f}x{mem_ratio:>9.2f}x"
+              f"{rss_column}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks der Pipeline-Stufen auf synthetischen Daten")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Anzahl synthetischer POIs (und Graphknoten)")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3, help="Läufe pro Messung (Minimum zählt)")
+    parser.add_argument('--max-seconds', type=float, default=120,
+                        help="Grössere Grössen einer Stufe überspringen, sobald sie so lange braucht")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cell-size', type=float, default=100, help="Zellgrösse der Grid-Bewertung")
+    parser.add_argument('--buffer', type=float, default=500, help="Suchradius der Grid-Bewertung")
+    parser.add_argument('--kde-cell-size', type=float, default=50)
+    parser.add_argument('--sources', type=int, default=50, help="Startknoten für Isochronen")
+    parser.add_argument('--tile-zooms', type=int, nargs='+', default=[12, 14])
+    parser.add_argument('--output', default=None, help="Ergebnisdatei (Standard: results/benchmarks/<commit>.json)")
+    parser.add_argument('--compare', default=None, help="Früheres Ergebnis zum Vergleich")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Faktor, ab dem Zeit oder Speicher als Verschlechterung gilt")
+    args = parser.parse_args()
+
+    commit, dirty = git_revision()
+    results = []
+    too_slow = set()
+    for size in sorted(args.sizes):
+        stages = [stage for stage in args.stages if stage not in too_slow]
+        if not stages:
+            break
+        print(f"\nErzeuge synthetische Daten für {size} POIs...")
+        work = Workload(size, args.seed)
+        for stage in stages:
+            run = STAGES[stage](work, args)
+            wall, cpu, peak_mb, rows = measure(run, args.repeat)
+            peak_rss, rss_growth = measure_rss(run)
+            result = {'stage': stage, 'size': size, 'wall_s': round(wall, 4), 'cpu_s': round(cpu, 4),
+                      'peak_mb': round(peak_mb, 2),
+                      'peak_rss_mb': None if peak_rss is None else round(peak_rss, 1),
+                      'rss_growth_mb': None if rss_growth is None else round(rss_growth, 1),
+                      'rows': int(rows),
+                      'exponent': scaling_exponent(results, stage, size, wall)}
+            results.append(result)
+            exponent = f"  Exponent {result['exponent']}" if result['exponent'] is not None else ""
+            rss = f" {rss_growth:>9.1f} MB RSS" if rss_growth is not None else ""
+            print(f"  {stage:<14}{wall:>9.3f} s {peak_mb:>9.1f} MB{rss} {rows:>10} Zeilen{exponent}")
+            if wall > args.max_seconds:
+                print(f"  {stage} überschreitet {args.max_seconds:.0f} s, grössere Grössen entfallen.")
+                too_slow.add(stage)
+        del work
+
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'parameters': {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'compare', 'threshold')},
+        'skipped': sorted(too_slow),
+        'results': results,
+    }
+    output_path = args.output or os.path.join(RESULTS_DIR, f"{commit[:12]}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nErgebnisse gespeichert unter: {output_path}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} Messungen über dem Faktor {args.threshold}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
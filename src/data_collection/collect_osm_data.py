@@ -1,96 +1,201 @@
 import osmnx as ox
 import geopandas as gpd
+import numpy as np
+import shapely
+import argparse
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils import graph_store
+from utils.osm_cache import CACHE_DIR, install as install_osm_cache
+from utils.poi_ingest import normalize_ids
+from utils.region import boundary_path, current_region, file_prefix
+
+region = current_region()
+
+parser = argparse.ArgumentParser(description=f"OSM-Daten für {region['name']} sammeln")
+parser.add_argument('--offline', action='store_true',
+                    help="Nur Antworten aus dem Cache verwenden, keine Netzwerkzugriffe")
+parser.add_argument('--cache-dir', default=CACHE_DIR, help="Verzeichnis des OSM-Antwortcaches")
+parser.add_argument('--cache-max-mb', type=float, default=512, help="Byte-Budget des Caches in MB")
+parser.add_argument('--pbf', default=None,
+                    help="Lokaler .osm.pbf-Extrakt; ersetzt alle Online-Abfragen")
+parser.add_argument('--bbox', default=None,
+                    help="Nur Objekte in min_lon,min_lat,max_lon,max_lat aus dem Extrakt lesen "
+                         "(Standard: Ausdehnung der Grenze der Region)")
+args = parser.parse_args()
 
 # Verzeichnis erstellen, falls es nicht existiert
 os.makedirs('data/raw', exist_ok=True)
 
-# Zürich Gebietsabgrenzung mit alternativen Suchbegriffen
-print("Lade Stadtgrenzen von Zürich...")
+# Touristische Tags für POIs (Online-Abfrage und PBF-Import)
+tourism_tags = {
+    'tourism': ['attraction', 'museum', 'hotel', 'viewpoint', 'artwork', 'gallery'],
+    'amenity': ['restaurant', 'cafe', 'bar', 'theatre', 'cinema', 'nightclub'],
+    'shop': ['souvenir', 'clothes', 'mall', 'department_store', 'jewelry'],
+    'historic': ['monument', 'memorial', 'castle', 'ruins'],
+    'leisure': ['park', 'garden']
+}
+
+
+def region_bbox(pbf_path, margin=0.01):
+    """
+    Bounding Box (WGS84) der Region für den Import: aus einer gespeicherten
+    Grenze derselben Region, sonst aus einem ersten Durchgang durch den Extrakt
+    """
+    from utils.pbf_ingest import find_boundary
+
+    path = boundary_path(region)
+    bounds = None
+    if os.path.exists(path):
+        saved = gpd.read_file(path)
+        # Nur eine Grenze verwenden, die zur aktuellen Region gehört
+        names = set(region['osm_names']) | {region['name']}
+        if 'name' in saved.columns and saved['name'].isin(names).any():
+            bounds = saved.to_crs('EPSG:4326').total_bounds
+    if bounds is None:
+        print(f"Suche Gemeindegrenze von {region['name']} im Extrakt...")
+        boundary_geom = find_boundary(pbf_path, region['osm_names'])
+        if boundary_geom is None:
+            print(f"Keine Gemeindegrenze für {region['name']} im Extrakt gefunden.")
+            sys.exit(1)
+        bounds = boundary_geom.bounds
+    minx, miny, maxx, maxy = bounds
+    return (minx - margin, miny - margin, maxx + margin, maxy + margin)
+
+
+def collect_from_pbf(pbf_path, bbox=None):
+    """Grenze, Fusswegnetz und POIs in einem Durchgang aus einem lokalen Extrakt"""
+    from utils.pbf_ingest import ingest_pbf
+    from pyproj import Transformer
+
+    if bbox is None:
+        bbox = region_bbox(pbf_path)
+
+    print(f"Lese OSM-Extrakt {pbf_path}...")
+    result = ingest_pbf(pbf_path, tourism_tags, region_names=region['osm_names'], bbox=bbox)
+    if result['boundary'] is None:
+        print(f"Keine Gemeindegrenze für {region['name']} im Extrakt gefunden.")
+        sys.exit(1)
+
+    # Stadtgrenze speichern
+    boundary_geom = result['boundary']
+    boundary = gpd.GeoDataFrame({'name': [region['name']]}, geometry=[boundary_geom], crs='EPSG:4326')
+    boundary.to_file(boundary_path(region), driver='GeoJSON')
+    print(f"Stadtgrenzen gespeichert. Fläche: {boundary.to_crs(epsg=2056).area.sum()/1e6:.2f} km²")
+
+    # Fusswegnetz auf die Stadtgrenze beschränken und als Graphspeicher ablegen
+    node_ids, lon, lat = result['nodes']
+    shapely.prepare(boundary_geom)
+    inside = shapely.contains_xy(boundary_geom, lon, lat)
+    u, v, lengths = result['edges']
+    keep = np.isin(u, node_ids[inside]) & np.isin(v, node_ids[inside])
+    x, y = Transformer.from_crs('EPSG:4326', graph_store.STORE_CRS, always_xy=True).transform(
+        lon[inside], lat[inside])
+    store = graph_store.from_edges(node_ids[inside], x, y, u[keep], v[keep], lengths[keep],
+                                   meta={'source': os.path.basename(pbf_path), 'network_type': 'walk'})
+    store.save(graph_store.WALK_GRAPH_DIR)
+    print(f"Fusswegnetz gespeichert: {store.n_nodes} Knoten, {store.n_edges} Kanten")
+
+    # POIs innerhalb der Stadtgrenzen speichern
+    tourism_pois = gpd.GeoDataFrame(result['pois'], geometry='geometry', crs='EPSG:4326')
+    tourism_pois = tourism_pois.set_index(['element_type', 'osmid'])
+    tourism_pois = gpd.sjoin(tourism_pois, boundary[['geometry']], how="inner", predicate="within")
+    tourism_pois.to_file('data/raw/tourism_pois.geojson', driver='GeoJSON')
+    print(f"POIs geladen und gefiltert: {len(tourism_pois)}")
+
+
+if args.pbf:
+    collect_from_pbf(args.pbf, bbox=tuple(map(float, args.bbox.split(','))) if args.bbox else None)
+    print("Datensammlung aus Extrakt abgeschlossen.")
+    sys.exit(0)
+
+# Overpass-/Nominatim-Antworten über den verwalteten Cache laufen lassen
+osm_cache = install_osm_cache(args.cache_dir, offline=args.offline,
+                              max_bytes=int(args.cache_max_mb * 1024 ** 2))
+
+# Gebietsabgrenzung der Region mit alternativen Suchbegriffen
+print(f"Lade Stadtgrenzen von {region['name']}...")
 try:
     # Versuche verschiedene Abfragevarianten
-    query_options = [
-        "Zürich, Switzerland",
-        "Zurich, Switzerland",
-        "Zürich Stadt",
-        "Zurich City"
-    ]
+    query_options = region['queries']
     
-    zurich_boundary = None
+    boundary = None
     for query in query_options:
         try:
             print(f"Versuche Abfrage: '{query}'")
-            zurich_boundary = ox.geocode_to_gdf(query)
-            if not zurich_boundary.empty:
+            boundary = ox.geocode_to_gdf(query)
+            if not boundary.empty:
                 print(f"Erfolgreiche Abfrage mit: '{query}'")
                 break
         except Exception as e:
             print(f"Fehler bei Abfrage '{query}': {e}")
     
-    if zurich_boundary is None or zurich_boundary.empty:
+    if boundary is None or boundary.empty:
         raise Exception("Keine der Abfragen war erfolgreich")
         
     # Für Flächenberechnung in Schweizer Projektion transformieren
-    zurich_boundary_proj = zurich_boundary.to_crs(epsg=2056)  # CH1903+ / LV95
-    print(f"Stadtgrenzen geladen. Fläche: {zurich_boundary_proj.area.sum()/1e6:.2f} km²")
+    boundary_proj = boundary.to_crs(epsg=2056)  # CH1903+ / LV95
+    print(f"Stadtgrenzen geladen. Fläche: {boundary_proj.area.sum()/1e6:.2f} km²")
 
 except Exception as e:
     print(f"Fehler beim Laden der Stadtgrenzen: {e}")
-    print("Erstelle vereinfachte Bounding Box für Zürich...")
-    # Alternativ: Verwende eine vereinfachte Bounding Box für Zürich
-    zurich_box = ox.utils_geo.bbox_from_point((47.3769, 8.5417), dist=7000)  # ~7km um Zentrum
-    zurich_boundary = ox.geocode_to_gdf("Switzerland")  # Platzhalter für Schweiz-CRS
-    zurich_boundary = gpd.GeoDataFrame(
-        geometry=[ox.utils_geo.bbox_to_poly(*zurich_box)], 
-        crs=zurich_boundary.crs
+    if region['center'] is None:
+        print(f"Kein Zentrum für {region['name']} konfiguriert, Abbruch.")
+        sys.exit(1)
+    print(f"Erstelle vereinfachte Bounding Box für {region['name']}...")
+    # Alternativ: Verwende eine vereinfachte Bounding Box um das Zentrum der Region
+    fallback_box = ox.utils_geo.bbox_from_point(tuple(region['center']), dist=region['radius'])
+    boundary = ox.geocode_to_gdf("Switzerland")  # Platzhalter für Schweiz-CRS
+    boundary = gpd.GeoDataFrame(
+        geometry=[ox.utils_geo.bbox_to_poly(*fallback_box)], 
+        crs=boundary.crs
     )
     print("Vereinfachte Bounding Box erstellt.")
 
 # Stadtgrenzen als GeoJSON speichern
-zurich_boundary.to_file('data/raw/zurich_boundary.geojson', driver='GeoJSON')
+boundary.to_file(boundary_path(region), driver='GeoJSON')
 print("Stadtgrenzen gespeichert.")
 
-# OSM-Straßennetzwerk für Zürich herunterladen (nur innerhalb der Stadtgrenzen)
+# OSM-Straßennetzwerk der Region herunterladen (nur innerhalb der Stadtgrenzen)
 print("Lade Straßennetzwerk innerhalb der Stadtgrenzen...")
 try:
-    zurich_graph = ox.graph_from_polygon(zurich_boundary.unary_union, network_type='all')
-    zurich_nodes, zurich_edges = ox.graph_to_gdfs(zurich_graph)
-    print(f"Straßennetzwerk geladen: {len(zurich_nodes)} Knoten, {len(zurich_edges)} Kanten")
+    graph = ox.graph_from_polygon(boundary.unary_union, network_type='all')
+    nodes, edges = ox.graph_to_gdfs(graph)
+    print(f"Straßennetzwerk geladen: {len(nodes)} Knoten, {len(edges)} Kanten")
 except Exception as e:
     print(f"Fehler beim Laden des Straßennetzwerks: {e}")
     print("Versuche alternativen Ansatz mit place...")
-    zurich_graph = ox.graph_from_place("Zürich, Switzerland", network_type='all')
-    zurich_nodes, zurich_edges = ox.graph_to_gdfs(zurich_graph)
-    print(f"Straßennetzwerk geladen: {len(zurich_nodes)} Knoten, {len(zurich_edges)} Kanten")
+    graph = ox.graph_from_place(region['queries'][0], network_type='all')
+    nodes, edges = ox.graph_to_gdfs(graph)
+    print(f"Straßennetzwerk geladen: {len(nodes)} Knoten, {len(edges)} Kanten")
 
 # POIs für Tourismus herunterladen
 print("Lade touristische POIs...")
-tourism_tags = {
-    'tourism': ['attraction', 'museum', 'hotel', 'viewpoint', 'artwork', 'gallery'],
-    'amenity': ['restaurant', 'cafe', 'bar', 'theatre', 'cinema', 'nightclub'],
-    'shop': ['souvenir', 'clothes', 'mall', 'department_store', 'jewelry'],
-    'historic': ['monument', 'memorial', 'castle', 'ruins'],
-    'leisure': ['park', 'garden']
-}
 
 # POIs innerhalb der Stadtgrenzen herunterladen und filtern
 try:
     print("Versuche POIs mit Polygon zu laden...")
-    tourism_pois = ox.features_from_polygon(zurich_boundary.unary_union, tags=tourism_tags)
+    tourism_pois = ox.features_from_polygon(boundary.unary_union, tags=tourism_tags)
 except Exception as e:
     print(f"Fehler beim Laden der POIs mit Polygon: {e}")
     print("Versuche alternativen Ansatz mit place...")
-    tourism_pois = ox.features_from_place("Zürich, Switzerland", tags=tourism_tags)
+    tourism_pois = ox.features_from_place(region['queries'][0], tags=tourism_tags)
 
 # Filtere POIs, die innerhalb der Stadtgrenzen liegen
 print("Filtere POIs innerhalb der Stadtgrenzen...")
-tourism_pois = gpd.sjoin(tourism_pois, zurich_boundary[['geometry']], how="inner", predicate="within")
+tourism_pois = gpd.sjoin(tourism_pois, boundary[['geometry']], how="inner", predicate="within")
+# osmnx 2.x nennt die Indexstufen element/id; Schlüssel der späteren Stufen ist element_type/osmid
+tourism_pois = normalize_ids(tourism_pois)
 print(f"POIs geladen und gefiltert: {len(tourism_pois)}")
 
 # Daten speichern
 print("Speichere Daten...")
-zurich_nodes.to_file('data/raw/zurich_nodes.geojson', driver='GeoJSON')
-zurich_edges.to_file('data/raw/zurich_edges.geojson', driver='GeoJSON')
+nodes.to_file(f'data/raw/{file_prefix(region)}_nodes.geojson', driver='GeoJSON')
+edges.to_file(f'data/raw/{file_prefix(region)}_edges.geojson', driver='GeoJSON')
 tourism_pois.to_file('data/raw/tourism_pois.geojson', driver='GeoJSON')
 
+stats = osm_cache.stats()
+print(f"OSM-Cache: {stats['entries']} Einträge, {stats['bytes'] / 1024 ** 2:.1f} MB")
 print("Datensammlung abgeschlossen.")
@@ -1,19 +1,43 @@
-import pandas as pd
-import requests
-from io import StringIO
+import argparse
+import asyncio
 import os
+import sys
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.downloader import download_all
+from utils.region import current_region
 
-print("Sammle statistische Daten für Zürich...")
+parser = argparse.ArgumentParser(description="Statistische Daten der Region laden")
+parser.add_argument('--base-url',
+                    help="Dateien von dieser Adresse statt von der Quelle der Region laden "
+                         "(z.B. http://localhost:8000 für einen lokalen Testserver)")
+parser.add_argument('--max-connections', type=int, default=8,
+                    help="Maximale Anzahl gleichzeitiger Verbindungen")
+parser.add_argument('--timeout', type=float, default=30, help="Timeout pro Anfrage in Sekunden")
+parser.add_argument('--no-dummy', action='store_true',
+                    help="Keine Beispieldaten erzeugen, fehlgeschlagene Downloads als Fehler melden")
+args = parser.parse_args()
+
+region = current_region()
+print(f"Sammle statistische Daten für {region['name']}...")
+
+# Quellen der Region (Zürich: Open-Data-Portal der Stadt); andere Regionen
+# haben keine, ihre Ausgaben sollen keine Zürcher Zahlen enthalten
+urls = region['stats']
+if not urls:
+    print(f"Für {region['name']} ist keine Statistikquelle hinterlegt, Stufe wird übersprungen.")
+    sys.exit(0)
 
 # Sicherstellen, dass das Verzeichnis existiert
 os.makedirs('data/raw', exist_ok=True)
 
-# URLs für statistische Daten der Stadt Zürich
-# Hinweis: Dies sind Beispiel-URLs, ersetzen Sie sie durch aktuelle Quellen
-urls = {
-    "tourism_stats": "https://data.stadt-zuerich.ch/dataset/tourism_stats.csv",
-    "overnight_stats": "https://data.stadt-zuerich.ch/dataset/overnight_stats.csv"
-}
+# Hinweis: Die URLs in utils/region.py sind Beispiel-URLs, ersetzen Sie sie durch aktuelle Quellen
+if args.base_url:
+    urls = {name: f"{args.base_url.rstrip('/')}/{url.rsplit('/', 1)[-1]}"
+            for name, url in urls.items()}
 
 # Dummy-Daten erstellen, falls die Daten nicht verfügbar sind
 def create_dummy_data(data_type):
@@ -32,7 +56,7 @@ def create_dummy_data(data_type):
                     "year": year,
                     "month": month,
                     "visitors": visitors,
-                    "district": "Stadt Zürich",
+                    "district": f"Stadt {region['name']}",
                     "average_stay": 2.5 + (month % 3) * 0.2
                 })
         
@@ -58,34 +82,44 @@ def create_dummy_data(data_type):
     
     return pd.DataFrame()
 
-# Daten herunterladen oder Dummy-Daten erstellen
-datasets = {}
+# Daten herunterladen: nebenläufig, mit bedingten Anfragen und Fortsetzung
+print(f"Lade {len(urls)} Datensätze (max. {args.max_connections} Verbindungen)...")
+results = asyncio.run(download_all(urls, 'data/raw', max_connections=args.max_connections,
+                                   timeout=args.timeout))
+
+failed = []
+for name, result in results.items():
+    if result.status == 'downloaded':
+        print(f"{name} erfolgreich geladen.")
+    elif result.status == 'not_modified':
+        print(f"{name} unverändert, vorhandene Datei wird verwendet.")
+    elif os.path.exists(f'data/raw/{name}.parquet'):
+        print(f"WARNUNG: {name} konnte nicht geladen werden ({result.error}), "
+              f"verwende die vorhandene Kopie.")
+    else:
+        failed.append(name)
+        print(f"WARNUNG: {name} konnte nicht geladen werden ({result.error}).")
+
+if failed and args.no_dummy:
+    print(f"Abbruch: keine Daten für {', '.join(failed)}.")
+    sys.exit(1)
 
-for name, url in urls.items():
-    print(f"Versuche, {name} von {url} zu laden...")
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            datasets[name] = pd.read_csv(StringIO(response.text))
-            print(f"{name} erfolgreich geladen.")
-        else:
-            print(f"Fehler beim Laden von {name}: HTTP Status {response.status_code}")
-            datasets[name] = create_dummy_data(name)
-    except Exception as e:
-        print(f"Fehler beim Laden von {name}: {e}")
-        datasets[name] = create_dummy_data(name)
+for name in failed:
+    print(f"WARNUNG: {name} wird durch Beispieldaten ersetzt!")
+    df = create_dummy_data(name)
+    df.to_csv(f'data/raw/{name}.csv', index=False)
+    df.to_parquet(f'data/raw/{name}.parquet', index=False)
 
 # Daten nach Stadtbezirken filtern (falls entsprechende Spalte vorhanden)
-for name, df in datasets.items():
-    if 'district' in df.columns:
-        print(f"Filtere {name} nach Stadtbezirken von Zürich...")
+for name in urls:
+    columns = pq.read_schema(f'data/raw/{name}.parquet').names
+    if 'district' in columns:
+        print(f"Filtere {name} nach Stadtbezirken von {region['name']}...")
         # Hier könnten Sie nach bestimmten Bezirken filtern
-        # df = df[df['district'].isin(['Bezirk1', 'Bezirk2', ...])]
+        # df = pd.read_parquet(f'data/raw/{name}.parquet', filters=[('district', 'in', [...])])
 
-# Daten speichern
-for name, df in datasets.items():
-    file_path = f'data/raw/{name}.csv'
-    df.to_csv(file_path, index=False)
-    print(f"{name} gespeichert unter {file_path} mit {len(df)} Einträgen.")
+for name in urls:
+    n_rows = pq.read_metadata(f'data/raw/{name}.parquet').num_rows
+    print(f"{name} gespeichert unter data/raw/{name}.csv (und .parquet) mit {n_rows} Einträgen.")
 
-print("Statistische Datensammlung abgeschlossen.")
\ No newline at end of file
+print("Statistische Datensammlung abgeschlossen.")
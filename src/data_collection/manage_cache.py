@@ -0,0 +1,49 @@
+# Verwaltung des OSM-Antwortcaches (Statistik, Bereinigung, Einträge)
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.osm_cache import CACHE_DIR, migrate_legacy, open_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OSM-Antwortcache verwalten")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--max-mb', type=float, default=512, help="Byte-Budget in MB")
+    parser.add_argument('--ttl-days', type=float, default=30, help="Lebensdauer von Einträgen")
+    parser.add_argument('--list', action='store_true', help="Einträge auflisten")
+    parser.add_argument('--prune', action='store_true',
+                        help="Abgelaufene Einträge löschen und Byte-Budget durchsetzen")
+    parser.add_argument('--clear', action='store_true', help="Cache vollständig leeren")
+    args = parser.parse_args()
+
+    cache = open_cache(args.cache_dir, max_bytes=int(args.max_mb * 1024 ** 2),
+                       ttl=args.ttl_days * 24 * 3600)
+    migrated = migrate_legacy(cache, args.cache_dir)
+    if migrated:
+        print(f"{migrated} osmnx-Cachedateien übernommen.")
+
+    if args.clear:
+        cache.clear()
+        print("Cache geleert.")
+    elif args.prune:
+        print(f"{cache.prune()} Einträge entfernt.")
+
+    if args.list:
+        for key, query, bbox, created, accessed, size, negative in cache.entries():
+            label = ' '.join((query or '').split())[:60]
+            print(f"{key[:12]}  {time.strftime('%Y-%m-%d', time.localtime(created))}  "
+                  f"{size / 1024:8.1f} KB  {'leer ' if negative else '     '}"
+                  f"{bbox or '-':<40}  {label}")
+
+    stats = cache.stats()
+    ratio = stats['raw_bytes'] / stats['bytes'] if stats['bytes'] else 0
+    print(f"{stats['entries']} Einträge, {stats['bytes'] / 1024 ** 2:.1f} MB komprimiert "
+          f"(Faktor {ratio:.1f}), davon {stats['negative']} leere Antworten.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# Hintergrundkacheln für die Region im Voraus in den Kachel-Cache laden,
+# damit die Karten danach auch ohne Netzwerk (--offline) erstellt werden können
+
+import argparse
+import os
+import sys
+
+import geopandas as gpd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils import basemap
+from utils.region import boundary_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kachel-Cache für Hintergrundkarten füllen")
+    parser.add_argument('--boundary', default=boundary_path())
+    parser.add_argument('--provider', default=basemap.DEFAULT_PROVIDER)
+    parser.add_argument('--min-zoom', type=int, default=None,
+                        help="Kleinste Zoomstufe (Standard: automatisch gewählte Stufe)")
+    parser.add_argument('--max-zoom', type=int, default=None)
+    parser.add_argument('--cache-dir', default=basemap.TILE_CACHE_DIR)
+    args = parser.parse_args()
+
+    bounds = basemap.map_bounds(gpd.read_file(args.boundary).to_crs(epsg=3857).total_bounds)
+
+    zoom = basemap.auto_zoom(bounds)
+    min_zoom = zoom if args.min_zoom is None else args.min_zoom
+    max_zoom = max(min_zoom, zoom if args.max_zoom is None else args.max_zoom)
+    zooms = range(min_zoom, max_zoom + 1)
+
+    print(f"Lade Kacheln von {args.provider} für Zoomstufen {min_zoom}-{max_zoom}...")
+    available, missing = basemap.seed(bounds, zooms, args.provider, args.cache_dir)
+    print(f"{available} Kacheln im Cache unter {args.cache_dir}, {missing} nicht verfügbar.")
+    if missing:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
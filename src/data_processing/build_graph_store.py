@@ -0,0 +1,29 @@
+# Aufbau des Fusswegnetzes als persistenter CSR-Graphspeicher
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.graph_store import build_walk_store, WALK_GRAPH_DIR
+from utils.region import boundary_path, current_region
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fusswegnetz als CSR-Graphspeicher aufbauen")
+    parser.add_argument('--offline', action='store_true',
+                        help="Nur Antworten aus dem OSM-Cache verwenden")
+    args = parser.parse_args()
+
+    print(f"Baue Fusswegnetz für {current_region()['name']} auf...")
+    if not os.path.exists(boundary_path()):
+        print("Stadtgrenze fehlt. Bitte führe zuerst src/data_collection/collect_osm_data.py aus.")
+        sys.exit(1)
+
+    store = build_walk_store(offline=args.offline)
+    print(f"Graph gespeichert unter {WALK_GRAPH_DIR}: {store.n_nodes} Knoten, "
+          f"{store.n_edges} Kanten (Version {store.version[:12]})")
+
+
+if __name__ == "__main__":
+    main()
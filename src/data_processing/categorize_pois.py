@@ -1,32 +1,28 @@
-import geopandas as gpd
-import pandas as pd
+import os
+import sys
 
-# POI-Daten laden
-tourism_pois = gpd.read_file('data/raw/tourism_pois.geojson')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.categorization import load_rules, categorize
+from utils.instrumentation import phase
+from utils.storage import read_layer, write_layer
 
-# Kategorisierungsfunktion
-def categorize_poi(poi):
-    if 'tourism' in poi and poi['tourism'] in ['museum', 'gallery', 'artwork']:
-        return 'Kultur'
-    elif 'tourism' in poi and poi['tourism'] in ['hotel', 'hostel', 'guest_house']:
-        return 'Unterkunft'
-    elif 'amenity' in poi and poi['amenity'] in ['restaurant', 'cafe', 'bar']:
-        return 'Gastronomie'
-    elif 'shop' in poi:
-        return 'Shopping'
-    elif 'tourism' in poi and poi['tourism'] == 'attraction':
-        return 'Attraktion'
-    else:
-        return 'Sonstiges'
+# Kategorieregeln (Priorität, Kategorie, Tag, erlaubte Werte)
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_rules.csv')
 
-# Anwenden der Kategoriefunktion
-tourism_pois['category'] = tourism_pois.apply(categorize_poi, axis=1)
+# POI-Daten laden (nur die Tags der Positivliste, siehe ingest_pois.py)
+tourism_pois = read_layer('pois')
+
+# Kategorien über vektorisierte Regelmasken zuweisen
+rules = load_rules(RULES_PATH)
+with phase('categorize', rows_in=len(tourism_pois)) as record:
+    tourism_pois['category'] = categorize(tourism_pois, rules)
+    record.rows_out = len(tourism_pois)
 
 # Verarbeitete Daten speichern
-tourism_pois.to_file('data/processed/categorized_pois.geojson', driver='GeoJSON')
+write_layer(tourism_pois, 'categorized_pois')
 
 # Kurze Statistik ausgeben
 category_counts = tourism_pois['category'].value_counts()
 print("POIs nach Kategorien:")
 print(category_counts)
-print(f"\nInsgesamt wurden {len(tourism_pois)} POIs in {len(category_counts)} Kategorien eingeteilt.")
\ No newline at end of file
+print(f"\nInsgesamt wurden {len(tourism_pois)} POIs in {len(category_counts)} Kategorien eingeteilt.")
@@ -1,48 +1,90 @@
-# Import von Geodaten in PostgreSQL/PostGIS für das Zürich Geo-Marketing-Projekt
+# Import von Geodaten in PostgreSQL/PostGIS für das Geo-Marketing-Projekt
+#
+# Verbindungsparameter kommen aus der Umgebung (PGHOST, PGPORT, PGUSER,
+# PGPASSWORD, PGDATABASE oder DATABASE_URL), z.B.
+#   PGHOST=localhost PGUSER=geo_user PGPASSWORD=... python src/data_processing/import_to_postgis.py
 
-import geopandas as gpd
-from sqlalchemy import create_engine
+import argparse
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.postgis import CHUNK_SIZE, import_source
+from utils.raster import raster_paths
+from utils.region import boundary_path, boundary_table
+from utils.storage import layer_path
+
+# Tabellen: Quelle, Schlüssel für den Upsert (None = Tabelle ersetzen) und Attributindizes.
+# Die Grenze trägt das Präfix der Region, damit Regionen sich nicht überschreiben
+SOURCES = [
+    {'table': boundary_table(), 'path': boundary_path()},
+    {'table': 'tourism_pois', 'path': 'data/raw/tourism_pois.geojson',
+     'key': ['element_type', 'osmid'], 'indexes': ['tourism', 'amenity', 'shop', 'name']},
+    {'table': 'categorized_pois', 'layer': 'categorized_pois',
+     'key': ['element_type', 'osmid'], 'indexes': ['category']},
+    {'table': 'hotspot_analysis', 'raster': 'hotspot_analysis'},
+    {'table': 'accessibility', 'raster': 'accessibility'},
+]
+REQUIRED_TABLES = [boundary_table(), 'tourism_pois']
+
+
+def source_exists(source):
+    if 'raster' in source:
+        return os.path.exists(raster_paths(source['raster'])[1])
+    if 'layer' in source:
+        path = layer_path(source['layer'])
+        return os.path.exists(path) or os.path.exists(path.replace('.parquet', '.geojson'))
+    return os.path.exists(source['path'])
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Geodaten nach PostgreSQL/PostGIS importieren")
+    parser.add_argument('tables', nargs='*', help="Nur diese Tabellen importieren")
+    parser.add_argument('--jobs', '-j', type=int, default=len(SOURCES),
+                        help="Anzahl Tabellen, die parallel geladen werden")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="Zeilen pro COPY-Block")
+    parser.add_argument('--keep-missing', action='store_true',
+                        help="Zeilen, die in der Quelle fehlen, nicht löschen")
+    args = parser.parse_args()
+
     print("Importiere Geodaten in PostgreSQL/PostGIS...")
-    
-    # Datenbankverbindung herstellen (passe die Verbindungsparameter an)
-    db_user = "geo_user"
-    db_password = "nP7r#Xg2!vDqL9zA"
-    db_host = "localhost"
-    db_port = "5432"
-    db_name = "zuerich_tourism"
-    
-    db_connection_string = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    engine = create_engine(db_connection_string)
-    
+
     # Prüfen, ob die benötigten Geodaten existieren
-    required_files = [
-        'data/raw/zurich_boundary.geojson',
-        'data/raw/tourism_pois.geojson'
-    ]
-    
-    missing_files = [f for f in required_files if not os.path.exists(f)]
-    
+    missing_files = [s['path'] for s in SOURCES
+                     if s['table'] in REQUIRED_TABLES and not source_exists(s)]
     if missing_files:
         print(f"Folgende Dateien fehlen: {missing_files}")
         print("Bitte führe zuerst src/data_collection/collect_osm_data.py aus.")
         return
-    
-    # Geodaten laden
-    print("Lade Geodaten...")
-    zurich_boundary = gpd.read_file('data/raw/zurich_boundary.geojson')
-    tourism_pois = gpd.read_file('data/raw/tourism_pois.geojson')
-    
-    # Daten in PostgreSQL/PostGIS importieren
-    print("Importiere Stadtgrenzen...")
-    zurich_boundary.to_postgis('zurich_boundary', engine, if_exists='replace')
-    
-    print("Importiere touristische POIs...")
-    tourism_pois.to_postgis('tourism_pois', engine, if_exists='replace')
-    
+
+    sources = [s for s in SOURCES if not args.tables or s['table'] in args.tables]
+    for source in [s for s in sources if not source_exists(s)]:
+        print(f"{source['table']}: keine Daten vorhanden, übersprungen.")
+    sources = [s for s in sources if source_exists(s)]
+
+    failed = False
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(sources)))) as pool:
+        futures = {
+            source['table']: pool.submit(import_source, source, chunk_size=args.chunk_size,
+                                         delete_missing=not args.keep_missing)
+            for source in sources
+        }
+        for table, future in futures.items():
+            try:
+                stats = future.result()
+            except Exception as e:
+                print(f"Fehler beim Import von {table}: {e}")
+                failed = True
+                continue
+            print(f"{table}: {stats['rows']} Zeilen gelesen, {stats['inserted']} neu, "
+                  f"{stats['updated']} geändert, {stats['deleted']} gelöscht")
+
+    if failed:
+        sys.exit(1)
     print("Daten wurden erfolgreich in PostgreSQL/PostGIS importiert!")
 
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
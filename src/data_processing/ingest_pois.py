@@ -0,0 +1,39 @@
+import geopandas as gpd
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.categorization import load_rules
+from utils.instrumentation import phase
+from utils.poi_ingest import load_whitelist, memory_mb, split_tags
+from utils.storage import write_layer, write_table
+
+# Positivliste der Tag-Spalten und Kategorieregeln (deren Tags bleiben immer erhalten)
+WHITELIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'poi_tags.txt')
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_rules.csv')
+
+parser = argparse.ArgumentParser(description="Roh-POIs auf die benötigten Tags reduzieren")
+parser.add_argument('--whitelist', default=WHITELIST_PATH, help="Datei mit den behaltenen Tags")
+parser.add_argument('--tags', nargs='+', default=[], metavar='TAG',
+                    help="Zusätzlich behaltene Tags")
+args = parser.parse_args()
+
+# Roh-POIs mit allen Tag-Spalten laden
+with phase('read_raw_pois') as record:
+    raw_pois = gpd.read_file('data/raw/tourism_pois.geojson')
+    record.rows_out = len(raw_pois)
+raw_mb = memory_mb(raw_pois)
+
+keep = load_whitelist(args.whitelist) + args.tags + list(load_rules(RULES_PATH)['tag'])
+with phase('split_tags', rows_in=len(raw_pois)) as record:
+    pois, tags = split_tags(raw_pois, keep)
+    record.rows_out = len(tags)
+
+write_layer(pois, 'pois')
+write_table(tags, 'poi_tags')
+
+print(f"{len(pois)} POIs mit {len(pois.columns) - 1} Spalten übernommen "
+      f"({raw_mb:.1f} MB -> {memory_mb(pois):.1f} MB).")
+print(f"{tags['key'].nunique()} weitere Tags mit {len(tags)} Werten in der Seitentabelle "
+      f"({memory_mb(tags):.1f} MB).")
@@ -0,0 +1,472 @@
+"""
+Inkrementeller Pipeline-Runner für das Geo-Marketing-Projekt
+
+Kennt die Abhängigkeiten zwischen den Skripten über die Dateien, die sie lesen
+und schreiben. Jede Stufe erhält einen Fingerabdruck aus dem Inhalt ihrer
+Eingabedateien, ihres Skripts und ihrer Parameter. Stufen, deren Fingerabdruck
+sich seit dem letzten erfolgreichen Lauf nicht geändert hat und deren Ausgaben
+vorhanden sind, werden übersprungen. Unabhängige Zweige laufen parallel.
+
+Jeder Lauf erhält eine ID (PIPELINE_RUN_ID), die an die Stufen weitergegeben
+wird; deren Messwerte (utils.instrumentation) werden am Ende zu einem Profil
+unter logs/metrics/<lauf>.summary.json und .prom zusammengefasst.
+
+Aufruf (aus dem Projektverzeichnis):
+    python src/run_pipeline.py                 # alles Veraltete neu bauen
+    python src/run_pipeline.py seasonal_maps   # nur bis zu dieser Stufe
+    python src/run_pipeline.py --dry-run       # nur anzeigen, was laufen würde
+    python src/run_pipeline.py --profile <lauf> # Profil eines früheren Laufs
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils import instrumentation
+from utils.region import boundary_path, current_region, file_prefix
+
+STATE_PATH = 'data/.pipeline_state.json'
+
+# Skripte liegen im Projekt, Daten im aktuellen Arbeitsverzeichnis (im
+# Batch-Modus ein Verzeichnis pro Region, siehe run_regions.py)
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Gemeinsamer Code, der in den Fingerabdruck jeder Stufe einfliesst
+SHARED_CODE = ['src/utils/*.py']
+
+# Dateien mit Ortsbezug tragen das Präfix der Region (utils.region)
+PREFIX = file_prefix()
+BOUNDARY = boundary_path()
+
+# Stufen der Pipeline: Skript, gelesene und geschriebene Dateien.
+# 'external' markiert Stufen, deren eigentliche Eingabe eine Online-Quelle ist;
+# sie laufen nur, wenn Ausgaben fehlen oder sie explizit erzwungen werden.
+# 'requires' nennt Einträge der Region, ohne die eine Stufe entfällt.
+STAGES = [
+    {
+        'name': 'collect_osm',
+        'script': 'src/data_collection/collect_osm_data.py',
+        'inputs': [],
+        'outputs': [
+            BOUNDARY,
+            'data/raw/tourism_pois.geojson',
+        ],
+        'external': True,
+    },
+    {
+        'name': 'collect_stats',
+        'script': 'src/data_collection/collect_zurich_stats.py',
+        'inputs': [],
+        'outputs': [
+            'data/raw/tourism_stats.csv',
+            'data/raw/overnight_stats.csv',
+        ],
+        'external': True,
+        'requires': ['stats'],
+    },
+    {
+        'name': 'ingest_pois',
+        'script': 'src/data_processing/ingest_pois.py',
+        'inputs': [
+            'data/raw/tourism_pois.geojson',
+            'src/data_processing/poi_tags.txt',
+            'src/data_processing/category_rules.csv',
+        ],
+        'outputs': [
+            'data/processed/pois.parquet',
+            'data/processed/poi_tags.parquet',
+        ],
+    },
+    {
+        'name': 'categorize',
+        'script': 'src/data_processing/categorize_pois.py',
+        'inputs': [
+            'data/processed/pois.parquet',
+            'src/data_processing/category_rules.csv',
+        ],
+        'outputs': ['data/processed/categorized_pois.parquet'],
+    },
+    {
+        'name': 'seasonal',
+        'script': 'src/analysis/seasonal_analysis.py',
+        'inputs': [
+            'data/processed/categorized_pois.parquet',
+            'data/raw/seasonal_distribution.csv',
+        ],
+        'outputs': ['data/processed/seasonal_pois.parquet'],
+        'requires': ['seasonal_profile'],
+    },
+    {
+        'name': 'hotspots',
+        'script': 'src/analysis/hotspot_analysis.py',
+        'inputs': [
+            'data/processed/categorized_pois.parquet',
+            BOUNDARY,
+        ],
+        'outputs': ['data/processed/hotspot_analysis.json'],
+    },
+    {
+        'name': 'potential_areas',
+        'script': 'src/analysis/identify_potential_areas.py',
+        'inputs': [
+            BOUNDARY,
+            'data/processed/hotspot_analysis.json',
+            'data/processed/categorized_pois.parquet',
+            'data/processed/accessibility.json',
+        ],
+        'outputs': ['data/processed/high_potential_areas.parquet'],
+    },
+    {
+        'name': 'graph_store',
+        'script': 'src/data_processing/build_graph_store.py',
+        'inputs': [BOUNDARY],
+        'outputs': [f'data/graph/{PREFIX}_walk/meta.json'],
+        'external': True,
+    },
+    {
+        'name': 'isochrones',
+        'script': 'src/analysis/create_isochrones.py',
+        'inputs': [
+            'data/processed/categorized_pois.parquet',
+            f'data/graph/{PREFIX}_walk/meta.json',
+        ],
+        'outputs': ['data/processed/isochrones.geojson'],
+    },
+    {
+        'name': 'accessibility',
+        'script': 'src/analysis/accessibility_analysis.py',
+        'inputs': [
+            'data/processed/categorized_pois.parquet',
+            BOUNDARY,
+            f'data/graph/{PREFIX}_walk/meta.json',
+        ],
+        'outputs': ['data/processed/accessibility.json'],
+    },
+    {
+        'name': 'hotspot_map',
+        'script': 'src/visualization/create_hotspot_map.py',
+        'inputs': [
+            BOUNDARY,
+            'data/processed/hotspot_analysis.json',
+            'data/processed/categorized_pois.parquet',
+        ],
+        'outputs': [f'results/maps/{PREFIX}_hotspots.png'],
+    },
+    {
+        'name': 'seasonal_maps',
+        'script': 'src/visualization/create_seasonal_maps.py',
+        'inputs': [
+            BOUNDARY,
+            'data/processed/seasonal_pois.parquet',
+        ],
+        'outputs': [
+            f'results/maps/{PREFIX}_tourism_sommer.png',
+            f'results/maps/{PREFIX}_tourism_winter.png',
+        ],
+        'requires': ['seasonal_profile'],
+    },
+    {
+        'name': 'interactive_map',
+        'script': 'src/visualization/create_interactive_map.py',
+        'inputs': [
+            'data/processed/categorized_pois.parquet',
+            'data/processed/isochrones.geojson',
+            'data/processed/seasonal_pois.parquet',
+        ],
+        'outputs': [f'results/{PREFIX}_interactive_map.html'],
+    },
+    {
+        'name': 'vector_tiles',
+        'script': 'src/visualization/export_vector_tiles.py',
+        'inputs': [
+            'data/processed/categorized_pois.parquet',
+            'data/processed/seasonal_pois.parquet',
+            'data/processed/isochrones.geojson',
+            'data/processed/high_potential_areas.parquet',
+        ],
+        'outputs': [f'results/tiles/{PREFIX}.mbtiles'],
+    },
+    {
+        'name': 'tourism_plots',
+        'script': 'src/visualization/direct_tourism_visualization.py',
+        'inputs': [],
+        'outputs': [
+            'results/plots/yearly_trend.png',
+            'results/plots/seasonal_pattern.png',
+            'results/plots/origin_countries.png',
+            'results/plots/tourism_dashboard.png',
+        ],
+        'requires': ['stats'],
+    },
+]
+
+
+def load_state(path=STATE_PATH):
+    """Lädt den Zustand des letzten Laufs (Fingerabdrücke und Datei-Hashes)"""
+    if os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Pipeline-Zustand konnte nicht gelesen werden, starte neu: {e}")
+    return {'stages': {}, 'files': {}}
+
+
+def save_state(state, path=STATE_PATH):
+    """Speichert den Zustand atomar"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def file_hash(path, file_cache):
+    """
+    Berechnet den SHA-256-Hash einer Datei. Hashes werden über Grösse und
+    Änderungszeit zwischengespeichert, damit grosse Dateien nicht bei jedem
+    Lauf neu gelesen werden müssen.
+    """
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    cached = file_cache.get(path)
+    if cached and cached['stamp'] == stamp:
+        return cached['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    file_cache[path] = {'stamp': stamp, 'sha256': digest.hexdigest()}
+    return file_cache[path]['sha256']
+
+
+def project_path(path):
+    """Pfade unter src/ beziehen sich auf das Projekt, alle anderen auf das Arbeitsverzeichnis"""
+    return os.path.join(PROJECT_DIR, path) if path.startswith('src/') else path
+
+
+def shared_code_files():
+    files = []
+    for pattern in SHARED_CODE:
+        files.extend(glob.glob(pattern, root_dir=PROJECT_DIR))
+    return sorted(files)
+
+
+def stage_fingerprint(stage, file_cache):
+    """Fingerabdruck aus Skript, gemeinsamem Code, Parametern und Eingaben"""
+    digest = hashlib.sha256()
+    code_files = [stage['script']] + shared_code_files()
+    for path in code_files + stage['inputs']:
+        digest.update(path.encode('utf-8'))
+        if os.path.exists(project_path(path)):
+            digest.update(file_hash(project_path(path), file_cache).encode('ascii'))
+        else:
+            digest.update(b'<fehlt>')
+    digest.update(json.dumps(stage.get('args', [])).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def region_stages(stages, region):
+    """
+    Stufen ohne die, deren Voraussetzungen in der Region fehlen (z.B.
+    Statistikquelle, Saisonprofil); die übersprungenen werden gemeldet
+    """
+    kept, skipped = [], []
+    for stage in stages:
+        if all(region.get(key) for key in stage.get('requires', [])):
+            kept.append(stage)
+        else:
+            skipped.append(f"{stage['name']} (ohne {', '.join(stage['requires'])})")
+    if skipped:
+        print(f"Für {region['name']} entfallen: {'; '.join(skipped)}")
+    return kept
+
+
+def build_graph(stages):
+    """Ermittelt für jede Stufe die vorgelagerten Stufen über ihre Dateien"""
+    producers = {}
+    for stage in stages:
+        for output in stage['outputs']:
+            if output in producers:
+                raise ValueError(f"Datei {output} wird von mehreren Stufen geschrieben")
+            producers[output] = stage['name']
+
+    upstream = {}
+    for stage in stages:
+        upstream[stage['name']] = sorted({
+            producers[path] for path in stage['inputs'] if path in producers
+        })
+    return upstream
+
+
+def select_stages(stages, upstream, targets):
+    """Wählt die Zielstufen samt aller vorgelagerten Stufen aus"""
+    names = [stage['name'] for stage in stages]
+    if not targets:
+        return names
+
+    unknown = [t for t in targets if t not in names]
+    if unknown:
+        raise ValueError(f"Unbekannte Stufen: {', '.join(unknown)}")
+
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(upstream[name])
+    return [name for name in names if name in selected]
+
+
+def is_current(stage, fingerprint, state, force):
+    """Prüft, ob eine Stufe übersprungen werden kann"""
+    outputs_exist = all(os.path.exists(path) for path in stage['outputs'])
+    if force:
+        return False
+    if stage.get('external'):
+        return outputs_exist
+    recorded = state['stages'].get(stage['name'], {})
+    return outputs_exist and recorded.get('fingerprint') == fingerprint
+
+
+def run_stage(stage, run_id):
+    """Führt ein Stufen-Skript in einem eigenen Prozess aus"""
+    start = time.time()
+    command = [sys.executable, project_path(stage['script'])] + stage.get('args', [])
+    env = dict(os.environ, PIPELINE_RUN_ID=run_id, PIPELINE_STAGE=stage['name'])
+    result = subprocess.run(command, capture_output=True, text=True, env=env)
+    return result, time.time() - start
+
+
+def run_pipeline(stages, targets=None, jobs=4, force=(), dry_run=False):
+    """
+    Führt alle veralteten Stufen in Abhängigkeitsreihenfolge aus. Eine Stufe
+    wird erst bewertet, wenn alle vorgelagerten Stufen fertig sind, damit ihr
+    Fingerabdruck die frisch geschriebenen Eingaben sieht. Liefert True, wenn
+    keine Stufe fehlgeschlagen ist.
+    """
+    by_name = {stage['name']: stage for stage in stages}
+    run_id = instrumentation.run_id()
+    durations = {}
+    upstream = build_graph(stages)
+    selected = select_stages(stages, upstream, targets)
+    state = load_state()
+    file_cache = state.setdefault('files', {})
+
+    remaining = {name: set(upstream[name]) & set(selected) for name in selected}
+    done, failed, running = set(), set(), {}
+    executed, would_run = [], set()
+
+    def schedule(executor):
+        for name in list(remaining):
+            if remaining[name] - done:
+                if remaining[name] & failed:
+                    print(f"[übersprungen] {name}: vorgelagerte Stufe fehlgeschlagen")
+                    failed.add(name)
+                    del remaining[name]
+                continue
+            del remaining[name]
+            stage = by_name[name]
+            fingerprint = stage_fingerprint(stage, file_cache)
+            stale_upstream = set(upstream[name]) & would_run
+            if not stale_upstream and is_current(stage, fingerprint, state,
+                                                 name in force or 'all' in force):
+                print(f"[aktuell] {name}")
+                done.add(name)
+                continue
+            if dry_run:
+                print(f"[würde laufen] {name}")
+                would_run.add(name)
+                done.add(name)
+                continue
+            print(f"[starte] {name}: {stage['script']}")
+            running[executor.submit(run_stage, stage, run_id)] = name
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        schedule(executor)
+        while running or remaining:
+            if not running:
+                # Nur noch Stufen mit fehlgeschlagenen Vorgängern übrig
+                schedule(executor)
+                if not running:
+                    break
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                stage = by_name[name]
+                result, duration = future.result()
+                durations[name] = round(duration, 2)
+                if result.returncode == 0:
+                    state['stages'][name] = {
+                        'fingerprint': stage_fingerprint(stage, file_cache),
+                        'outputs': {
+                            path: file_hash(path, file_cache)
+                            for path in stage['outputs'] if os.path.exists(path)
+                        },
+                        'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    }
+                    save_state(state)
+                    done.add(name)
+                    executed.append(name)
+                    print(f"[fertig] {name} ({duration:.1f} s)")
+                else:
+                    failed.add(name)
+                    print(f"[fehlgeschlagen] {name} (Exit-Code {result.returncode})")
+                    print(result.stdout[-2000:])
+                    print(result.stderr[-2000:], file=sys.stderr)
+            schedule(executor)
+
+    if not dry_run:
+        save_state(state)
+    if not dry_run and (executed or failed):
+        summary = instrumentation.write_summary(run_id, durations)
+        if summary['phases']:
+            print(f"\nProfil des Laufs {run_id}:")
+            print(instrumentation.format_summary(summary))
+    ran = len(would_run) if dry_run else len(executed)
+    print(f"\n{ran} Stufen {'auszuführen' if dry_run else 'ausgeführt'}, "
+          f"{len(failed)} fehlgeschlagen, {len(selected) - ran - len(failed)} aktuell.")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inkrementeller Pipeline-Runner")
+    parser.add_argument('targets', nargs='*', help="Zielstufen (Standard: alle)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Maximale Anzahl parallel laufender Stufen")
+    parser.add_argument('--force', action='append', default=[], metavar='STUFE',
+                        help="Stufe auch dann ausführen, wenn sie aktuell ist ('all' für alle)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Nur anzeigen, welche Stufen laufen würden")
+    parser.add_argument('--list', action='store_true', help="Stufen und Abhängigkeiten auflisten")
+    parser.add_argument('--profile', metavar='LAUF', help="Profil eines früheren Laufs ausgeben")
+    args = parser.parse_args()
+
+    if args.profile:
+        summary = instrumentation.summarize(instrumentation.read_records(args.profile))
+        print(instrumentation.format_summary(summary))
+        return
+
+    stages = region_stages(STAGES, current_region())
+    if args.list:
+        upstream = build_graph(stages)
+        for stage in stages:
+            deps = ', '.join(upstream[stage['name']]) or '-'
+            print(f"{stage['name']:<18} <- {deps}")
+        return
+
+    ok = run_pipeline(stages, targets=args.targets, jobs=args.jobs,
+                      force=set(args.force), dry_run=args.dry_run)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
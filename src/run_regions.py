@@ -0,0 +1,140 @@
+"""
+Batch-Modus: die ganze Pipeline für mehrere Regionen parallel
+
+Jede Region aus src/regions.json erhält ein eigenes Arbeitsverzeichnis
+regions/<kürzel>/ mit data/, results/ und dem Pipeline-Zustand; darin läuft
+run_pipeline.py als eigener Prozess, mit der Region in GEO_REGION. Die Caches
+für OSM-Antworten, Hintergrundkacheln und Isochronen liegen für alle Regionen
+gemeinsam unter cache/ (GEO_CACHE_ROOT). Statische Eingaben (Saisonprofil,
+Herkunftsländer ...) werden nur kopiert, wenn die Region sie angibt
+('seasonal_profile', 'inputs'); Regionen ohne Saisonprofil bzw. Statistik-
+quelle überspringen die zugehörigen Stufen (siehe run_pipeline.py).
+
+Aufruf (aus dem Projektverzeichnis):
+    python src/run_regions.py                    # alle Regionen
+    python src/run_regions.py bern luzern -p 2   # zwei Regionen gleichzeitig
+    python src/run_regions.py --targets potential_areas interactive_map
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.region import REGIONS_PATH, load_regions
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNNER = os.path.join(PROJECT_DIR, 'src', 'run_pipeline.py')
+WORKSPACE_DIR = 'regions'
+
+# Ziel des Saisonprofils im Arbeitsverzeichnis (gelesen von seasonal_analysis.py)
+SEASONAL_PROFILE_PATH = 'data/raw/seasonal_distribution.csv'
+
+
+def prepare_workspace(region, root=WORKSPACE_DIR):
+    """
+    Legt das Arbeitsverzeichnis an und kopiert die fehlenden Eingaben der
+    Region; liefert (Arbeitsverzeichnis, kopierte Dateien)
+    """
+    workspace = os.path.abspath(os.path.join(root, region['slug']))
+    # 'inputs' der Region: {ziel im Arbeitsverzeichnis: quelle relativ zum Projekt}
+    inputs = dict(region.get('inputs') or {})
+    if region.get('seasonal_profile'):
+        inputs[SEASONAL_PROFILE_PATH] = region['seasonal_profile']
+    copied = []
+    for target, source in inputs.items():
+        source = os.path.join(PROJECT_DIR, source)
+        destination = os.path.join(workspace, target)
+        if os.path.exists(destination):
+            continue
+        if not os.path.exists(source):
+            print(f"WARNUNG: Eingabe {source} für {region['slug']} fehlt.")
+            continue
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copy2(source, destination)
+        copied.append(target)
+    os.makedirs(os.path.join(workspace, 'logs'), exist_ok=True)
+    return workspace, copied
+
+
+def run_region(region, workspace, runner_args, batch_id, cache_root):
+    """Führt run_pipeline.py im Arbeitsverzeichnis der Region aus; liefert (Exit-Code, Dauer, Log)"""
+    start = time.time()
+    env = dict(os.environ,
+               GEO_REGION=json.dumps(region, ensure_ascii=False),
+               GEO_CACHE_ROOT=cache_root,
+               PIPELINE_RUN_ID=f"{batch_id}-{region['slug']}")
+    log_path = os.path.join(workspace, 'logs', f'{batch_id}.log')
+    with open(log_path, 'w', encoding='utf-8') as log:
+        result = subprocess.run([sys.executable, RUNNER] + runner_args, cwd=workspace, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+    return result.returncode, time.time() - start, log_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline für mehrere Regionen parallel ausführen")
+    parser.add_argument('regions', nargs='*', help="Kürzel der Regionen (Standard: alle)")
+    parser.add_argument('--config', default=REGIONS_PATH, help="Regionenliste (JSON)")
+    parser.add_argument('--workspaces', default=WORKSPACE_DIR,
+                        help="Verzeichnis der Arbeitsverzeichnisse pro Region")
+    parser.add_argument('--cache-root', default=os.environ.get('GEO_CACHE_ROOT', 'cache'),
+                        help="Gemeinsames Cache-Verzeichnis aller Regionen")
+    parser.add_argument('-p', '--processes', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Anzahl gleichzeitig laufender Regionen")
+    parser.add_argument('-j', '--jobs', type=int, default=2,
+                        help="Parallele Stufen innerhalb einer Region")
+    parser.add_argument('--targets', nargs='+', default=[], metavar='STUFE',
+                        help="Nur diese Stufen (samt Vorgängern) ausführen")
+    parser.add_argument('--force', action='append', default=[], metavar='STUFE',
+                        help="An run_pipeline.py weitergegeben")
+    parser.add_argument('--dry-run', action='store_true', help="An run_pipeline.py weitergegeben")
+    args = parser.parse_args()
+
+    regions = load_regions(args.config)
+    if args.regions:
+        known = {region['slug']: region for region in regions}
+        unknown = [slug for slug in args.regions if slug not in known]
+        if unknown:
+            print(f"Unbekannte Regionen: {', '.join(unknown)} (siehe {args.config})")
+            sys.exit(1)
+        regions = [known[slug] for slug in args.regions]
+
+    runner_args = list(args.targets) + ['--jobs', str(args.jobs)]
+    for stage in args.force:
+        runner_args += ['--force', stage]
+    if args.dry_run:
+        runner_args.append('--dry-run')
+
+    batch_id = time.strftime('%Y%m%d-%H%M%S')
+    cache_root = os.path.abspath(args.cache_root)
+    print(f"Starte {len(regions)} Regionen ({args.processes} gleichzeitig), Cache: {cache_root}")
+
+    # Jede Region läuft als eigener Prozess; die Threads warten nur auf die Prozesse
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, args.processes)) as executor:
+        futures = {}
+        for region in regions:
+            workspace, copied = prepare_workspace(region, args.workspaces)
+            print(f"[starte] {region['slug']}: {workspace}")
+            if copied:
+                print(f"  Eingaben kopiert: {', '.join(copied)}")
+            futures[executor.submit(run_region, region, workspace, runner_args,
+                                    batch_id, cache_root)] = region
+        for future in as_completed(futures):
+            region = futures[future]
+            returncode, duration, log_path = future.result()
+            if returncode == 0:
+                print(f"[fertig] {region['slug']} ({duration:.1f} s)")
+            else:
+                failed.append(region['slug'])
+                print(f"[fehlgeschlagen] {region['slug']} (Exit-Code {returncode}, Log: {log_path})")
+
+    print(f"\n{len(regions) - len(failed)} Regionen fertig, {len(failed)} fehlgeschlagen.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
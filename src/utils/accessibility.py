@@ -0,0 +1,60 @@
+"""
+Fusswegdistanz von jedem Netzknoten zum nächsten POI einer Gruppe
+
+Statt einer Suche pro POI wird eine einzige Dijkstra-Suche pro Gruppe
+ausgeführt: Ein virtueller Startknoten ist mit allen POI-Knoten verbunden
+(Kantengewicht = Distanz vom POI zu seinem Netzknoten), gesucht wird auf dem
+umgekehrten Graphen. Das Ergebnis ist für jeden Knoten die Distanz zum
+nächstgelegenen POI. Rasterzellen werden gesammelt über den KD-Baum an das
+Netz angebunden; ihre Anbindungsdistanz wird addiert.
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+# Minimales Kantengewicht für den virtuellen Startknoten (Nullgewichte wären keine Kanten)
+_MIN_OFFSET = 1e-3
+
+
+def reversed_with_super_source(store, nodes, offsets):
+    """
+    Umgekehrter Graph mit zusätzlichem Knoten (Index n_nodes), der mit den
+    Knoten nodes verbunden ist. Mehrere POIs am selben Knoten zählen mit der
+    kürzesten Anbindung.
+    """
+    n = store.n_nodes
+    best = np.full(n, np.inf)
+    np.minimum.at(best, np.asarray(nodes, dtype=np.int64), np.asarray(offsets, dtype=float))
+    targets = np.flatnonzero(np.isfinite(best))
+
+    reverse = store.matrix().T.tocoo()
+    rows = np.concatenate([reverse.row, np.full(len(targets), n)])
+    cols = np.concatenate([reverse.col, targets])
+    data = np.concatenate([reverse.data, np.maximum(best[targets], _MIN_OFFSET)])
+    return csr_matrix((data, (rows, cols)), shape=(n + 1, n + 1))
+
+
+def distance_to_nearest(store, nodes, offsets=None, limit=np.inf):
+    """
+    Netzdistanz (Meter) von jedem Knoten zum nächsten der Knoten nodes,
+    inklusive Anbindungsdistanz offsets. Nicht erreichbare Knoten: inf.
+    """
+    if len(nodes) == 0:
+        return np.full(store.n_nodes, np.inf)
+    offsets = np.zeros(len(nodes)) if offsets is None else offsets
+    graph = reversed_with_super_source(store, nodes, offsets)
+    distances = dijkstra(graph, directed=True, indices=store.n_nodes, limit=limit)
+    return distances[:store.n_nodes]
+
+
+def walking_minutes(node_distances, point_nodes, snap_distances, meters_per_minute, max_snap=None):
+    """
+    Gehzeit in Minuten für Punkte, die an die Knoten point_nodes angebunden
+    sind (Anbindungsdistanz snap_distances). Nicht erreichbare Punkte und
+    Punkte weiter als max_snap vom Netz erhalten NaN.
+    """
+    total = node_distances[point_nodes] + snap_distances
+    minutes = np.where(np.isfinite(total), total / meters_per_minute, np.nan)
+    if max_snap is not None:
+        minutes[snap_distances > max_snap] = np.nan
+    return minutes
@@ -0,0 +1,133 @@
+"""
+Hintergrundkarten aus einem persistenten Kachel-Cache
+
+Kacheln werden unter cache/tiles/<anbieter>/<z>/<x>/<y>.png abgelegt und
+danach nie wieder geladen. seed() füllt den Cache für ein Gebiet und mehrere
+Zoomstufen im Voraus (parallel), add_basemap() setzt das Hintergrundbild aus
+dem Cache zusammen und lädt nur fehlende Kacheln nach. Im Offline-Modus wird
+ausschliesslich der Cache verwendet; fehlende Kacheln werden gemeldet statt
+die Karte stillschweigend ohne Hintergrund zu speichern.
+Koordinaten in Web Mercator (EPSG:3857), Kachelmathematik aus utils.tiles.
+"""
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from utils.region import cache_dir
+from utils.tiles import HALF_WORLD, tile_bounds, tiles_for_bounds
+
+TILE_CACHE_DIR = cache_dir('tiles')
+DEFAULT_PROVIDER = 'CartoDB.Positron'
+TILE_PIXELS = 256
+# Zoomstufe so wählen, dass die Kartenbreite etwa so viele Kacheln umfasst
+TARGET_TILES_ACROSS = 6
+# Rand um das Gebiet (Anteil der Breite bzw. Höhe), gleich für Karten und seed_basemap.py
+MAP_PADDING = 0.1
+MAX_ZOOM = 19
+
+
+def provider_url(provider, z, x, y):
+    """URL einer Kachel für einen contextily/xyzservices-Anbieter ('CartoDB.Positron')"""
+    import contextily as cx
+
+    return cx.providers.query_name(provider).build_url(x=x, y=y, z=z)
+
+
+def tile_path(provider, z, x, y, cache_dir=TILE_CACHE_DIR):
+    return os.path.join(cache_dir, provider, str(z), str(x), f'{y}.png')
+
+
+def fetch_tile(provider, z, x, y, offline=False, cache_dir=TILE_CACHE_DIR, timeout=30):
+    """Pfad der Kachel im Cache; lädt sie bei Bedarf. None, falls nicht verfügbar"""
+    path = tile_path(provider, z, x, y, cache_dir)
+    if os.path.exists(path):
+        return path
+    if offline:
+        return None
+    try:
+        response = requests.get(provider_url(provider, z, x, y), timeout=timeout,
+                                headers={'User-Agent': 'zuerich-geo-marketing'})
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Kachel {z}/{x}/{y} konnte nicht geladen werden: {e}")
+        return None
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(response.content)
+    os.replace(tmp_path, path)
+    return path
+
+
+def auto_zoom(bounds):
+    """Zoomstufe für ein Gebiet (xmin, ymin, xmax, ymax) in Web Mercator"""
+    width = max(bounds[2] - bounds[0], bounds[3] - bounds[1], 1.0)
+    zoom = math.log2(2 * HALF_WORLD * TARGET_TILES_ACROSS / width)
+    return int(min(MAX_ZOOM, max(0, round(zoom))))
+
+
+def map_bounds(bounds, padding=MAP_PADDING):
+    """Kartenausschnitt: bounds (Web Mercator) mit Rand"""
+    minx, miny, maxx, maxy = bounds
+    pad_x, pad_y = (maxx - minx) * padding, (maxy - miny) * padding
+    return (minx - pad_x, miny - pad_y, maxx + pad_x, maxy + pad_y)
+
+
+def seed(bounds, zooms, provider=DEFAULT_PROVIDER, cache_dir=TILE_CACHE_DIR, threads=8):
+    """Lädt alle Kacheln für bounds auf den Zoomstufen zooms; liefert (vorhanden, fehlend)"""
+    tiles = [tile for z in zooms for tile in tiles_for_bounds(bounds, z)]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        paths = list(pool.map(lambda t: fetch_tile(provider, *t, cache_dir=cache_dir), tiles))
+    missing = sum(path is None for path in paths)
+    return len(tiles) - missing, missing
+
+
+def mosaic(bounds, zoom, provider=DEFAULT_PROVIDER, offline=False, cache_dir=TILE_CACHE_DIR):
+    """
+    Setzt die Kacheln für bounds zu einem RGBA-Bild zusammen. Liefert
+    (bild, extent, anzahl_fehlender_kacheln); extent wie bei imshow.
+    """
+    import matplotlib.image as mpimg
+
+    tiles = tiles_for_bounds(bounds, zoom)
+    xs = sorted({x for _, x, _ in tiles})
+    ys = sorted({y for _, _, y in tiles})
+    image = np.ones((len(ys) * TILE_PIXELS, len(xs) * TILE_PIXELS, 4), dtype=np.float32)
+    image[..., 3] = 0
+    missing = 0
+    for z, x, y in tiles:
+        path = fetch_tile(provider, z, x, y, offline=offline, cache_dir=cache_dir)
+        if path is None:
+            missing += 1
+            continue
+        tile = mpimg.imread(path, format='png')
+        if tile.dtype == np.uint8:
+            tile = tile.astype(np.float32) / 255
+        if tile.ndim == 2:
+            tile = np.dstack([tile] * 3)
+        if tile.shape[2] == 3:
+            tile = np.dstack([tile, np.ones(tile.shape[:2], dtype=np.float32)])
+        row, col = ys.index(y) * TILE_PIXELS, xs.index(x) * TILE_PIXELS
+        image[row:row + TILE_PIXELS, col:col + TILE_PIXELS] = tile[:TILE_PIXELS, :TILE_PIXELS]
+
+    west, _, _, north = tile_bounds(zoom, xs[0], ys[0])
+    _, south, east, _ = tile_bounds(zoom, xs[-1], ys[-1])
+    return image, (west, east, south, north), missing
+
+
+def add_basemap(ax, zoom=None, provider=DEFAULT_PROVIDER, offline=False, cache_dir=TILE_CACHE_DIR):
+    """Ersatz für contextily.add_basemap mit Kachel-Cache (Achsen in EPSG:3857)"""
+    xmin, xmax = ax.get_xlim()
+    ymin, ymax = ax.get_ylim()
+    bounds = (xmin, ymin, xmax, ymax)
+    zoom = auto_zoom(bounds) if zoom is None else zoom
+    image, extent, missing = mosaic(bounds, zoom, provider, offline, cache_dir)
+    if missing:
+        print(f"WARNUNG: {missing} Hintergrundkacheln (Zoom {zoom}) fehlen im Cache.")
+    ax.imshow(image, extent=extent, interpolation='bilinear', zorder=0)
+    ax.set_xlim(xmin, xmax)
+    ax.set_ylim(ymin, ymax)
+    return missing
@@ -0,0 +1,69 @@
+"""
+Tabellengesteuerte Kategorisierung von POIs
+
+Die Regeln stehen in einer CSV-Tabelle mit den Spalten
+    priority, category, tag, values
+'values' ist eine mit '|' getrennte Liste erlaubter Tag-Werte, '*' steht für
+jeden vorhandenen Wert. Jede Regel wird in eine vektorisierte Spaltenmaske
+übersetzt; ein POI erhält die Kategorie der ersten zutreffenden Regel nach
+Priorität (kleinere Zahl zuerst), sonst die Standardkategorie.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_CATEGORY = 'Sonstiges'
+ANY_VALUE = '*'
+
+
+def load_rules(path):
+    """Lädt die Regeltabelle und sortiert sie nach Priorität"""
+    rules = pd.read_csv(path, dtype={'category': str, 'tag': str, 'values': str})
+    missing = {'priority', 'category', 'tag', 'values'} - set(rules.columns)
+    if missing:
+        raise ValueError(f"Regeltabelle {path} ohne Spalten: {sorted(missing)}")
+
+    # Leere Zellen liest pandas als NaN; solche Regeln passen auf nichts
+    values = rules['values'].fillna('').str.strip()
+    empty = values == ''
+    if empty.any():
+        print(f"WARNUNG: Regeln ohne Werte in {path} werden ignoriert: "
+              f"{', '.join(rules.loc[empty, 'category'] + '/' + rules.loc[empty, 'tag'])}")
+        rules, values = rules[~empty].copy(), values[~empty]
+
+    rules['values'] = values.map(
+        lambda v: None if v == ANY_VALUE
+        else frozenset(x.strip() for x in v.split('|') if x.strip())
+    )
+    return rules.sort_values('priority', kind='stable').reset_index(drop=True)
+
+
+def rule_masks(df, rules):
+    """Übersetzt jede Regel in eine boolesche Maske über alle Zeilen"""
+    masks = []
+    for rule in rules.itertuples(index=False):
+        if rule.tag not in df.columns:
+            masks.append(np.zeros(len(df), dtype=bool))
+            continue
+        column = df[rule.tag]
+        if rule.values is None:
+            masks.append(column.notna().to_numpy())
+        else:
+            masks.append(column.isin(rule.values).to_numpy())
+    return masks
+
+
+def categorize(df, rules, default=DEFAULT_CATEGORY):
+    """
+    Weist allen Zeilen in einem Durchgang ihre Kategorie zu und liefert eine
+    kategoriale Serie mit dem Index von df
+    """
+    categories = list(dict.fromkeys(list(rules['category']) + [default]))
+    default_code = categories.index(default)
+    if len(df) == 0 or len(rules) == 0:
+        codes = np.full(len(df), default_code)
+    else:
+        codes = np.select(rule_masks(df, rules),
+                          [categories.index(c) for c in rules['category']],
+                          default=default_code)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories),
+                     index=df.index, name='category')
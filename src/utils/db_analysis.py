@@ -0,0 +1,165 @@
+"""
+Potenzialanalyse direkt in PostGIS
+
+Grid, POI-Zählung, Hotspot-Mittel und Potenzialwert werden als eine
+mengenbasierte SQL-Abfrage berechnet; zum Client gelangen nur die Zellen
+oberhalb des Quantils, und zwar blockweise über einen serverseitigen Cursor.
+Erwartet die Tabellen von import_to_postgis.py (Grenze der Region, z.B.
+zurich_boundary, categorized_pois, hotspot_analysis, für das
+Erreichbarkeitskriterium accessibility). Distanzen werden in LV95 gerechnet; für
+Tabellen in anderen Koordinatensystemen wird ein funktionaler GiST-Index auf
+ST_Transform(geometry, 2056) angelegt, damit ST_DWithin ihn nutzen kann.
+"""
+import geopandas as gpd
+import pandas as pd
+import shapely
+from psycopg2 import sql
+
+from utils.region import boundary_table
+
+METRIC_SRID = 2056  # CH1903+ / LV95
+CHUNK_SIZE = 10_000
+
+# Gleiche Logik wie identify_potential_areas.py (Backend geopandas), samt
+# Gewichtung mit der Gehzeit ({walk_minutes}: Wert der Rasterzelle am Grid-Punkt oder NULL)
+POTENTIAL_SQL = """
+WITH boundary AS (
+    SELECT ST_Transform(ST_Union(geometry), %(srid)s) AS geom,
+           max(ST_SRID(geometry)) AS output_srid
+    FROM {boundary}
+),
+grid AS (
+    SELECT 'grid_' || (row_number() OVER (ORDER BY x, y) - 1) AS grid_id, pt.geom
+    FROM boundary b,
+         generate_series(ST_XMin(b.geom)::numeric, ST_XMax(b.geom)::numeric, %(cell_size)s) AS x,
+         generate_series(ST_YMin(b.geom)::numeric, ST_YMax(b.geom)::numeric, %(cell_size)s) AS y,
+         LATERAL (SELECT ST_SetSRID(ST_MakePoint(x, y), %(srid)s) AS geom) AS pt
+    WHERE x < ST_XMax(b.geom) AND y < ST_YMax(b.geom)
+      AND ST_Contains(b.geom, pt.geom)
+),
+scored AS (
+    SELECT g.grid_id, g.geom,
+           (SELECT count(*) FROM categorized_pois p
+            WHERE ST_DWithin({poi_geom}, g.geom, %(buffer)s)) AS poi_count,
+           COALESCE((SELECT avg(h.density) FROM hotspot_analysis h
+                     WHERE ST_DWithin({hotspot_geom}, g.geom, %(buffer)s)), 0) AS hotspot_value,
+           {walk_minutes} AS walk_minutes
+    FROM grid g
+),
+weighted AS (
+    -- Ausserhalb des Rasters oder unerreichbar (NULL) ist das Gewicht 0
+    SELECT *,
+           CASE WHEN %(use_access)s
+                THEN COALESCE(GREATEST(0, LEAST(1, 1 - walk_minutes / %(access_minutes)s)), 0)
+                ELSE 1 END AS access
+    FROM scored
+),
+normalized AS (
+    SELECT *,
+           CASE WHEN max(poi_count) OVER () > 0 AND max(hotspot_value) OVER () > 0
+                THEN (1 - poi_count::float8 / max(poi_count) OVER ())
+                     * (hotspot_value / max(hotspot_value) OVER ()) * access
+                ELSE 0 END AS potential
+    FROM weighted
+),
+threshold AS (
+    SELECT percentile_cont(%(quantile)s) WITHIN GROUP (ORDER BY potential) AS value
+    FROM normalized
+)
+SELECT n.grid_id, n.poi_count, n.hotspot_value, n.walk_minutes, n.access, n.potential,
+       ST_AsBinary(ST_Transform(n.geom, b.output_srid)) AS geom, b.output_srid
+FROM normalized n, threshold t, boundary b
+WHERE n.potential >= t.value
+ORDER BY n.grid_id
+"""
+
+
+def table_srid(cur, table, column='geometry'):
+    cur.execute('SELECT Find_SRID(current_schema(), %s, %s)', (table, column))
+    return cur.fetchone()[0]
+
+
+def metric_geometry(cur, table, alias, srid=METRIC_SRID):
+    """
+    Geometrieausdruck in LV95 für die Abfrage; liegt die Tabelle in einem
+    anderen System, wird der passende funktionale Index angelegt
+    """
+    column = sql.SQL('{}.geometry').format(sql.Identifier(alias))
+    if table_srid(cur, table) == srid:
+        return column
+    cur.execute(sql.SQL(
+        'CREATE INDEX IF NOT EXISTS {} ON {} USING GIST (ST_Transform(geometry, {}))'
+    ).format(sql.Identifier(f'{table}_geometry_{srid}_gist'), sql.Identifier(table),
+             sql.Literal(srid)))
+    cur.execute(sql.SQL('ANALYZE {}').format(sql.Identifier(table)))
+    return sql.SQL('ST_Transform({}, {})').format(column, sql.Literal(srid))
+
+
+def walk_minutes_expression(cur, band):
+    """
+    Gehzeit der Rasterzelle, in der der Grid-Punkt liegt: nächster Zellmittelpunkt
+    der Tabelle accessibility (Rasterzellen als Punkte) innerhalb einer halben
+    Zellendiagonale. NaN (unerreichbar) wird zu NULL.
+    """
+    cur.execute("SELECT to_regclass('accessibility') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        raise ValueError("Tabelle 'accessibility' fehlt; bitte import_to_postgis.py ausführen "
+                         "oder --access-category keine verwenden.")
+    access_geom = metric_geometry(cur, 'accessibility', 'a')
+    return sql.SQL(
+        "(SELECT NULLIF(a.{band}, 'NaN'::float8) FROM accessibility a "
+        "WHERE ST_DWithin({geom}, g.geom, %(access_radius)s) "
+        "ORDER BY {geom} <-> g.geom LIMIT 1)"
+    ).format(band=sql.Identifier(band), geom=access_geom)
+
+
+def potential_areas(conn, cell_size=500, buffer=500, quantile=0.9, access_band=None,
+                    access_minutes=15, access_cell_size=None, boundary=None,
+                    chunk_size=CHUNK_SIZE):
+    """
+    Top-Potenzialzellen als GeoDataFrame im Koordinatensystem der Stadtgrenze.
+    access_band ('minutes_<kategorie>') gewichtet wie im Backend geopandas mit
+    der Gehzeit; access_cell_size ist die Zellgrösse des Erreichbarkeitsrasters.
+    boundary ist die Grenztabelle (Standard: die der aktuellen Region).
+    """
+    boundary = boundary or boundary_table()
+    with conn, conn.cursor() as cur:
+        cur.execute('SELECT to_regclass(%s) IS NOT NULL', (boundary,))
+        if not cur.fetchone()[0]:
+            raise ValueError(f"Tabelle '{boundary}' fehlt; bitte import_to_postgis.py "
+                             f"für diese Region ausführen.")
+        query = sql.SQL(POTENTIAL_SQL).format(
+            boundary=sql.Identifier(boundary),
+            poi_geom=metric_geometry(cur, 'categorized_pois', 'p'),
+            hotspot_geom=metric_geometry(cur, 'hotspot_analysis', 'h'),
+            walk_minutes=(walk_minutes_expression(cur, access_band) if access_band
+                          else sql.SQL('NULL::float8')),
+        )
+        query = query.as_string(cur)
+
+    params = {'srid': METRIC_SRID, 'cell_size': cell_size, 'buffer': buffer,
+              'quantile': quantile, 'use_access': access_band is not None,
+              'access_minutes': float(access_minutes),
+              'access_radius': (access_cell_size or 0) * 0.7072}
+    chunks = []
+    output_srid = None
+    with conn, conn.cursor(name='potential_areas') as cur:
+        cur.itersize = chunk_size
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunk = pd.DataFrame(rows, columns=['grid_id', 'poi_count', 'hotspot_value',
+                                                'walk_minutes', 'access', 'potential', 'geom',
+                                                'output_srid'])
+            output_srid = int(chunk['output_srid'].iloc[0])
+            chunk['geom'] = shapely.from_wkb([bytes(g) for g in chunk['geom']])
+            chunks.append(chunk.drop(columns='output_srid'))
+
+    columns = ['grid_id', 'poi_count', 'hotspot_value', 'walk_minutes', 'access', 'potential',
+               'geom']
+    result = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+    if access_band is None:
+        result = result.drop(columns=['walk_minutes', 'access'])
+    return gpd.GeoDataFrame(result, geometry='geom', crs=output_srid).rename_geometry('geometry')
@@ -0,0 +1,168 @@
+"""
+Komprimierter Festplatten-Cache mit Index, TTL und LRU-Verdrängung
+
+Einträge werden gzip-komprimiert unter <verzeichnis>/<xx>/<schlüssel>.gz
+abgelegt. Ein SQLite-Index hält pro Eintrag Beschreibung (z.B. Abfrage),
+Bounding Box, Zeitstempel, Grösse und ob es sich um ein leeres Ergebnis
+handelt. Abgelaufene Einträge werden verworfen; überschreitet der Cache sein
+Byte-Budget, werden die am längsten nicht benutzten Einträge gelöscht.
+Leere Ergebnisse ("negative" Einträge) haben eine eigene, kürzere Lebensdauer.
+"""
+import gzip
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DAY = 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    query TEXT,
+    bbox TEXT,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL,
+    negative INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+class DiskCache:
+    """Gemeinsam nutzbarer Cache; mehrere Prozesse können denselben Ordner verwenden"""
+
+    def __init__(self, directory, max_bytes=512 * 1024 ** 2, ttl=30 * DAY, negative_ttl=DAY):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Verbindung zum Index; Änderungen werden am Ende des Blocks übernommen"""
+        db = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'), timeout=30)
+        try:
+            db.execute('PRAGMA journal_mode=WAL')
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.gz')
+
+    def _expired(self, created, negative, now):
+        ttl = self.negative_ttl if negative else self.ttl
+        return ttl is not None and now - created > ttl
+
+    def get(self, key, ignore_ttl=False):
+        """Liefert die gespeicherten Bytes oder None (fehlt bzw. abgelaufen)"""
+        now = time.time()
+        with self._lock, self._connect() as db:
+            row = db.execute('SELECT created, negative FROM entries WHERE key = ?',
+                             (key,)).fetchone()
+            if row is None:
+                return None
+            if not ignore_ttl and self._expired(row[0], row[1], now):
+                self._delete(db, key)
+                return None
+            try:
+                with gzip.open(self.entry_path(key), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                # Index und Dateien sind auseinandergelaufen
+                self._delete(db, key)
+                return None
+            db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return data
+
+    def put(self, key, data, query=None, bbox=None, negative=False):
+        """Speichert Bytes komprimiert und verdrängt danach bei Bedarf alte Einträge"""
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO entries '
+                '(key, query, bbox, created, accessed, size, raw_size, negative) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, query, bbox, now, now, os.path.getsize(path), len(data), int(negative))
+            )
+            self._evict(db, now)
+
+    def contains(self, key, ignore_ttl=False):
+        with self._connect() as db:
+            row = db.execute('SELECT created, negative FROM entries WHERE key = ?',
+                             (key,)).fetchone()
+        if row is None:
+            return False
+        return ignore_ttl or not self._expired(row[0], row[1], time.time())
+
+    def _delete(self, db, key):
+        db.execute('DELETE FROM entries WHERE key = ?', (key,))
+        try:
+            os.remove(self.entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, db, now):
+        """Abgelaufene Einträge löschen, dann LRU bis das Byte-Budget eingehalten ist"""
+        removed = 0
+        rows = db.execute('SELECT key, created, negative FROM entries').fetchall()
+        for key, created, negative in rows:
+            if self._expired(created, negative, now):
+                self._delete(db, key)
+                removed += 1
+
+        if self.max_bytes is None:
+            return removed
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return removed
+        for key, size in db.execute(
+                'SELECT key, size FROM entries ORDER BY accessed ASC').fetchall():
+            if total <= self.max_bytes:
+                break
+            self._delete(db, key)
+            total -= size
+            removed += 1
+        return removed
+
+    def prune(self):
+        """Verdrängung explizit auslösen; liefert die Anzahl gelöschter Einträge"""
+        with self._lock, self._connect() as db:
+            return self._evict(db, time.time())
+
+    def clear(self):
+        with self._lock, self._connect() as db:
+            for (key,) in db.execute('SELECT key FROM entries').fetchall():
+                self._delete(db, key)
+
+    def stats(self):
+        """Anzahl Einträge, Grösse komprimiert/unkomprimiert, Anzahl leerer Ergebnisse"""
+        with self._connect() as db:
+            count, size, raw_size, negative = db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0), '
+                'COALESCE(SUM(negative), 0) FROM entries'
+            ).fetchone()
+        return {'entries': count, 'bytes': size, 'raw_bytes': raw_size, 'negative': negative}
+
+    def entries(self):
+        """Alle Indexeinträge, zuletzt benutzte zuerst"""
+        with self._connect() as db:
+            return db.execute(
+                'SELECT key, query, bbox, created, accessed, size, negative '
+                'FROM entries ORDER BY accessed DESC'
+            ).fetchall()
@@ -0,0 +1,172 @@
+"""
+Nebenläufiger, fortsetzbarer Download von Open-Data-Tabellen
+
+Viele Datensätze werden gleichzeitig geladen, begrenzt durch eine maximale
+Anzahl Verbindungen. Für jeden Datensatz wird in <name>.meta.json gespeichert,
+welche ETag/Last-Modified-Werte der Server geliefert hat:
+  - Ist die Datei vollständig vorhanden, wird bedingt angefragt
+    (If-None-Match / If-Modified-Since); 304 heisst "unverändert".
+  - Eine abgebrochene Übertragung (<name>.csv.part) wird mit einer
+    Range-Anfrage fortgesetzt, sofern der Server die Datei nicht geändert hat
+    (If-Range).
+Antworten werden blockweise auf die Festplatte geschrieben und danach
+blockweise in eine Parquet-Datei umgewandelt, der Inhalt liegt also nie
+vollständig im Speicher.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import requests
+
+CHUNK_SIZE = 1 << 20
+
+_local = threading.local()
+
+
+def _session():
+    """Eine requests-Session pro Thread (Verbindungen werden wiederverwendet)"""
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+
+class DownloadResult:
+    """Ergebnis eines Downloads: status ist 'downloaded', 'not_modified' oder 'failed'"""
+
+    def __init__(self, name, status, csv_path=None, parquet_path=None, error=None):
+        self.name = name
+        self.status = status
+        self.csv_path = csv_path
+        self.parquet_path = parquet_path
+        self.error = error
+
+    def __repr__(self):
+        return f"DownloadResult({self.name!r}, {self.status!r})"
+
+
+def _load_meta(path):
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def _save_meta(path, meta):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def csv_to_parquet(csv_path, parquet_path):
+    """Wandelt eine CSV-Datei blockweise in Parquet um"""
+    reader = pa_csv.open_csv(csv_path, read_options=pa_csv.ReadOptions(block_size=CHUNK_SIZE))
+    tmp_path = f'{parquet_path}.tmp'
+    writer = None
+    try:
+        for batch in reader:
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, batch.schema)
+            writer.write_batch(batch)
+        if writer is None:
+            writer = pq.ParquetWriter(tmp_path, reader.schema)
+    except Exception:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+    writer.close()
+    os.replace(tmp_path, parquet_path)
+
+
+def fetch(name, url, dest_dir, timeout=30, retries=3):
+    """Lädt einen Datensatz (blockierend); wird von download_all in Threads ausgeführt"""
+    csv_path = os.path.join(dest_dir, f'{name}.csv')
+    part_path = f'{csv_path}.part'
+    meta_path = os.path.join(dest_dir, f'{name}.meta.json')
+    parquet_path = os.path.join(dest_dir, f'{name}.parquet')
+
+    for attempt in range(1, retries + 1):
+        meta = _load_meta(meta_path)
+        if meta.get('url') != url:
+            meta = {'url': url}
+        validator = meta.get('etag') or meta.get('last_modified')
+
+        headers = {}
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset and validator:
+            headers['Range'] = f'bytes={offset}-'
+            headers['If-Range'] = validator
+        elif os.path.exists(csv_path) and meta.get('complete'):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            with _session().get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 304:
+                    if not os.path.exists(parquet_path):
+                        csv_to_parquet(csv_path, parquet_path)
+                    return DownloadResult(name, 'not_modified', csv_path, parquet_path)
+                if response.status_code == 416 and offset:
+                    # Nichts mehr ab offset: die Teildatei ist bereits vollständig
+                    pass
+                elif response.status_code not in (200, 206):
+                    return DownloadResult(name, 'failed',
+                                          error=f"HTTP Status {response.status_code}")
+                else:
+                    # 206: Teilinhalt anhängen, 200: Server liefert alles neu
+                    mode = 'ab' if response.status_code == 206 else 'wb'
+                    meta.update({
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'complete': False,
+                    })
+                    _save_meta(meta_path, meta)
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+        except requests.RequestException as e:
+            if attempt == retries:
+                return DownloadResult(name, 'failed', error=str(e))
+            time.sleep(2 ** attempt)
+            continue
+        except Exception as e:
+            # Schreib- oder Umwandlungsfehler: kein Grund für einen neuen Versuch
+            return DownloadResult(name, 'failed', error=f"{type(e).__name__}: {e}")
+
+        try:
+            # Erst umwandeln, dann ersetzen: eine unlesbare Antwort (z.B. eine
+            # HTML-Fehlerseite mit Status 200) verdrängt die Kopie des letzten Laufs nicht
+            csv_to_parquet(part_path, parquet_path)
+            os.replace(part_path, csv_path)
+            meta.update({'complete': True, 'fetched': time.strftime('%Y-%m-%d %H:%M:%S')})
+            _save_meta(meta_path, meta)
+        except Exception as e:
+            # Unbrauchbare Teildatei verwerfen, damit der nächste Lauf nicht daran anknüpft
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return DownloadResult(name, 'failed', error=f"{type(e).__name__}: {e}")
+        return DownloadResult(name, 'downloaded', csv_path, parquet_path)
+
+
+async def download_all(datasets, dest_dir, max_connections=8, timeout=30):
+    """
+    Lädt alle Datensätze {name: url} nebenläufig mit höchstens
+    max_connections gleichzeitigen Verbindungen. Liefert {name: DownloadResult}.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    limit = asyncio.Semaphore(max_connections)
+
+    async def run(name, url):
+        async with limit:
+            return await asyncio.to_thread(fetch, name, url, dest_dir, timeout)
+
+    results = await asyncio.gather(*(run(name, url) for name, url in datasets.items()))
+    return {result.name: result for result in results}
@@ -0,0 +1,230 @@
+"""
+Strukturierte Messwerte für die Phasen der Pipeline-Skripte
+
+Eine Phase wird als Kontextmanager gemessen:
+    with phase('kde', rows_in=len(pois)) as record:
+        surfaces = ...
+        record.rows_out = surfaces.size
+Jeder Datensatz enthält Wandzeit, CPU-Zeit, den Spitzen-RSS des Prozesses
+(Höchststand am Ende der Phase und dessen Anstieg während der Phase, dazu
+den Höchststand der Kindprozesse) sowie Ein- und Ausgabezeilen. Die
+Datensätze werden als JSON-Zeilen an logs/metrics/<lauf>.jsonl angehängt.
+Der Lauf kommt aus PIPELINE_RUN_ID (vom Pipeline-Runner gesetzt), die Stufe
+aus PIPELINE_STAGE bzw. dem Skriptnamen; ohne Runner erhält jeder Prozess
+eine eigene Lauf-ID. PIPELINE_METRICS=0 schaltet die Aufzeichnung ab.
+
+summarize() fasst die Datensätze eines Laufs pro Stufe und Phase zusammen,
+to_openmetrics() gibt sie im OpenMetrics-Textformat aus.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_DIR = 'logs/metrics'
+
+_state = threading.local()
+_run_id = None
+
+
+def run_id():
+    """Lauf-ID aus PIPELINE_RUN_ID oder einmal pro Prozess erzeugt"""
+    global _run_id
+    if _run_id is None:
+        _run_id = os.environ.get('PIPELINE_RUN_ID') or \
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    return _run_id
+
+
+def stage_name():
+    if os.environ.get('PIPELINE_STAGE'):
+        return os.environ['PIPELINE_STAGE']
+    return os.path.splitext(os.path.basename(sys.argv[0] or 'interactive'))[0]
+
+
+def enabled():
+    return os.environ.get('PIPELINE_METRICS', '1') != '0'
+
+
+def metrics_path(run, directory=METRICS_DIR):
+    return os.path.join(directory, f'{run}.jsonl')
+
+
+def max_rss_mb(who):
+    """Höchststand des RSS in MB (ru_maxrss ist auf macOS in Bytes, sonst in KB)"""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(who).ru_maxrss
+    return maxrss / 1024 ** 2 if sys.platform == 'darwin' else maxrss / 1024
+
+
+class PhaseRecord:
+    """Messwerte einer Phase; rows_in/rows_out dürfen im Block gesetzt werden"""
+
+    def __init__(self, name, parent, rows_in=None):
+        self.name = name
+        self.parent = parent
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.status = 'ok'
+
+    def to_dict(self):
+        return {key: value for key, value in vars(self).items() if not key.startswith('_')}
+
+
+def _stack():
+    if not hasattr(_state, 'stack'):
+        _state.stack = []
+    return _state.stack
+
+
+def write_record(record, directory=METRICS_DIR):
+    """Hängt einen Datensatz als JSON-Zeile an die Datei des Laufs an"""
+    os.makedirs(directory, exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+    # Eine Zeile pro write-Aufruf, damit parallele Prozesse sich nicht vermischen
+    with open(metrics_path(record['run'], directory), 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+@contextmanager
+def phase(name, rows_in=None):
+    """Misst den Block als Phase name; verschachtelte Phasen kennen ihre Elternphase"""
+    stack = _stack()
+    record = PhaseRecord(name, stack[-1].name if stack else None, rows_in)
+    stack.append(record)
+    started = datetime.now(timezone.utc)
+    rss_before = max_rss_mb(resource.RUSAGE_SELF) if resource else None
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    except BaseException:
+        record.status = 'error'
+        raise
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        stack.pop()
+        if enabled():
+            rss_after = max_rss_mb(resource.RUSAGE_SELF) if resource else None
+            data = {
+                'run': run_id(),
+                'stage': stage_name(),
+                'pid': os.getpid(),
+                'started': started.isoformat(timespec='milliseconds'),
+                'wall_s': round(wall, 4),
+                'cpu_s': round(cpu, 4),
+                'peak_rss_mb': None if rss_after is None else round(rss_after, 1),
+                'rss_growth_mb': None if rss_after is None else round(rss_after - rss_before, 1),
+                'peak_rss_children_mb': (round(max_rss_mb(resource.RUSAGE_CHILDREN), 1)
+                                         if resource else None),
+            }
+            data.update(record.to_dict())
+            data['phase'] = data.pop('name')
+            write_record(data)
+
+
+def read_records(run, directory=METRICS_DIR):
+    path = metrics_path(run, directory)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    """
+    Profil eines Laufs: pro (Stufe, Phase) Anzahl, Summe von Wand- und
+    CPU-Zeit, grösster Spitzen-RSS und Zeilen. Nur Phasen ohne Elternphase
+    zählen zur Stufensumme, damit verschachtelte Zeiten nicht doppelt erscheinen.
+    """
+    phases = {}
+    stages = {}
+    for record in records:
+        key = (record['stage'], record['phase'])
+        entry = phases.setdefault(key, {'stage': key[0], 'phase': key[1], 'count': 0,
+                                        'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None,
+                                        'rows_in': None, 'rows_out': None, 'errors': 0,
+                                        'nested': record.get('parent') is not None})
+        entry['count'] += 1
+        entry['wall_s'] += record['wall_s']
+        entry['cpu_s'] += record['cpu_s']
+        entry['errors'] += record.get('status') == 'error'
+        for field in ['rows_in', 'rows_out']:
+            if record.get(field) is not None:
+                entry[field] = (entry[field] or 0) + record[field]
+        if record.get('peak_rss_mb') is not None:
+            entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0, record['peak_rss_mb'])
+
+        stage = stages.setdefault(record['stage'], {'stage': record['stage'], 'wall_s': 0.0,
+                                                    'cpu_s': 0.0, 'peak_rss_mb': None})
+        if record.get('parent') is None:
+            stage['wall_s'] += record['wall_s']
+            stage['cpu_s'] += record['cpu_s']
+        if record.get('peak_rss_mb') is not None:
+            stage['peak_rss_mb'] = max(stage['peak_rss_mb'] or 0, record['peak_rss_mb'])
+    return {'stages': list(stages.values()), 'phases': list(phases.values())}
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_openmetrics(summary, run):
+    """Zusammenfassung im OpenMetrics-Textformat (ein Gauge pro Kennzahl)"""
+    metrics = [
+        ('pipeline_phase_wall_seconds', 'Wandzeit je Phase', 'wall_s'),
+        ('pipeline_phase_cpu_seconds', 'CPU-Zeit je Phase', 'cpu_s'),
+        ('pipeline_phase_peak_rss_megabytes', 'Spitzen-RSS des Prozesses am Ende der Phase',
+         'peak_rss_mb'),
+        ('pipeline_phase_rows_in', 'Eingabezeilen je Phase', 'rows_in'),
+        ('pipeline_phase_rows_out', 'Ausgabezeilen je Phase', 'rows_out'),
+        ('pipeline_phase_calls', 'Anzahl Aufrufe je Phase', 'count'),
+    ]
+    lines = []
+    for metric, help_text, field in metrics:
+        lines.append(f'# TYPE {metric} gauge')
+        lines.append(f'# HELP {metric} {help_text}')
+        for entry in summary['phases']:
+            if entry.get(field) is None:
+                continue
+            labels = f'run="{_label(run)}",stage="{_label(entry["stage"])}",phase="{_label(entry["phase"])}"'
+            lines.append(f'{metric}{{{labels}}} {entry[field]}')
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def write_summary(run, durations=None, directory=METRICS_DIR):
+    """
+    Schreibt <lauf>.summary.json und <lauf>.prom; durations ({stufe: sekunden},
+    vom Runner gemessen) ergänzt die Gesamtdauer je Stufe. Liefert die Zusammenfassung.
+    """
+    summary = summarize(read_records(run, directory))
+    summary['run'] = run
+    for stage in summary['stages']:
+        stage['duration_s'] = (durations or {}).get(stage['stage'])
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f'{run}.summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(directory, f'{run}.prom'), 'w', encoding='utf-8') as f:
+        f.write(to_openmetrics(summary, run))
+    return summary
+
+
+def format_summary(summary):
+    """Tabellarische Textfassung des Profils"""
+    lines = [f"{'Stufe':<22}{'Phase':<28}{'Zeit (s)':>10}{'CPU (s)':>10}{'RSS (MB)':>10}{'Zeilen':>10}"]
+    for entry in sorted(summary['phases'], key=lambda e: (e['stage'], -e['wall_s'])):
+        rss = '-' if entry['peak_rss_mb'] is None else f"{entry['peak_rss_mb']:.0f}"
+        rows_out = '-' if entry['rows_out'] is None else str(entry['rows_out'])
+        name = ('  ' if entry['nested'] else '') + entry['phase']
+        lines.append(f"{entry['stage']:<22}{name:<28}{entry['wall_s']:>10.2f}"
+                     f"{entry['cpu_s']:>10.2f}{rss:>10}{rows_out:>10}")
+    return '\n'.join(lines)
@@ -0,0 +1,61 @@
+"""
+Bausteine der interaktiven Folium-Karte
+
+POIs werden nicht als ein Folium-Objekt pro Punkt eingefügt, sondern als
+kompakte Zeilen [lat, lon, *Attribute] an FastMarkerCluster übergeben; die
+Marker erzeugt eine JavaScript-Funktion im Browser. Wird von
+create_interactive_map.py und den Benchmarks verwendet.
+"""
+import numpy as np
+from folium import FeatureGroup, plugins
+
+# Koordinaten auf 5 Nachkommastellen (~1 m) runden, das hält das HTML klein
+PRECISION = 5
+
+# Farben für Kategorien
+CATEGORY_COLORS = {
+    'Kultur': 'blue',
+    'Unterkunft': 'green',
+    'Gastronomie': 'red',
+    'Shopping': 'purple',
+    'Attraktion': 'orange',
+    'Sonstiges': 'gray'
+}
+
+# Erst ab Zoomstufe 16 werden alle Marker einzeln gezeigt
+CLUSTER_OPTIONS = {'disableClusteringAtZoom': 16, 'chunkedLoading': True}
+
+
+def marker_rows(gdf, columns=()):
+    """Kompakte Zeilen [lat, lon, *Attribute] für FastMarkerCluster"""
+    rows = np.column_stack([gdf.geometry.y.round(PRECISION), gdf.geometry.x.round(PRECISION)])
+    rows = rows.astype(object)
+    for col in columns:
+        rows = np.column_stack([rows, gdf[col].to_numpy(dtype=object)])
+    return rows.tolist()
+
+
+def circle_callback(color, radius, label):
+    """JavaScript-Fabrik für Kreismarker; label ist ein JS-Ausdruck über row"""
+    return f"""
+    function (row) {{
+        var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {{
+            radius: {radius}, color: '{color}', fillColor: '{color}', fillOpacity: 0.7, weight: 1
+        }});
+        marker.bindTooltip({label});
+        return marker;
+    }}"""
+
+
+def add_category_clusters(m, points, colors=CATEGORY_COLORS):
+    """Ein Cluster-Layer pro Kategorie; points braucht die Spalten name und category (WGS84)"""
+    for category, color in colors.items():
+        cat_layer = FeatureGroup(name=f'Kategorie: {category}')
+        subset = points[points.category == category]
+        if len(subset) > 0:
+            plugins.FastMarkerCluster(
+                marker_rows(subset, ['name']),
+                callback=circle_callback(color, 6, f"'<b>' + row[2] + '</b><br>Kategorie: {category}'"),
+                options=CLUSTER_OPTIONS,
+            ).add_to(cat_layer)
+        cat_layer.add_to(m)
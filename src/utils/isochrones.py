@@ -0,0 +1,195 @@
+"""
+Isochronen mit einer einzigen Kürzeste-Wege-Suche pro Startknoten
+
+Für jeden Startknoten wird genau eine begrenzte Dijkstra-Suche bis zur
+grössten Distanz ausgeführt; die erreichten Knoten werden danach allen
+angefragten Zeitbändern zugeordnet. Gerechnet wird auf dem CSR-Graphen aus
+utils.graph_store. Viele Startknoten werden über einen Prozesspool verteilt;
+jeder Worker öffnet den Graphen einmal als Memory-Map.
+
+IsochroneService legt berechnete Polygone in einem DiskCache ab, adressiert
+über (Graph-Version, Startknoten, Zeitbänder, Geschwindigkeit, Mindestknoten).
+Gleiche Anfragen werden danach nicht mehr gerechnet; das Byte-Budget des
+Caches begrenzt den Platzbedarf (LRU).
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from scipy.sparse.csgraph import dijkstra
+
+from utils.disk_cache import DiskCache
+from utils.graph_store import GraphStore, WALK_GRAPH_DIR
+from utils.instrumentation import phase
+from utils.region import cache_dir
+
+# Unterhalb dieser Anzahl Startknoten lohnt sich kein Prozesspool
+MIN_PARALLEL_SOURCES = 8
+
+# Einheitliches Profil für alle Isochronen und Erreichbarkeitsanalysen
+WALK_SPEED_KMPH = 4.5
+TRAVEL_TIMES = [5, 10, 15]
+# Weniger Knoten ergeben kein sinnvolles Polygon
+MIN_HULL_NODES = 4
+
+ISOCHRONES_PATH = 'data/processed/isochrones.geojson'
+ISOCHRONE_COLUMNS = ['poi_name', 'category', 'time', 'geometry']
+ISOCHRONE_CACHE_DIR = cache_dir('isochrones')
+# Erhöhen, wenn sich die Polygonbildung ändert (macht alte Einträge ungültig)
+_POLYGON_METHOD = 'convex_hull-1'
+
+_worker_store = None
+
+
+def cutoffs_in_meters(travel_times, meters_per_minute):
+    """Rechnet Reisezeiten (Minuten) in Netzdistanzen (Meter) um"""
+    return {minutes: minutes * meters_per_minute for minutes in travel_times}
+
+
+def reachable_bands(store, source, cutoffs):
+    """
+    Eine Dijkstra-Suche bis zur grössten Distanz, danach Zuordnung der
+    Knoten zu allen Bändern. source ist ein Knotenindex, cutoffs
+    {band: distanz}. Liefert {band: knotenindizes mit distanz <= band}
+    (Bänder sind kumulativ).
+    """
+    distances = dijkstra(store.matrix(), directed=True, indices=int(source),
+                         limit=max(cutoffs.values()))
+    reached = np.flatnonzero(np.isfinite(distances))
+    reached_distances = distances[reached]
+    return {band: reached[reached_distances <= cutoff] for band, cutoff in cutoffs.items()}
+
+
+def band_polygons(store, source, cutoffs, min_nodes=1):
+    """
+    Konvexe Hülle der erreichbaren Knoten je Band (in LV95). Bänder mit
+    weniger als min_nodes Knoten werden ausgelassen. Liefert [(band, polygon), ...].
+    """
+    polygons = []
+    for band, nodes in reachable_bands(store, source, cutoffs).items():
+        if len(nodes) < min_nodes:
+            continue
+        coords = np.column_stack([store.node_x[nodes], store.node_y[nodes]])
+        polygons.append((band, shapely.convex_hull(shapely.multipoints(coords))))
+    return polygons
+
+
+def _init_worker(store_path):
+    global _worker_store
+    _worker_store = GraphStore.load(store_path)
+
+
+def _worker_band_polygons(task):
+    source, cutoffs, min_nodes = task
+    return band_polygons(_worker_store, source, cutoffs, min_nodes)
+
+
+def isochrones_for_sources(store, sources, cutoffs, min_nodes=1, processes=None,
+                           store_path=WALK_GRAPH_DIR):
+    """
+    Berechnet die Isochronen-Polygone für alle Startknoten. Die Ergebnisliste
+    entspricht der Reihenfolge von sources.
+    """
+    tasks = [(int(source), cutoffs, min_nodes) for source in sources]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(tasks) < MIN_PARALLEL_SOURCES:
+        return [band_polygons(store, *task) for task in tasks]
+
+    chunksize = max(1, len(tasks) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(store_path,)) as executor:
+        return list(executor.map(_worker_band_polygons, tasks, chunksize=chunksize))
+
+
+def meters_per_minute(speed_kmph=WALK_SPEED_KMPH):
+    return speed_kmph * 1000 / 60
+
+
+class IsochroneService:
+    """Isochronen für Netzknoten, gelesen aus bzw. geschrieben in einen Festplatten-Cache"""
+
+    def __init__(self, store, store_path=WALK_GRAPH_DIR, travel_times=TRAVEL_TIMES,
+                 speed_kmph=WALK_SPEED_KMPH, min_nodes=MIN_HULL_NODES,
+                 cache_dir=ISOCHRONE_CACHE_DIR, max_bytes=256 * 1024 ** 2):
+        self.store = store
+        self.store_path = store_path
+        self.travel_times = sorted(travel_times)
+        self.speed_kmph = speed_kmph
+        self.min_nodes = min_nodes
+        self.cutoffs = cutoffs_in_meters(self.travel_times, meters_per_minute(speed_kmph))
+        # Inhaltsadressiert: Einträge veralten nicht, nur das Byte-Budget zählt
+        self.cache = DiskCache(cache_dir, max_bytes=max_bytes, ttl=None, negative_ttl=None)
+
+    def key(self, node):
+        parts = [self.store.version, int(node), self.travel_times, self.speed_kmph,
+                 self.min_nodes, _POLYGON_METHOD]
+        return hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def _describe(self, node):
+        return (f'node={int(node)} bands={self.travel_times} '
+                f'speed={self.speed_kmph} graph={self.store.version[:12]}')
+
+    def polygons(self, nodes, processes=None):
+        """
+        Liste [(minuten, polygon LV95), ...] je Knoten, in der Reihenfolge
+        von nodes. Nur fehlende Knoten werden (parallel) berechnet.
+        """
+        nodes = [int(node) for node in nodes]
+        results = {}
+        with phase('isochrone_cache', rows_in=len(set(nodes))) as record:
+            for node in set(nodes):
+                data = self.cache.get(self.key(node))
+                if data is not None:
+                    results[node] = [(band, shapely.from_wkb(bytes.fromhex(wkb)))
+                                     for band, wkb in json.loads(data)]
+            record.rows_out = len(results)
+
+        missing = sorted(set(nodes) - set(results))
+        if missing:
+            with phase('ego_graph_searches', rows_in=len(missing)) as record:
+                computed = isochrones_for_sources(self.store, missing, self.cutoffs,
+                                                  min_nodes=self.min_nodes, processes=processes,
+                                                  store_path=self.store_path)
+                record.rows_out = sum(len(polygons) for polygons in computed)
+            for node, polygons in zip(missing, computed):
+                results[node] = polygons
+                data = json.dumps([(band, shapely.to_wkb(polygon, hex=True))
+                                   for band, polygon in polygons])
+                self.cache.put(self.key(node), data.encode('utf-8'),
+                               query=self._describe(node), negative=not polygons)
+        print(f"Isochronen: {len(set(nodes)) - len(missing)} aus dem Cache, "
+              f"{len(missing)} neu berechnet.")
+        return [results[node] for node in nodes]
+
+    def frame(self, nodes, poi_names, categories, processes=None):
+        """GeoDataFrame im einheitlichen Schema (poi_name, category, time) in WGS84"""
+        records = []
+        for name, category, polygons in zip(poi_names, categories,
+                                            self.polygons(nodes, processes)):
+            for minutes, polygon in polygons:
+                records.append({'poi_name': name, 'category': category,
+                                'time': minutes, 'geometry': polygon})
+        gdf = gpd.GeoDataFrame(records, columns=ISOCHRONE_COLUMNS, geometry='geometry',
+                               crs=self.store.crs)
+        return gdf.to_crs(epsg=4326)
+
+
+def poi_names(pois):
+    """Name des POIs, ersatzweise sein Index als Text"""
+    fallback = pois.index.astype(str).to_series(index=pois.index)
+    if 'name' not in pois.columns:
+        return fallback
+    return pois['name'].where(pois['name'].map(lambda v: isinstance(v, str)), fallback)
+
+
+def read_isochrones(path=ISOCHRONES_PATH):
+    """Liest gespeicherte Isochronen im einheitlichen Schema (ältere Dateien werden ergänzt)"""
+    gdf = gpd.read_file(path)
+    for column in ['poi_name', 'category']:
+        if column not in gdf.columns:
+            gdf[column] = None
+    return gdf[ISOCHRONE_COLUMNS]
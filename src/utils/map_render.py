@@ -0,0 +1,66 @@
+"""
+Paralleles Rendern statischer Karten
+
+Die Layer werden einmal geladen und nach Web Mercator projiziert, dann per
+Initialisierer an jeden Worker-Prozess übergeben; jede Karte ist danach nur
+noch ein kleines Dict (Spalte, Titel, Ausgabedatei, optional Kategorie).
+Die Hintergrundkacheln werden vorher im Hauptprozess in den Cache geladen,
+damit die Worker nur noch lokal lesen.
+"""
+import os
+
+import matplotlib
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from utils import basemap
+
+_shared = {}
+
+
+def init_worker(layers, zoom, offline):
+    """Initialisierer: Layer (bereits in EPSG:3857) und Basemap-Einstellungen"""
+    _shared.clear()
+    _shared.update(layers)
+    _shared['zoom'] = zoom
+    _shared['offline'] = offline
+
+
+def render_weight_map(spec):
+    """
+    Zeichnet eine Karte der POIs, eingefärbt und skaliert nach spec['column'].
+    spec: column, title, label, output, optional category und dpi.
+    Liefert (Ausgabepfad, Anzahl fehlender Hintergrundkacheln).
+    """
+    boundary = _shared['boundary']
+    pois = _shared['pois']
+    if spec.get('category'):
+        pois = pois[pois['category'] == spec['category']]
+
+    fig, ax = plt.subplots(figsize=(12, 10))
+
+    # Hintergrund und Grenzen
+    if boundary is not None and not boundary.empty:
+        boundary.plot(ax=ax, alpha=0.5, edgecolor='k')
+
+    column = spec['column']
+    if len(pois) > 0:
+        pois.plot(
+            ax=ax,
+            column=column,
+            cmap='viridis',
+            markersize=pois[column] * 100,  # Größe proportional zur Gewichtung
+            legend=True,
+            legend_kwds={'label': spec['label']},
+            alpha=0.7
+        )
+
+    missing = basemap.add_basemap(ax, zoom=_shared['zoom'], offline=_shared['offline'])
+
+    plt.title(spec['title'], fontsize=16)
+    plt.tight_layout()
+    os.makedirs(os.path.dirname(spec['output']), exist_ok=True)
+    plt.savefig(spec['output'], dpi=spec.get('dpi', 300))
+    plt.close(fig)
+    return spec['output'], missing
@@ -0,0 +1,138 @@
+"""
+Verwalteter Cache für Overpass- und Nominatim-Antworten von osmnx
+
+osmnx legt Antworten standardmässig als unkomprimierte JSON-Dateien ohne
+Index, Ablaufdatum oder Grössenlimit im Ordner cache/ ab. install() leitet
+das Lesen und Schreiben dieser Antworten auf einen DiskCache um:
+  - Einträge gzip-komprimiert, mit Index (Abfrage, Bounding Box, Zeit, Grösse)
+  - TTL und LRU-Verdrängung unter einem Byte-Budget
+  - leere Antworten ('[]' bzw. keine Elemente) werden als negative Einträge
+    mit kürzerer Lebensdauer gespeichert
+  - Offline-Modus: nur Antworten aus dem Cache, unabhängig vom Alter;
+    fehlt eine Antwort, wird CacheMissError ausgelöst statt ins Netz zu gehen
+Vorhandene osmnx-Dateien (<sha1>.json) werden beim ersten Aufruf übernommen.
+"""
+import glob
+import hashlib
+import importlib
+import json
+import os
+import re
+from urllib.parse import parse_qs, urlsplit
+
+from utils.disk_cache import DiskCache, DAY
+from utils.region import cache_dir
+
+CACHE_DIR = cache_dir()
+
+
+class CacheMissError(RuntimeError):
+    """Antwort fehlt im Cache, Netzwerkzugriff ist im Offline-Modus gesperrt"""
+
+
+def cache_key(url):
+    """Gleicher Schlüssel wie osmnx (SHA-1 der URL)"""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def is_negative(response_json):
+    """Leere Antworten: Nominatim '[]' oder Overpass ohne Elemente"""
+    if isinstance(response_json, list):
+        return len(response_json) == 0
+    if isinstance(response_json, dict):
+        return 'elements' in response_json and len(response_json['elements']) == 0
+    return False
+
+
+def describe_url(url):
+    """Ermittelt Abfragetext und (falls erkennbar) Bounding Box einer Anfrage-URL"""
+    params = parse_qs(urlsplit(url).query)
+    query = (params.get('data') or params.get('q') or [url])[0]
+
+    bbox = None
+    poly = re.search(r'poly:["\']([-\d. ]+)["\']', query)
+    if poly:
+        values = [float(v) for v in poly.group(1).split()]
+        lats, lons = values[0::2], values[1::2]
+        bbox = f'{min(lons):.5f},{min(lats):.5f},{max(lons):.5f},{max(lats):.5f}'
+    return query, bbox
+
+
+def _osmnx_http_module():
+    """Modul, in dem osmnx seine Cache-Funktionen definiert (2.x: _http, 1.x: downloader)"""
+    import osmnx as ox
+
+    try:
+        module = importlib.import_module('osmnx._http')
+    except ImportError:
+        module = importlib.import_module('osmnx.downloader')
+    return module, ox.settings
+
+
+def migrate_legacy(cache, directory=CACHE_DIR):
+    """Übernimmt unkomprimierte osmnx-Cachedateien in den verwalteten Cache"""
+    migrated = 0
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        key = os.path.splitext(os.path.basename(path))[0]
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            negative = is_negative(json.loads(data))
+        except (OSError, ValueError) as e:
+            print(f"Cachedatei {path} übersprungen: {e}")
+            continue
+        cache.put(key, data, query='(übernommen aus osmnx-Cache)', negative=negative)
+        os.remove(path)
+        migrated += 1
+    return migrated
+
+
+def open_cache(directory=CACHE_DIR, max_bytes=512 * 1024 ** 2, ttl=30 * DAY, negative_ttl=DAY):
+    return DiskCache(directory, max_bytes=max_bytes, ttl=ttl, negative_ttl=negative_ttl)
+
+
+def install(directory=CACHE_DIR, offline=False, **cache_options):
+    """
+    Hängt den verwalteten Cache in osmnx ein. Muss vor der ersten
+    osmnx-Abfrage aufgerufen werden; liefert den DiskCache.
+    """
+    cache = open_cache(directory, **cache_options)
+    migrated = migrate_legacy(cache, directory)
+    if migrated:
+        print(f"{migrated} osmnx-Cachedateien in den komprimierten Cache übernommen.")
+
+    module, settings = _osmnx_http_module()
+    settings.use_cache = True
+    settings.cache_folder = directory
+
+    def retrieve_from_cache(url, *args, **kwargs):
+        data = cache.get(cache_key(url), ignore_ttl=offline)
+        if data is None:
+            if offline:
+                raise CacheMissError(f"Offline-Modus: keine gespeicherte Antwort für {url}")
+            return None
+        response_json = json.loads(data)
+        # Overpass-Antworten mit 'remark' sind Fehlermeldungen (z.B. Timeout)
+        if isinstance(response_json, dict) and 'remark' in response_json and not offline:
+            return None
+        return response_json
+
+    def save_to_cache(url, response_json, *args, **kwargs):
+        # osmnx 1.x übergibt den HTTP-Status (sc), 2.x ein ok-Flag
+        status = args[0] if args else kwargs.get('ok', kwargs.get('sc', True))
+        if status is not True and status != 200:
+            return
+        query, bbox = describe_url(url)
+        cache.put(cache_key(url), json.dumps(response_json).encode('utf-8'),
+                  query=query, bbox=bbox, negative=is_negative(response_json))
+
+    def url_in_cache(url, *args, **kwargs):
+        key = cache_key(url)
+        if cache.contains(key, ignore_ttl=offline):
+            return cache.entry_path(key)
+        return None
+
+    module._retrieve_from_cache = retrieve_from_cache
+    module._save_to_cache = save_to_cache
+    module._url_in_cache = url_in_cache
+    return cache
@@ -0,0 +1,221 @@
+"""
+Offline-Import aus lokalen .osm.pbf-Extrakten
+
+Liest einen Extrakt mit pyosmium als Datenstrom und erzeugt in einem Lauf
+  - die Gemeindegrenze (administrative Grenze mit passendem Namen),
+  - das Fusswegnetz als Kantenliste (für utils.graph_store),
+  - die touristischen POIs gemäss tourism_tags (Punkte und Flächen).
+Knotenkoordinaten werden in einem dateibasierten Index gehalten, Kanten in
+kompakten Arrays statt Python-Objekten; mehrfach referenzierte Knoten werden
+laufend zusammengefasst, und mit einer Bounding Box werden Wege ausserhalb
+schon beim Lesen verworfen (ohne bekannte Grenze liefert find_boundary sie
+in einem vorgeschalteten Durchgang). So bleibt der Speicherbedarf auch für
+einen Schweiz-Extrakt begrenzt. Für Flächen liest pyosmium die Datei intern
+zweimal (Relationen, dann Geometrien).
+"""
+import os
+import tempfile
+from array import array
+
+import numpy as np
+import osmium
+import shapely.wkb
+
+# Wege, die osmnx für network_type='walk' ausschliesst
+EXCLUDED_HIGHWAYS = {
+    'abandoned', 'bus_guideway', 'construction', 'cycleway', 'motor', 'motorway',
+    'motorway_link', 'no', 'planned', 'platform', 'proposed', 'raceway', 'razed',
+    'rest_area', 'services', 'trunk', 'trunk_link',
+}
+EARTH_RADIUS = 6_371_009  # Meter, wie osmnx
+# Gepufferte Knotenkoordinaten, ab denen Duplikate zusammengefasst werden
+NODE_COMPACT_SIZE = 1_000_000
+
+
+def is_walkable(tags):
+    """Entspricht dem Fusswegfilter von osmnx (vereinfacht)"""
+    highway = tags.get('highway')
+    if highway is None or highway in EXCLUDED_HIGHWAYS:
+        return False
+    if tags.get('area') == 'yes' or tags.get('foot') == 'no':
+        return False
+    if tags.get('service') == 'private' or tags.get('access') == 'private':
+        return False
+    return True
+
+
+def matches_tags(tags, tourism_tags):
+    """Prüft, ob ein Objekt einen der gesuchten Tag-Werte trägt"""
+    for key, values in tourism_tags.items():
+        value = tags.get(key)
+        if value is not None and (values is True or value in values):
+            return True
+    return False
+
+
+class _IngestHandler(osmium.SimpleHandler):
+
+    def __init__(self, tourism_tags, region_names, admin_level, bbox):
+        super().__init__()
+        self.tourism_tags = tourism_tags
+        self.region_names = set(region_names)
+        self.admin_level = admin_level
+        self.bbox = bbox
+        self.wkb = osmium.geom.WKBFactory()
+
+        self.boundary = None
+        self.pois = []
+        # Fusswegnetz: Kanten und Koordinaten der verwendeten Knoten
+        self.edge_u = array('q')
+        self.edge_v = array('q')
+        self.node_ids = array('q')
+        self.node_lon = array('d')
+        self.node_lat = array('d')
+        self._compact_at = NODE_COMPACT_SIZE
+
+    def _compact_nodes(self):
+        """Fasst die Koordinaten mehrfach referenzierter Knoten zusammen (eine pro ID)"""
+        ids, first = np.unique(np.frombuffer(self.node_ids, dtype=np.int64), return_index=True)
+        lon = np.frombuffer(self.node_lon, dtype=np.float64)[first]
+        lat = np.frombuffer(self.node_lat, dtype=np.float64)[first]
+        self.node_ids = array('q', ids.tobytes())
+        self.node_lon = array('d', lon.tobytes())
+        self.node_lat = array('d', lat.tobytes())
+        # Nächste Zusammenfassung erst, wenn wieder so viele neue Einträge dazukommen
+        self._compact_at = len(self.node_ids) + NODE_COMPACT_SIZE
+
+    def _in_bbox(self, location):
+        if self.bbox is None:
+            return True
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        return min_lon <= location.lon <= max_lon and min_lat <= location.lat <= max_lat
+
+    def _poi_record(self, element_type, osmid, tags, geometry):
+        record = {tag.k: tag.v for tag in tags}
+        record.update({'element_type': element_type, 'osmid': osmid, 'geometry': geometry})
+        return record
+
+    def node(self, n):
+        if not matches_tags(n.tags, self.tourism_tags) or not n.location.valid():
+            return
+        if not self._in_bbox(n.location):
+            return
+        geometry = shapely.wkb.loads(self.wkb.create_point(n), hex=True)
+        self.pois.append(self._poi_record('node', n.id, n.tags, geometry))
+
+    def way(self, w):
+        if not is_walkable(w.tags):
+            return
+        nodes = [nd for nd in w.nodes if nd.location.valid()]
+        if len(nodes) < 2 or not any(self._in_bbox(nd.location) for nd in nodes):
+            return
+        oneway = w.tags.get('oneway') == 'yes' and w.tags.get('foot') not in ('yes', 'designated')
+        for a, b in zip(nodes[:-1], nodes[1:]):
+            self.edge_u.append(a.ref)
+            self.edge_v.append(b.ref)
+            if not oneway:
+                self.edge_u.append(b.ref)
+                self.edge_v.append(a.ref)
+        for nd in nodes:
+            self.node_ids.append(nd.ref)
+            self.node_lon.append(nd.location.lon)
+            self.node_lat.append(nd.location.lat)
+        # Kreuzungen werden von mehreren Wegen referenziert: laufend deduplizieren
+        if len(self.node_ids) >= self._compact_at:
+            self._compact_nodes()
+
+    def _is_region_boundary(self, tags):
+        return (
+            self.boundary is None
+            and tags.get('boundary') == 'administrative'
+            and tags.get('name') in self.region_names
+            and (self.admin_level is None or tags.get('admin_level') == str(self.admin_level))
+        )
+
+    def area(self, a):
+        tags = a.tags
+        is_boundary = self._is_region_boundary(tags)
+        is_poi = matches_tags(tags, self.tourism_tags)
+        if not is_boundary and not is_poi:
+            return
+        try:
+            geometry = shapely.wkb.loads(self.wkb.create_multipolygon(a), hex=True)
+        except RuntimeError:
+            # Unvollständige Flächen (z.B. am Rand des Extrakts)
+            return
+
+        if is_boundary:
+            self.boundary = geometry
+        if is_poi:
+            element_type = 'way' if a.from_way() else 'relation'
+            self.pois.append(self._poi_record(element_type, a.orig_id(), tags, geometry))
+
+
+class _BoundaryHandler(_IngestHandler):
+    """Erster Durchgang ohne Bounding Box: nur die Gemeindegrenze"""
+
+    def node(self, n):
+        pass
+
+    def way(self, w):
+        pass
+
+    def area(self, a):
+        if not self._is_region_boundary(a.tags):
+            return
+        try:
+            self.boundary = shapely.wkb.loads(self.wkb.create_multipolygon(a), hex=True)
+        except RuntimeError:
+            return
+
+
+def _apply(handler, pbf_path):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Knotenkoordinaten auf der Festplatte statt im Speicher halten
+        index = f"sparse_file_array,{os.path.join(tmp_dir, 'locations.idx')}"
+        handler.apply_file(pbf_path, locations=True, idx=index)
+
+
+def find_boundary(pbf_path, region_names, admin_level=8):
+    """Gemeindegrenze (WGS84) aus dem Extrakt, ohne Wege und POIs zu sammeln; None, falls keine"""
+    handler = _BoundaryHandler({}, region_names, admin_level, None)
+    _apply(handler, pbf_path)
+    return handler.boundary
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """Grosskreisdistanz in Metern (vektorisiert)"""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(h))
+
+
+def ingest_pbf(pbf_path, tourism_tags, region_names, admin_level=8, bbox=None):
+    """
+    Liest den Extrakt und liefert ein Dict mit
+      'boundary': shapely-Geometrie (WGS84) oder None,
+      'pois':     Liste von Dicts (Tags, element_type, osmid, geometry),
+      'edges':    (u, v, länge_m) als NumPy-Arrays mit OSM-Knoten-IDs,
+      'nodes':    (ids, lon, lat) als NumPy-Arrays.
+    bbox = (min_lon, min_lat, max_lon, max_lat) verwirft Objekte ausserhalb.
+    """
+    handler = _IngestHandler(tourism_tags, region_names, admin_level, bbox)
+    _apply(handler, pbf_path)
+
+    node_ids, first = np.unique(np.frombuffer(handler.node_ids, dtype=np.int64),
+                                return_index=True)
+    lon = np.frombuffer(handler.node_lon, dtype=np.float64)[first]
+    lat = np.frombuffer(handler.node_lat, dtype=np.float64)[first]
+
+    u = np.frombuffer(handler.edge_u, dtype=np.int64)
+    v = np.frombuffer(handler.edge_v, dtype=np.int64)
+    u_pos = np.searchsorted(node_ids, u)
+    v_pos = np.searchsorted(node_ids, v)
+    lengths = haversine(lon[u_pos], lat[u_pos], lon[v_pos], lat[v_pos])
+
+    return {
+        'boundary': handler.boundary,
+        'pois': handler.pois,
+        'edges': (u, v, lengths),
+        'nodes': (node_ids, lon, lat),
+    }
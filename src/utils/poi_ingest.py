@@ -0,0 +1,91 @@
+"""
+Schlanke POI-Tabelle aus den Roh-POIs
+
+OSM-Abfragen liefern Hunderte meist leerer Tag-Spalten. Beim Import bleiben
+nur die Tags einer Positivliste (plus die Tags der Kategorieregeln) als
+Spalten erhalten; alle übrigen gefüllten Tags wandern in eine Seitentabelle
+im Langformat (element_type, osmid, key, value), über die OSM-ID verknüpfbar.
+Tag-Werte werden als kategoriale Spalten gespeichert (in Parquet
+wörterbuchkodiert), da wenige Werte ('restaurant', 'yes' ...) sich oft
+wiederholen.
+"""
+import numpy as np
+import pandas as pd
+
+ID_COLUMNS = ['element_type', 'osmid']
+# Namen der ID-Spalten in osmnx 2.x (1.x: element_type, osmid)
+OSMNX2_ID_COLUMNS = {'element': 'element_type', 'id': 'osmid'}
+# Spalten, die kein OSM-Tag sind (Rest des räumlichen Joins)
+DROP_COLUMNS = ['index_right']
+# Freitext-Tags, die als gewöhnlicher Text bleiben
+TEXT_TAGS = ['name']
+
+
+def load_whitelist(path):
+    """Tag-Namen aus einer Textdatei, einer pro Zeile; '#' leitet Kommentare ein"""
+    with open(path, encoding='utf-8') as f:
+        lines = [line.split('#', 1)[0].strip() for line in f]
+    return list(dict.fromkeys(line for line in lines if line))
+
+
+def normalize_ids(pois):
+    """Benennt die ID-Spalten bzw. Indexstufen von osmnx 2.x wie in 1.x"""
+    if 'element_type' in pois.columns or 'element_type' in pois.index.names:
+        return pois
+    if 'element' in pois.index.names:
+        return pois.rename_axis(index=lambda name: OSMNX2_ID_COLUMNS.get(name, name))
+    if 'element' in pois.columns:
+        return pois.rename(columns=OSMNX2_ID_COLUMNS)
+    return pois
+
+
+def split_tags(pois, keep):
+    """
+    Teilt die Roh-POIs in einen GeoDataFrame mit den Tags aus keep und eine
+    Seitentabelle aller übrigen gefüllten Tags
+    """
+    pois = normalize_ids(pois)
+    missing = [col for col in ID_COLUMNS if col not in pois.columns]
+    if missing:
+        raise ValueError(f"Roh-POIs ohne Spalten {missing}; die Seitentabelle braucht die OSM-ID")
+    geometry = pois.geometry.name
+    kept = ID_COLUMNS + [col for col in keep if col in pois.columns and col not in ID_COLUMNS]
+    spilled = [col for col in pois.columns
+               if col not in kept and col != geometry and col not in DROP_COLUMNS]
+
+    ids = {col: pois[col].to_numpy() for col in ID_COLUMNS}
+    parts = []
+    for col in spilled:
+        filled = pois[col].notna().to_numpy()
+        if not filled.any():
+            continue
+        part = {name: values[filled] for name, values in ids.items()}
+        part['key'] = col
+        # Listen (z.B. 'nodes') und Zahlen als Text, wie beim Schreiben der Layer
+        part['value'] = pois[col][filled].map(str).to_numpy(dtype=object)
+        parts.append(pd.DataFrame(part))
+    if parts:
+        tags = pd.concat(parts, ignore_index=True)
+    else:
+        tags = pd.DataFrame({**{name: values[:0] for name, values in ids.items()},
+                             'key': np.array([], dtype=object), 'value': np.array([], dtype=object)})
+    tags['key'] = tags['key'].astype('category')
+    tags['value'] = tags['value'].astype('category')
+    return compact_dtypes(pois[kept + [geometry]]), tags
+
+
+def compact_dtypes(pois):
+    """Tag-Spalten und element_type als kategoriale Spalten, osmid als int64"""
+    pois = pois.copy()
+    for col in pois.columns:
+        if col == pois.geometry.name or col in TEXT_TAGS or col == 'osmid':
+            continue
+        if pois[col].dtype == object:
+            pois[col] = pois[col].map(str, na_action='ignore').astype('category')
+    pois['osmid'] = pois['osmid'].astype(np.int64)
+    return pois
+
+
+def memory_mb(df):
+    """Speicherbedarf der Spalten in MB (Objektspalten vollständig gezählt)"""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
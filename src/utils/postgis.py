@@ -0,0 +1,262 @@
+"""
+Schneller Import von GeoDataFrames nach PostgreSQL/PostGIS
+
+Statt zeilenweiser INSERTs (to_postgis) werden die Daten blockweise im binären
+COPY-Format in eine temporäre Staging-Tabelle geschrieben. Von dort aus:
+  - Tabellen mit Schlüssel (z.B. element_type + osmid) werden per Upsert
+    abgeglichen. Jede Zeile trägt einen Hash ihres Inhalts (row_hash); nur
+    neue oder geänderte Zeilen werden geschrieben, fehlende gelöscht.
+  - Tabellen ohne Schlüssel werden in einer Transaktion ersetzt.
+Primärschlüssel, GiST-Index auf der Geometrie und Attributindizes werden erst
+nach dem Laden angelegt. Die Verbindung wird über die libpq-Umgebungsvariablen
+(PGHOST, PGPORT, PGUSER, PGPASSWORD, PGDATABASE) oder DATABASE_URL konfiguriert.
+"""
+import hashlib
+import io
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+import psycopg2
+import shapely
+from psycopg2 import sql
+
+DEFAULT_DATABASE = 'zuerich_tourism'
+HASH_COLUMN = 'row_hash'
+CHUNK_SIZE = 50_000
+
+_COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_COPY_TRAILER = struct.pack('>h', -1)
+_NULL = struct.pack('>i', -1)
+
+
+def connection_dsn():
+    """DSN aus DATABASE_URL, sonst übernimmt libpq die PG*-Variablen"""
+    if os.environ.get('DATABASE_URL'):
+        return os.environ['DATABASE_URL']
+    if not os.environ.get('PGDATABASE'):
+        return f'dbname={DEFAULT_DATABASE}'
+    return ''
+
+
+def connect(dsn=None):
+    return psycopg2.connect(connection_dsn() if dsn is None else dsn)
+
+
+def column_types(gdf):
+    """Postgres-Typ pro Spalte: bigint, double precision, boolean, geometry oder text"""
+    types = {}
+    for col, dtype in gdf.dtypes.items():
+        if col == gdf.geometry.name:
+            types[col] = 'geometry'
+        elif pd.api.types.is_bool_dtype(dtype):
+            types[col] = 'boolean'
+        elif pd.api.types.is_integer_dtype(dtype):
+            types[col] = 'bigint'
+        elif pd.api.types.is_float_dtype(dtype):
+            types[col] = 'double precision'
+        else:
+            types[col] = 'text'
+    return types
+
+
+def _fixed_width(values, fmt, width, missing):
+    """Zahlen als Big-Endian-Bytes, fehlende Werte als None"""
+    buffer = np.ascontiguousarray(values.astype(fmt)).tobytes()
+    return [None if missing[i] else buffer[i * width:(i + 1) * width]
+            for i in range(len(values))]
+
+
+def _encode_column(series, pg_type, srid):
+    """Werte einer Spalte im binären COPY-Format (bytes oder None für NULL)"""
+    if pg_type == 'geometry':
+        geoms = shapely.set_srid(series.to_numpy(), srid)
+        return list(shapely.to_wkb(geoms, include_srid=True))
+    missing = series.isna().to_numpy()
+    if pg_type == 'bigint':
+        return _fixed_width(series.fillna(0).to_numpy(dtype=np.int64), '>i8', 8, missing)
+    if pg_type == 'double precision':
+        return _fixed_width(series.to_numpy(dtype=np.float64), '>f8', 8, missing)
+    if pg_type == 'boolean':
+        return [None if m else (b'\x01' if v else b'\x00')
+                for v, m in zip(series.to_numpy(), missing)]
+    return [None if m else str(v).encode('utf-8')
+            for v, m in zip(series.to_numpy(dtype=object), missing)]
+
+
+def copy_chunks(gdf, types, srid, chunk_size=CHUNK_SIZE):
+    """
+    Erzeugt pro Block von chunk_size Zeilen einen vollständigen binären
+    COPY-Strom. Als letzte Spalte wird der Inhalts-Hash der Zeile angehängt.
+    """
+    columns = list(types)
+    field_count = struct.pack('>h', len(columns) + 1)
+    for start in range(0, len(gdf), chunk_size):
+        chunk = gdf.iloc[start:start + chunk_size]
+        encoded = [_encode_column(chunk[col], types[col], srid) for col in columns]
+        out = io.BytesIO()
+        out.write(_COPY_HEADER)
+        for fields in zip(*encoded):
+            out.write(field_count)
+            digest = hashlib.md5()
+            for value in fields:
+                if value is None:
+                    out.write(_NULL)
+                    digest.update(_NULL)
+                else:
+                    out.write(struct.pack('>i', len(value)))
+                    out.write(value)
+                    digest.update(struct.pack('>i', len(value)))
+                    digest.update(value)
+            row_hash = digest.digest()
+            out.write(struct.pack('>i', len(row_hash)))
+            out.write(row_hash)
+        out.write(_COPY_TRAILER)
+        out.seek(0)
+        yield out
+
+
+def _table_exists(cur, table):
+    cur.execute('SELECT to_regclass(%s) IS NOT NULL', (table,))
+    return cur.fetchone()[0]
+
+
+def _column_definitions(types, srid):
+    definitions = []
+    for col, pg_type in types.items():
+        if pg_type == 'geometry':
+            pg_type = f'geometry(Geometry, {srid})'
+        definitions.append(sql.SQL('{} {}').format(sql.Identifier(col), sql.SQL(pg_type)))
+    definitions.append(sql.SQL('{} bytea').format(sql.Identifier(HASH_COLUMN)))
+    return sql.SQL(', ').join(definitions)
+
+
+def _identifiers(names):
+    return sql.SQL(', ').join(sql.Identifier(name) for name in names)
+
+
+def create_indexes(cur, table, geometry_column, indexes=()):
+    """GiST-Index auf der Geometrie und B-Baum-Indizes auf Attributen, danach ANALYZE"""
+    cur.execute(sql.SQL('CREATE INDEX IF NOT EXISTS {} ON {} USING GIST ({})').format(
+        sql.Identifier(f'{table}_{geometry_column}_gist'), sql.Identifier(table),
+        sql.Identifier(geometry_column)))
+    for col in indexes:
+        cur.execute(sql.SQL('CREATE INDEX IF NOT EXISTS {} ON {} ({})').format(
+            sql.Identifier(f'{table}_{col}_idx'), sql.Identifier(table), sql.Identifier(col)))
+    cur.execute(sql.SQL('ANALYZE {}').format(sql.Identifier(table)))
+
+
+def load_geodataframe(conn, gdf, table, key=None, indexes=(), chunk_size=CHUNK_SIZE,
+                      delete_missing=True):
+    """
+    Lädt gdf in die Tabelle table. Mit key (Liste von Spalten) wird per Upsert
+    abgeglichen, sonst wird die Tabelle ersetzt. Liefert ein Dict mit der
+    Anzahl eingefügter, geänderter und gelöschter Zeilen.
+    """
+    gdf = gdf.reset_index(drop=not any(gdf.index.names))
+    srid = gdf.crs.to_epsg() if gdf.crs is not None else 4326
+    types = column_types(gdf)
+    indexes = [col for col in indexes if col in types]
+    key = list(key or [])
+    missing_keys = [col for col in key if col not in types]
+    if missing_keys:
+        raise ValueError(f"Schlüsselspalten fehlen in {table}: {missing_keys}")
+    if key:
+        gdf = gdf.dropna(subset=key)
+
+    columns = list(types) + [HASH_COLUMN]
+    staging = f'_staging_{table}'
+    stats = {'rows': len(gdf), 'inserted': 0, 'updated': 0, 'deleted': 0}
+
+    with conn, conn.cursor() as cur:
+        exists = _table_exists(cur, table)
+        if not key and exists:
+            cur.execute(sql.SQL('DROP TABLE {}').format(sql.Identifier(table)))
+            exists = False
+        if not exists:
+            cur.execute(sql.SQL('CREATE TABLE {} ({})').format(
+                sql.Identifier(table), _column_definitions(types, srid)))
+        else:
+            # Neue OSM-Tags ergeben neue Spalten
+            for col, pg_type in types.items():
+                if pg_type == 'geometry':
+                    pg_type = f'geometry(Geometry, {srid})'
+                cur.execute(sql.SQL('ALTER TABLE {} ADD COLUMN IF NOT EXISTS {} {}').format(
+                    sql.Identifier(table), sql.Identifier(col), sql.SQL(pg_type)))
+
+        # Neue Tabellen ohne Schlüssel direkt befüllen, sonst über Staging
+        target = staging if key else table
+        if key:
+            cur.execute(sql.SQL('CREATE TEMP TABLE {} ({}) ON COMMIT DROP').format(
+                sql.Identifier(staging), _column_definitions(types, srid)))
+        copy = sql.SQL('COPY {} ({}) FROM STDIN WITH (FORMAT binary)').format(
+            sql.Identifier(target), _identifiers(columns)).as_string(cur)
+        for stream in copy_chunks(gdf, types, srid, chunk_size):
+            cur.copy_expert(copy, stream)
+
+        if not key:
+            stats['inserted'] = len(gdf)
+        elif not exists:
+            cur.execute(sql.SQL(
+                'INSERT INTO {table} ({cols}) SELECT DISTINCT ON ({key}) {cols} FROM {staging}'
+            ).format(table=sql.Identifier(table), cols=_identifiers(columns),
+                     key=_identifiers(key), staging=sql.Identifier(staging)))
+            stats['inserted'] = cur.rowcount
+            cur.execute(sql.SQL('ALTER TABLE {} ADD PRIMARY KEY ({})').format(
+                sql.Identifier(table), _identifiers(key)))
+        else:
+            cur.execute(sql.SQL('ANALYZE {}').format(sql.Identifier(staging)))
+            updates = sql.SQL(', ').join(
+                sql.SQL('{col} = EXCLUDED.{col}').format(col=sql.Identifier(col))
+                for col in columns if col not in key)
+            cur.execute(sql.SQL(
+                'WITH upserted AS ('
+                ' INSERT INTO {table} AS t ({cols})'
+                ' SELECT DISTINCT ON ({key}) {cols} FROM {staging}'
+                ' ON CONFLICT ({key}) DO UPDATE SET {updates}'
+                ' WHERE t.{hash} IS DISTINCT FROM EXCLUDED.{hash}'
+                ' RETURNING (xmax = 0) AS inserted'
+                ') SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)'
+                ' FROM upserted'
+            ).format(table=sql.Identifier(table), cols=_identifiers(columns),
+                     key=_identifiers(key), staging=sql.Identifier(staging),
+                     updates=updates, hash=sql.Identifier(HASH_COLUMN)))
+            stats['inserted'], stats['updated'] = cur.fetchone()
+            if delete_missing:
+                match = sql.SQL(' AND ').join(
+                    sql.SQL('s.{col} = t.{col}').format(col=sql.Identifier(col)) for col in key)
+                cur.execute(sql.SQL(
+                    'DELETE FROM {table} AS t WHERE NOT EXISTS (SELECT 1 FROM {staging} AS s WHERE {match})'
+                ).format(table=sql.Identifier(table), staging=sql.Identifier(staging), match=match))
+                stats['deleted'] = cur.rowcount
+
+        create_indexes(cur, table, gdf.geometry.name, indexes)
+    return stats
+
+
+def import_source(source, dsn=None, chunk_size=CHUNK_SIZE, delete_missing=True):
+    """
+    Worker für den parallelen Import: liest eine Quelle und lädt sie in ihre
+    Tabelle. source ist ein Dict mit 'table', 'path', 'layer' (siehe
+    utils.storage) oder 'raster' (siehe utils.raster) sowie optional 'key'
+    und 'indexes'.
+    """
+    import geopandas as gpd
+    from utils.raster import read_raster
+    from utils.storage import read_layer
+
+    if 'raster' in source:
+        # Rasterzellen als Punkte, damit ST_DWithin-Abfragen sie nutzen können
+        gdf = read_raster(source['raster']).to_points()
+    elif 'layer' in source:
+        gdf = read_layer(source['layer'])
+    else:
+        gdf = gpd.read_file(source['path'])
+    conn = connect(dsn)
+    try:
+        return load_geodataframe(conn, gdf, source['table'], key=source.get('key'),
+                                 indexes=source.get('indexes', ()), chunk_size=chunk_size,
+                                 delete_missing=delete_missing)
+    finally:
+        conn.close()
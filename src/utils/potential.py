@@ -0,0 +1,48 @@
+"""
+Bewertung von Grid-Zellen nach touristischem Potenzial
+
+Das Grid besteht aus Zellpunkten in LV95 innerhalb der Stadtgrenze. Pro Zelle
+werden die POIs im Umkreis über einen STRtree gezählt; zusammen mit dem
+Hotspot-Wert (gleitendes Mittel der Dichte) und optional der Erreichbarkeit
+ergibt sich der Potenzialwert: viel Nachfrage, aber wenig Angebot.
+"""
+import numpy as np
+import shapely
+
+
+def grid_points(boundary_geom, cell_size):
+    """x/y der Grid-Punkte (Raster ab der linken unteren Ecke) innerhalb von boundary_geom"""
+    minx, miny, maxx, maxy = boundary_geom.bounds
+    X, Y = np.meshgrid(np.arange(minx, maxx, cell_size), np.arange(miny, maxy, cell_size),
+                       indexing='ij')
+    X, Y = X.ravel(), Y.ravel()
+    shapely.prepare(boundary_geom)
+    inside = shapely.contains_xy(boundary_geom, X, Y)
+    return X[inside], Y[inside]
+
+
+def poi_counts(grid_geoms, poi_geoms, buffer):
+    """Anzahl POIs mit Abstand <= buffer je Grid-Punkt"""
+    tree = shapely.STRtree(poi_geoms)
+    grid_idx, _ = tree.query(grid_geoms, predicate='dwithin', distance=buffer)
+    return np.bincount(grid_idx, minlength=len(grid_geoms))
+
+
+def potential_scores(poi_count, hotspot_value, access=None, max_count=None, max_hotspot=None):
+    """
+    Potenzial in [0, 1]: wenige POIs, aber hohe Hotspot-Dichte. access
+    (0..1, z.B. aus der Gehzeit) gewichtet das Ergebnis. max_count und
+    max_hotspot ersetzen die Maxima der Eingabe, wenn nur ein Teil des
+    Grids bewertet wird (utils.tiled_potential).
+    """
+    poi_count = np.asarray(poi_count, dtype=float)
+    hotspot_value = np.asarray(hotspot_value, dtype=float)
+    max_count = poi_count.max(initial=0) if max_count is None else max_count
+    max_hotspot = np.nanmax(hotspot_value, initial=0) if max_hotspot is None else max_hotspot
+    if max_count > 0 and max_hotspot > 0:
+        potential = (1 - poi_count / max_count) * (hotspot_value / max_hotspot)
+    else:
+        potential = np.zeros(len(poi_count))
+    if access is not None:
+        potential = potential * np.asarray(access, dtype=float)
+    return np.nan_to_num(potential, nan=0.0)
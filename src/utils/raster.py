@@ -0,0 +1,165 @@
+"""
+Georeferenzierte Raster in data/processed
+
+Ein Raster besteht aus
+    <name>.npy   Bänder als float32-Array (Band, Zeile, Spalte), Zeile 0 = Norden
+    <name>.json  Bandnamen, Koordinatensystem und affine Transformation
+                 (a, b, c, d, e, f wie bei GDAL/rasterio: x = a*col + b*row + c,
+                 y = d*col + e*row + f, bezogen auf die linke obere Zellecke)
+Die JSON-Datei wird zuletzt geschrieben und markiert ein vollständiges Raster.
+Das Array wird als Memory-Map geöffnet; Verbraucher lesen Werte an
+Koordinaten (sample) oder Ausschnitte (window), statt das Raster in Punkte
+umzuwandeln. Optional lässt sich ein GeoTIFF exportieren (rasterio).
+"""
+import json
+import os
+
+import numpy as np
+from scipy.signal import fftconvolve
+
+from utils.instrumentation import phase
+from utils.storage import PROCESSED_DIR
+
+
+def raster_paths(name, directory=PROCESSED_DIR):
+    base = os.path.join(directory, name)
+    return f'{base}.npy', f'{base}.json'
+
+
+class Raster:
+    """Mehrbandiges Raster mit Nord-oben-Ausrichtung"""
+
+    def __init__(self, data, bands, transform, crs, meta=None):
+        self.data = data
+        self.bands = list(bands)
+        self.transform = tuple(transform)
+        self.crs = crs
+        self.meta = dict(meta or {})
+
+    @classmethod
+    def from_grid(cls, surfaces, grid, crs, meta=None):
+        """
+        Übernimmt Flächen auf einem utils.kde.RasterGrid ({bandname: array},
+        Zeile 0 = Süden) und dreht sie in Nord-oben-Ausrichtung
+        """
+        bands = list(surfaces)
+        data = np.stack([np.asarray(surfaces[b], dtype=np.float32)[::-1] for b in bands])
+        y_max = grid.y_min + grid.n_rows * grid.cell_size
+        transform = (grid.cell_size, 0.0, grid.x_min, 0.0, -grid.cell_size, y_max)
+        return cls(data, bands, transform, crs, meta)
+
+    @property
+    def shape(self):
+        return self.data.shape[1:]
+
+    @property
+    def cell_size(self):
+        return self.transform[0]
+
+    @property
+    def bounds(self):
+        a, _, c, _, e, f = self.transform
+        n_rows, n_cols = self.shape
+        return c, f + e * n_rows, c + a * n_cols, f
+
+    def band(self, name='density'):
+        return self.data[self.bands.index(name)]
+
+    def centers(self):
+        """Koordinaten der Zellmittelpunkte (x der Spalten, y der Zeilen, absteigend)"""
+        a, _, c, _, e, f = self.transform
+        n_rows, n_cols = self.shape
+        return c + (np.arange(n_cols) + 0.5) * a, f + (np.arange(n_rows) + 0.5) * e
+
+    def rowcol(self, x, y):
+        """Zeilen- und Spaltenindex der Zellen, in denen die Koordinaten liegen"""
+        a, _, c, _, e, f = self.transform
+        cols = np.floor((np.asarray(x, dtype=float) - c) / a).astype(np.int64)
+        rows = np.floor((np.asarray(y, dtype=float) - f) / e).astype(np.int64)
+        return rows, cols
+
+    def sample(self, x, y, band='density', values=None, fill=0.0):
+        """Zellwerte an Koordinaten; ausserhalb des Rasters fill"""
+        values = self.band(band) if values is None else values
+        rows, cols = self.rowcol(x, y)
+        n_rows, n_cols = self.shape
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        result = np.full(len(rows), fill, dtype=float)
+        result[inside] = values[rows[inside], cols[inside]]
+        return result
+
+    def window(self, bounds, band='density'):
+        """Ausschnitt (Array, Transformation) für bounds = (xmin, ymin, xmax, ymax)"""
+        xmin, ymin, xmax, ymax = bounds
+        a, b, c, d, e, f = self.transform
+        n_rows, n_cols = self.shape
+        (row0, row1), (col0, col1) = self.rowcol([xmin, xmax], [ymax, ymin])
+        row0, col0 = max(row0, 0), max(col0, 0)
+        row1, col1 = min(row1 + 1, n_rows), min(col1 + 1, n_cols)
+        transform = (a, b, c + col0 * a, d, e, f + row0 * e)
+        return self.band(band)[row0:row1, col0:col1], transform
+
+    def focal_mean(self, radius, band='density'):
+        """Mittelwert aller Zellen, deren Mittelpunkt höchstens radius entfernt liegt"""
+        values = np.asarray(self.band(band), dtype=float)
+        r = int(radius // self.cell_size)
+        offsets = np.arange(-r, r + 1) * self.cell_size
+        kernel = (offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius ** 2).astype(float)
+        total = fftconvolve(values, kernel, mode='same')
+        count = fftconvolve(np.ones_like(values), kernel, mode='same')
+        return np.divide(total, count, out=np.zeros_like(total), where=count > 0.5)
+
+    def to_points(self, bands=None):
+        """Zellmittelpunkte als GeoDataFrame (z.B. für Datenbanken ohne Rastersupport)"""
+        import geopandas as gpd
+
+        bands = self.bands if bands is None else bands
+        x, y = self.centers()
+        X, Y = np.meshgrid(x, y)
+        columns = {'x': X.ravel(), 'y': Y.ravel()}
+        for name in bands:
+            columns[name] = np.asarray(self.band(name)).ravel()
+        return gpd.GeoDataFrame(columns, geometry=gpd.points_from_xy(columns['x'], columns['y']),
+                                crs=self.crs)
+
+    def to_geotiff(self, path):
+        """Exportiert alle Bänder als GeoTIFF (benötigt rasterio)"""
+        import rasterio
+        from rasterio.transform import Affine
+
+        n_rows, n_cols = self.shape
+        with rasterio.open(path, 'w', driver='GTiff', height=n_rows, width=n_cols,
+                           count=len(self.bands), dtype='float32', crs=self.crs,
+                           transform=Affine(*self.transform), compress='deflate') as dst:
+            dst.write(np.asarray(self.data, dtype=np.float32))
+            for i, name in enumerate(self.bands, start=1):
+                dst.set_band_description(i, str(name))
+
+
+def write_raster(raster, name, directory=PROCESSED_DIR):
+    """Speichert das Raster; liefert den Pfad der JSON-Datei"""
+    os.makedirs(directory, exist_ok=True)
+    data_path, meta_path = raster_paths(name, directory)
+    with phase(f'write_raster:{name}', rows_in=int(np.prod(raster.data.shape))):
+        np.save(data_path, np.asarray(raster.data, dtype=np.float32))
+    meta = dict(raster.meta)
+    meta.update({'bands': [str(b) for b in raster.bands], 'crs': raster.crs,
+                 'transform': list(raster.transform), 'shape': list(raster.shape)})
+    tmp_path = f'{meta_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, meta_path)
+    return meta_path
+
+
+def read_raster(name, directory=PROCESSED_DIR, mmap=True):
+    """Öffnet ein gespeichertes Raster (standardmässig als Memory-Map)"""
+    data_path, meta_path = raster_paths(name, directory)
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    data = np.load(data_path, mmap_mode='r' if mmap else None)
+    bands = meta.pop('bands')
+    crs = meta.pop('crs')
+    transform = meta.pop('transform')
+    meta.pop('shape', None)
+    return Raster(data, bands, transform, crs, meta)
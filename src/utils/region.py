@@ -0,0 +1,91 @@
+"""
+Region, für die die Pipeline läuft, und gemeinsame Cache-Verzeichnisse
+
+Ohne weitere Angaben ist die Region die Stadt Zürich. Der Batch-Modus
+(src/run_regions.py) führt die Pipeline pro Region in einem eigenen
+Arbeitsverzeichnis aus und übergibt die Region über GEO_REGION, entweder als
+JSON-Objekt oder als Kürzel aus src/regions.json. Dateinamen mit Ortsbezug
+(Grenze, Graph, Karten, Kacheln) beginnen mit dem Präfix der Region
+('prefix', standardmässig das Kürzel; für Zürich 'zurich').
+
+Caches für Downloads (OSM-Antworten, Hintergrundkacheln, Isochronen) liegen
+unter GEO_CACHE_ROOT (Standard: cache) und werden von allen Regionen
+gemeinsam genutzt; ihre Einträge sind über Abfrage bzw. Inhalt adressiert.
+"""
+import json
+import os
+
+REGIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'regions.json')
+CACHE_ROOT = os.environ.get('GEO_CACHE_ROOT', 'cache')
+
+DEFAULT_REGION = {
+    'slug': 'zuerich',
+    'name': 'Zürich',
+    # Suchbegriffe für Nominatim, in dieser Reihenfolge versucht
+    'queries': ['Zürich, Switzerland', 'Zurich, Switzerland', 'Zürich Stadt', 'Zurich City'],
+    # Namen der Gemeindegrenze in einem OSM-Extrakt
+    'osm_names': ['Zürich', 'Zurich'],
+    # Zentrum (lat, lon) und Radius in Metern für die Ersatz-Bounding-Box
+    'center': [47.3769, 8.5417],
+    'radius': 7000,
+    # Präfix der Dateinamen (data/raw/<präfix>_boundary.geojson, results/<präfix>_...)
+    'prefix': 'zurich',
+    # Open-Data-Tabellen für collect_zurich_stats.py {name: url}; ohne Eintrag entfällt die Stufe
+    'stats': {
+        'tourism_stats': 'https://data.stadt-zuerich.ch/dataset/tourism_stats.csv',
+        'overnight_stats': 'https://data.stadt-zuerich.ch/dataset/overnight_stats.csv',
+    },
+    # Monatliches Saisonprofil (relativ zum Projekt); ohne Profil entfallen die saisonalen Stufen
+    'seasonal_profile': 'data/raw/seasonal_distribution.csv',
+}
+
+
+def cache_dir(name=None):
+    """Gemeinsames Cache-Verzeichnis (oder ein Unterordner davon)"""
+    return CACHE_ROOT if name is None else os.path.join(CACHE_ROOT, name)
+
+
+def complete_region(region):
+    """Ergänzt fehlende Felder: Suchbegriff und OSM-Name aus dem Namen, kein Zentrum"""
+    missing = {'slug', 'name'} - set(region)
+    if missing:
+        raise ValueError(f"Region ohne Felder {sorted(missing)}: {region}")
+    complete = {'queries': [f"{region['name']}, Switzerland"], 'osm_names': [region['name']],
+                'center': None, 'radius': DEFAULT_REGION['radius'], 'prefix': region['slug'],
+                'stats': None, 'seasonal_profile': None, 'inputs': {}}
+    complete.update(region)
+    return complete
+
+
+def load_regions(path=REGIONS_PATH):
+    """Regionen aus der Konfigurationsdatei (Liste von Objekten mit mindestens slug und name)"""
+    with open(path, encoding='utf-8') as f:
+        return [complete_region(region) for region in json.load(f)]
+
+
+def current_region():
+    """Region aus GEO_REGION (JSON oder Kürzel), sonst Zürich"""
+    value = os.environ.get('GEO_REGION', '').strip()
+    if not value:
+        return dict(DEFAULT_REGION)
+    if value.startswith('{'):
+        return complete_region(json.loads(value))
+    for region in load_regions():
+        if region['slug'] == value:
+            return region
+    raise ValueError(f"Unbekannte Region '{value}' (siehe {REGIONS_PATH})")
+
+
+def file_prefix(region=None):
+    """Präfix der Dateinamen einer Region (Zürich: 'zurich', sonst standardmässig das Kürzel)"""
+    return (region or current_region())['prefix']
+
+
+def boundary_path(region=None):
+    """Gemeindegrenze der Region im Arbeitsverzeichnis"""
+    return f'data/raw/{file_prefix(region)}_boundary.geojson'
+
+
+def boundary_table(region=None):
+    """PostGIS-Tabelle der Gemeindegrenze (Zürich: zurich_boundary)"""
+    return f'{file_prefix(region)}_boundary'
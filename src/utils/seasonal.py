@@ -0,0 +1,83 @@
+"""
+Vektorisierte saisonale Gewichtung von POIs
+
+Jeder POI erhält zwei Ankergewichte (Hochsaison 'sommer', Nebensaison
+'winter') aus seiner Kategorie, überschrieben durch Tag-Regeln (Parks,
+Aussichtspunkte, Theater ...). Daraus wird eine Gewichtsmatrix über die
+12 Monate berechnet: Das Monatsprofil der Logiernächte bestimmt, wie stark ein
+Monat der Hochsaison entspricht (0 = schwächster, 1 = stärkster Monat), und
+interpoliert zwischen den beiden Ankern. Beliebige Saisons ergeben sich als
+Mittel über ihre Monate.
+"""
+import numpy as np
+import pandas as pd
+
+MONTHS = list(range(1, 13))
+
+
+def month_column(month):
+    return f'weight_m{month:02d}'
+
+
+def load_monthly_profile(path):
+    """
+    Liest die Logiernächte pro Monat und normiert sie auf [0, 1].
+    Mehrere Jahre werden pro Monat summiert.
+    """
+    data = pd.read_csv(path)
+    stays = data.groupby('Monat')['Logiernächte'].sum().reindex(MONTHS)
+    if stays.isna().any():
+        missing = stays[stays.isna()].index.tolist()
+        raise ValueError(f"Monatsprofil {path} ohne Werte für Monate {missing}")
+
+    span = stays.max() - stays.min()
+    if span == 0:
+        return pd.Series(0.5, index=MONTHS)
+    return (stays - stays.min()) / span
+
+
+def anchor_weights(pois, category_weights, tag_overrides, default):
+    """
+    Berechnet die Ankergewichte 'sommer' und 'winter' für alle POIs.
+
+    category_weights: {kategorie: {'sommer': w, 'winter': w}}
+    tag_overrides:    Liste von (tag, werte, {'sommer': w, 'winter': w}); die
+                      erste zutreffende Regel gewinnt.
+    """
+    if 'category' in pois.columns:
+        category = pois['category'].astype(object)
+    else:
+        category = pd.Series(None, index=pois.index, dtype=object)
+
+    masks = []
+    for tag, values, _ in tag_overrides:
+        if tag in pois.columns:
+            masks.append(pois[tag].isin(values).to_numpy())
+        else:
+            masks.append(np.zeros(len(pois), dtype=bool))
+
+    anchors = {}
+    for season in ['sommer', 'winter']:
+        lookup = {cat: w[season] for cat, w in category_weights.items()}
+        base = category.map(lookup).fillna(default[season]).to_numpy(dtype=float)
+        if masks:
+            base = np.select(masks, [w[season] for _, _, w in tag_overrides], default=base)
+        anchors[season] = base
+    return pd.DataFrame(anchors, index=pois.index)
+
+
+def monthly_weights(anchors, profile):
+    """Gewichtsmatrix (POIs x 12 Monate) aus Ankergewichten und Monatsprofil"""
+    winter = anchors['winter'].to_numpy()[:, None]
+    sommer = anchors['sommer'].to_numpy()[:, None]
+    matrix = winter + (sommer - winter) * profile.reindex(MONTHS).to_numpy()[None, :]
+    return pd.DataFrame(np.round(matrix, 2), index=anchors.index,
+                        columns=[month_column(m) for m in MONTHS])
+
+
+def season_weights(monthly, seasons):
+    """Mittelt die Monatsgewichte über beliebige Saisons {name: [monate]}"""
+    return pd.DataFrame({
+        f'weight_{name}': monthly[[month_column(m) for m in months]].mean(axis=1).round(2)
+        for name, months in seasons.items()
+    }, index=monthly.index)
@@ -0,0 +1,141 @@
+"""
+Anbindung von Punkten an das Fusswegnetz mit gespeicherter Zuordnung
+
+Alle Punkte werden in einem Aufruf über den KD-Baum des Graphen angebunden.
+Die Zuordnung POI -> Knoten (mit Anbindungsdistanz) wird pro Graph-Version
+in <graph>/snaps/<layer>.<version>.parquet abgelegt; beim nächsten Lauf
+werden nur neue oder verschobene POIs neu angebunden. Rasterpunkte werden
+über einen Hash ihrer Koordinaten zwischengespeichert. Einträge älterer
+Graph-Versionen werden beim Schreiben gelöscht.
+
+Mehrere Stufen teilen sich eine Zuordnung (z.B. 'categorized_pois' für
+Isochronen und Erreichbarkeit) und laufen teils parallel: neue Zeilen werden
+unter einer Dateisperre mit dem aktuellen Stand zusammengeführt, damit keine
+Stufe die Einträge einer anderen überschreibt.
+"""
+import glob
+import hashlib
+import os
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from utils.graph_store import WALK_GRAPH_DIR
+from utils.instrumentation import phase
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SNAP_SUBDIR = 'snaps'
+POI_KEY = ['element_type', 'osmid']
+_VERSION_CHARS = 16
+
+
+def _snap_dir(store_path):
+    return os.path.join(store_path, SNAP_SUBDIR)
+
+
+def _version_tag(store):
+    return store.version[:_VERSION_CHARS]
+
+
+def _remove_other_versions(store, store_path, prefix, keep_path):
+    for path in glob.glob(os.path.join(_snap_dir(store_path), f'{prefix}.*')):
+        if path != keep_path and f'.{_version_tag(store)}.' not in os.path.basename(path):
+            os.remove(path)
+
+
+@contextmanager
+def _file_lock(path):
+    """Exklusive Sperre über <path>.lock (ohne fcntl, z.B. unter Windows, ohne Sperre)"""
+    if fcntl is None:
+        yield
+        return
+    with open(f'{path}.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _merge_snaps(path, table, match_columns):
+    """Schreibt die Zeilen von table zusammen mit dem gespeicherten Stand nach path"""
+    with _file_lock(path):
+        # Erst unter der Sperre lesen: eine parallele Stufe kann inzwischen geschrieben haben
+        if os.path.exists(path):
+            table = pd.concat([pd.read_parquet(path), table], ignore_index=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        table.drop_duplicates(match_columns, keep='last').to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+
+def point_coordinates(geometry, crs):
+    """x/y im Koordinatensystem crs; Flächen und Linien über einen inneren Punkt"""
+    geometry = geometry.to_crs(crs)
+    points = geometry.where(geometry.geom_type == 'Point', geometry.representative_point())
+    return points.x.to_numpy(), points.y.to_numpy()
+
+
+def snap_layer(store, gdf, name, key=POI_KEY, store_path=WALK_GRAPH_DIR):
+    """
+    Knotenindex und Anbindungsdistanz (Meter) für jede Zeile von gdf, in der
+    Reihenfolge von gdf. Zeilen werden über key (falls vorhanden) und ihre
+    Koordinaten wiedererkannt.
+    """
+    x, y = point_coordinates(gdf.geometry, store.crs)
+    key = [col for col in key if col in gdf.columns]
+    table = pd.DataFrame({col: gdf[col].to_numpy() for col in key})
+    table['x'] = x
+    table['y'] = y
+
+    path = os.path.join(_snap_dir(store_path), f'{name}.{_version_tag(store)}.parquet')
+    match_columns = key + ['x', 'y']
+    if os.path.exists(path):
+        cached = pd.read_parquet(path).drop_duplicates(match_columns)
+        table = table.merge(cached, on=match_columns, how='left')
+    else:
+        table['node'] = np.nan
+        table['snap_distance'] = np.nan
+
+    todo = table['node'].isna().to_numpy()
+    if todo.any():
+        with phase(f'snap:{name}', rows_in=int(todo.sum())):
+            nodes, distances = store.nearest_nodes(x[todo], y[todo])
+        table.loc[todo, 'node'] = nodes
+        table.loc[todo, 'snap_distance'] = distances
+        table['node'] = table['node'].astype(np.int64)
+        table['node_id'] = np.asarray(store.node_ids)[table['node'].to_numpy()]
+
+        os.makedirs(_snap_dir(store_path), exist_ok=True)
+        _merge_snaps(path, table[todo], match_columns)
+        _remove_other_versions(store, store_path, name, path)
+        print(f"Anbindung ans Netz: {todo.sum()} von {len(table)} Punkten neu berechnet.")
+
+    return table['node'].to_numpy(dtype=np.int64), table['snap_distance'].to_numpy(dtype=float)
+
+
+def snap_points(store, x, y, store_path=WALK_GRAPH_DIR):
+    """
+    Knotenindex und Anbindungsdistanz für beliebige Punkte (z.B. Rasterzellen)
+    in LV95; identische Punktmengen werden aus dem Cache gelesen
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    digest = hashlib.sha1(x.tobytes() + y.tobytes()).hexdigest()[:_VERSION_CHARS]
+    path = os.path.join(_snap_dir(store_path), f'points.{_version_tag(store)}.{digest}.npz')
+    if os.path.exists(path):
+        cached = np.load(path)
+        return cached['node'], cached['snap_distance']
+
+    with phase('snap:points', rows_in=len(x)):
+        nodes, distances = store.nearest_nodes(x, y)
+    os.makedirs(_snap_dir(store_path), exist_ok=True)
+    tmp_path = f'{path}.tmp.npz'
+    np.savez(tmp_path, node=nodes, snap_distance=distances)
+    os.replace(tmp_path, path)
+    _remove_other_versions(store, store_path, 'points', path)
+    return nodes, distances
@@ -0,0 +1,227 @@
+"""
+Speicherschicht für die Zwischenergebnisse in data/processed
+
+Die Layer werden als GeoParquet geschrieben. Leser laden nur die Spalten, die
+sie brauchen (Spaltenprojektion), und können Zeilen bereits beim Lesen über
+die Parquet-Statistiken filtern (Predicate Pushdown), z.B.
+    read_layer('categorized_pois', columns=['geometry', 'category'],
+               filters=[('category', 'in', ['Kultur', 'Attraktion'])])
+Spaltennamen dürfen Platzhalter enthalten ('weight_*').
+
+Existiert für einen Layer nur noch eine ältere GeoJSON-Datei, wird diese
+gelesen und anschliessend projiziert und gefiltert. Tabellen ohne Geometrie
+liegen im selben Verzeichnis (write_table/read_table).
+"""
+import fnmatch
+import json
+import operator
+import os
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.instrumentation import phase
+
+PROCESSED_DIR = 'data/processed'
+
+# Zeilengruppen klein genug halten, damit Filter ganze Gruppen überspringen können
+ROW_GROUP_SIZE = 50_000
+
+_FILTER_OPS = {
+    '=': operator.eq,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def layer_path(name, directory=PROCESSED_DIR):
+    """Pfad der GeoParquet-Datei eines Layers"""
+    return os.path.join(directory, f'{name}.parquet')
+
+
+def _legacy_path(name, directory):
+    return os.path.join(directory, f'{name}.geojson')
+
+
+def layer_exists(name, directory=PROCESSED_DIR):
+    """Ob ein Layer (GeoParquet oder ältere GeoJSON-Datei) vorhanden ist"""
+    return os.path.exists(layer_path(name, directory)) or os.path.exists(_legacy_path(name, directory))
+
+
+def _sanitize_object_columns(gdf):
+    """
+    OSM-Attribute enthalten teils Listen oder gemischte Typen (z.B. 'nodes'),
+    die Arrow nicht als eine Spalte speichern kann. Solche Werte werden als
+    Text abgelegt.
+    """
+    gdf = gdf.copy()
+    for col in gdf.columns:
+        if col == gdf.geometry.name or gdf[col].dtype != object:
+            continue
+        values = gdf[col].dropna()
+        if not values.map(lambda v: isinstance(v, str)).all():
+            gdf[col] = gdf[col].map(str, na_action='ignore')
+    return gdf
+
+
+def write_layer(gdf, name, directory=PROCESSED_DIR):
+    """Schreibt einen GeoDataFrame als GeoParquet-Layer"""
+    os.makedirs(directory, exist_ok=True)
+    path = layer_path(name, directory)
+    with phase(f'write_layer:{name}', rows_in=len(gdf)):
+        _sanitize_object_columns(gdf).to_parquet(path, row_group_size=ROW_GROUP_SIZE)
+    return path
+
+
+class LayerWriter:
+    """
+    Schreibt einen Layer in Teilen, ohne ihn ganz im Speicher zu halten:
+        with LayerWriter('high_potential_areas') as writer:
+            for part in parts:
+                writer.write(part)
+    Alle Teile brauchen dieselben Spalten, Typen und dasselbe
+    Koordinatensystem. Die Datei entsteht unter einem temporären Namen und
+    ersetzt den Layer erst, wenn alle Teile geschrieben sind.
+    """
+
+    def __init__(self, name, directory=PROCESSED_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.name = name
+        self.path = layer_path(name, directory)
+        self.directory = directory
+        self.rows = 0
+        self._tmp_path = f'{self.path}.tmp'
+        self._writer = None
+        self._empty = None
+
+    def write(self, gdf):
+        if self._empty is None:
+            self._empty = gdf.iloc[:0]
+        if len(gdf) == 0:
+            return
+        with phase(f'write_layer:{self.name}', rows_in=len(gdf)):
+            # Geometrie als WKB (GeoDataFrame.to_arrow, geopandas >= 1.0)
+            table = pa.table(_sanitize_object_columns(gdf).to_arrow(index=False,
+                                                                     geometry_encoding='WKB'))
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self._tmp_path, _with_geo_metadata(table.schema, gdf))
+            self._writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+        self.rows += len(gdf)
+
+    def close(self):
+        """Schliesst die Datei und ersetzt den Layer; ohne Zeilen wird ein leerer Layer geschrieben"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.replace(self._tmp_path, self.path)
+        elif self._empty is not None:
+            write_layer(self._empty, self.name, self.directory)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._writer is not None:
+            self._writer.close()
+            os.remove(self._tmp_path)
+
+
+def _with_geo_metadata(schema, gdf):
+    """
+    Ergänzt die GeoParquet-Metadaten ('geo') für die Geometriespalte. Ohne
+    Bounding Box und mit leerer Liste der Geometrietypen (= unbekannt), da
+    beide nur für den ersten Teil gälten.
+    """
+    crs = gdf.crs.to_json_dict() if gdf.crs is not None else None
+    geo = {'version': '1.0.0', 'primary_column': gdf.geometry.name,
+           'columns': {gdf.geometry.name: {'encoding': 'WKB', 'geometry_types': [], 'crs': crs}}}
+    return schema.with_metadata({**(schema.metadata or {}), b'geo': json.dumps(geo).encode('utf-8')})
+
+
+def write_table(df, name, directory=PROCESSED_DIR):
+    """Schreibt eine Tabelle ohne Geometrie (z.B. die Seitentabelle der OSM-Tags) als Parquet"""
+    os.makedirs(directory, exist_ok=True)
+    path = layer_path(name, directory)
+    with phase(f'write_table:{name}', rows_in=len(df)):
+        df.to_parquet(path, index=False, row_group_size=ROW_GROUP_SIZE)
+    return path
+
+
+def read_table(name, columns=None, filters=None, directory=PROCESSED_DIR):
+    """Liest eine mit write_table geschriebene Tabelle (Spalten und Filter wie bei read_layer)"""
+    with phase(f'read_table:{name}') as record:
+        df = pd.read_parquet(layer_path(name, directory), columns=columns, filters=filters)
+        record.rows_out = len(df)
+    return df
+
+
+def _resolve_columns(requested, available, geometry_column):
+    """Löst Platzhalter auf und ignoriert Spalten, die der Layer nicht hat"""
+    if requested is None:
+        return None
+    resolved = []
+    for pattern in list(requested) + [geometry_column]:
+        for col in available:
+            if fnmatch.fnmatchcase(col, pattern) and col not in resolved:
+                resolved.append(col)
+    return resolved
+
+
+def _apply_filters(df, filters):
+    """Wendet Filter im pyarrow-Format ([(spalte, op, wert), ...]) in pandas an"""
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        if op == 'in':
+            mask &= df[col].isin(value)
+        elif op == 'not in':
+            mask &= ~df[col].isin(value)
+        else:
+            mask &= _FILTER_OPS[op](df[col], value)
+    return df[mask]
+
+
+def read_layer(name, columns=None, filters=None, directory=PROCESSED_DIR):
+    """
+    Liest einen Layer. 'columns' beschränkt die geladenen Spalten (die
+    Geometrie wird immer mitgeladen), 'filters' werden als Predicate Pushdown
+    an Parquet übergeben.
+    """
+    with phase(f'read_layer:{name}') as record:
+        gdf = _read_layer(name, columns, filters, directory)
+        record.rows_out = len(gdf)
+    return gdf
+
+
+def _read_layer(name, columns, filters, directory):
+    path = layer_path(name, directory)
+    if os.path.exists(path):
+        schema = pq.read_schema(path)
+        available = [col for col in schema.names if not col.startswith('__index_level_')]
+        geometry_column = 'geometry'
+        if schema.metadata and b'geo' in schema.metadata:
+            geometry_column = json.loads(schema.metadata[b'geo']).get(
+                'primary_column', 'geometry')
+        columns = _resolve_columns(columns, available, geometry_column)
+        return gpd.read_parquet(path, columns=columns, filters=filters)
+
+    legacy = _legacy_path(name, directory)
+    if not os.path.exists(legacy):
+        raise FileNotFoundError(f"Layer '{name}' nicht gefunden: {path}")
+
+    print(f"Hinweis: Lese ältere GeoJSON-Datei {legacy}")
+    gdf = gpd.read_file(legacy)
+    if filters:
+        gdf = _apply_filters(gdf, filters)
+    resolved = _resolve_columns(columns, list(gdf.columns), gdf.geometry.name)
+    if resolved is not None:
+        gdf = gdf[resolved]
+    return gdf
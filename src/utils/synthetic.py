@@ -0,0 +1,141 @@
+"""
+Synthetische Daten in realistischer Zusammensetzung für Benchmarks
+
+POIs liegen zu einem Teil in Clustern (Altstadt, Quartierzentren), der Rest
+gleichmässig verteilt; die Tags folgen der ungefähren Mischung der
+OSM-Daten für Zürich. Das Gebiet wächst mit der Anzahl POIs bei
+gleichbleibender Dichte, damit grössere Mengen grössere Regionen abbilden.
+Strassengraphen sind verrauschte Gitter mit zufällig fehlenden Kanten.
+Alle Koordinaten in LV95; gleiche Parameter und seed ergeben gleiche Daten.
+"""
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from utils.graph_store import STORE_CRS, from_edges
+
+# Mittelpunkt von Zürich (LV95) und POI-Dichte der Stadt
+CENTER = (2683000.0, 1247500.0)
+POIS_PER_KM2 = 60
+# Anteil der POIs in Clustern, Punkte pro Cluster und Clusterradius in Metern
+CLUSTER_SHARE = 0.7
+POIS_PER_CLUSTER = 200
+CLUSTER_SIGMA = (150, 600)
+# Knotenabstand und Umweg-Faktor des Strassengitters
+STREET_SPACING = 80.0
+DETOUR = (1.0, 1.2)
+MISSING_EDGES = 0.1
+
+# (Tag, Wert, Anteil)
+TAG_MIX = [
+    ('amenity', 'restaurant', 0.20),
+    ('amenity', 'cafe', 0.09),
+    ('amenity', 'bar', 0.06),
+    ('amenity', 'bench', 0.10),
+    ('amenity', 'theatre', 0.01),
+    ('amenity', 'cinema', 0.01),
+    ('amenity', 'nightclub', 0.01),
+    ('shop', 'clothes', 0.08),
+    ('shop', 'supermarket', 0.04),
+    ('shop', 'bakery', 0.04),
+    ('shop', 'gift', 0.02),
+    ('tourism', 'hotel', 0.05),
+    ('tourism', 'guest_house', 0.01),
+    ('tourism', 'hostel', 0.01),
+    ('tourism', 'museum', 0.03),
+    ('tourism', 'gallery', 0.02),
+    ('tourism', 'artwork', 0.05),
+    ('tourism', 'attraction', 0.04),
+    ('tourism', 'viewpoint', 0.02),
+    ('leisure', 'park', 0.08),
+    ('leisure', 'garden', 0.03),
+]
+TAG_COLUMNS = ['tourism', 'amenity', 'shop', 'leisure']
+
+
+def region_bounds(n_pois, density=POIS_PER_KM2, center=CENTER):
+    """Quadratisches Gebiet um center, in dem n_pois mit der Dichte density liegen"""
+    half = np.sqrt(max(n_pois, 1) / density) * 1000 / 2
+    return (center[0] - half, center[1] - half, center[0] + half, center[1] + half)
+
+
+def region_boundary(bounds):
+    """Unregelmässige Gemeindegrenze (Ellipse mit Einbuchtung) innerhalb von bounds"""
+    minx, miny, maxx, maxy = bounds
+    cx, cy = (minx + maxx) / 2, (miny + maxy) / 2
+    angles = np.linspace(0, 2 * np.pi, 128, endpoint=False)
+    radius = 1 - 0.15 * np.cos(3 * angles) ** 2
+    x = cx + (maxx - minx) / 2 * radius * np.cos(angles)
+    y = cy + (maxy - miny) / 2 * radius * np.sin(angles)
+    return shapely.Polygon(np.column_stack([x, y]))
+
+
+def synthetic_pois(n, bounds=None, seed=0):
+    """GeoDataFrame mit n POIs (name, Tag-Spalten, element_type, osmid) in LV95"""
+    rng = np.random.default_rng(seed)
+    bounds = region_bounds(n) if bounds is None else bounds
+    minx, miny, maxx, maxy = bounds
+
+    n_clustered = int(n * CLUSTER_SHARE)
+    n_clusters = max(1, n_clustered // POIS_PER_CLUSTER)
+    centers_x = rng.uniform(minx, maxx, n_clusters)
+    centers_y = rng.uniform(miny, maxy, n_clusters)
+    sigma = rng.uniform(*CLUSTER_SIGMA, n_clusters)
+    cluster = rng.integers(0, n_clusters, n_clustered)
+    x = np.concatenate([centers_x[cluster] + rng.normal(0, sigma[cluster]),
+                        rng.uniform(minx, maxx, n - n_clustered)])
+    y = np.concatenate([centers_y[cluster] + rng.normal(0, sigma[cluster]),
+                        rng.uniform(miny, maxy, n - n_clustered)])
+    x = np.clip(x, minx, maxx)
+    y = np.clip(y, miny, maxy)
+
+    shares = np.array([share for _, _, share in TAG_MIX])
+    choice = rng.choice(len(TAG_MIX), size=n, p=shares / shares.sum())
+    columns = {'name': np.array([f'POI {i}' for i in range(n)], dtype=object)}
+    for tag in TAG_COLUMNS:
+        values = np.array([value if t == tag else None for t, value, _ in TAG_MIX], dtype=object)
+        columns[tag] = values[choice]
+    # Etwa jeder dritte POI ohne Namen, wie in OSM
+    columns['name'][rng.random(n) < 0.3] = None
+    columns['element_type'] = 'node'
+    columns['osmid'] = np.arange(1, n + 1, dtype=np.int64)
+    return gpd.GeoDataFrame(columns, geometry=gpd.points_from_xy(x, y), crs=STORE_CRS)
+
+
+def synthetic_graph(n_nodes, bounds=None, seed=0):
+    """
+    GraphStore als verrauschtes Gitter mit etwa n_nodes Knoten im Abstand
+    STREET_SPACING; beide Richtungen jeder Kante, ein Teil der Kanten fehlt
+    """
+    rng = np.random.default_rng(seed)
+    side = max(2, int(np.sqrt(n_nodes)))
+    if bounds is None:
+        half = side * STREET_SPACING / 2
+        bounds = (CENTER[0] - half, CENTER[1] - half, CENTER[0] + half, CENTER[1] + half)
+    minx, miny, maxx, maxy = bounds
+    spacing_x = (maxx - minx) / side
+    spacing_y = (maxy - miny) / side
+
+    cols, rows = np.meshgrid(np.arange(side), np.arange(side))
+    cols, rows = cols.ravel(), rows.ravel()
+    node_ids = np.arange(side * side, dtype=np.int64)
+    node_x = minx + (cols + 0.5 + rng.uniform(-0.3, 0.3, len(cols))) * spacing_x
+    node_y = miny + (rows + 0.5 + rng.uniform(-0.3, 0.3, len(rows))) * spacing_y
+
+    right = node_ids[cols < side - 1]
+    up = node_ids[rows < side - 1]
+    u = np.concatenate([right, up])
+    v = np.concatenate([right + 1, up + side])
+    keep = rng.random(len(u)) >= MISSING_EDGES
+    u, v = u[keep], v[keep]
+    lengths = np.hypot(node_x[u] - node_x[v], node_y[u] - node_y[v]) * rng.uniform(*DETOUR, len(u))
+    return from_edges(node_ids, node_x, node_y, np.concatenate([u, v]), np.concatenate([v, u]),
+                      np.concatenate([lengths, lengths]), meta={'source': 'synthetic'})
+
+
+def synthetic_profile(peak_month=7):
+    """Monatsprofil in [0, 1] mit Maximum im Monat peak_month"""
+    months = np.arange(1, 13)
+    profile = (1 + np.cos(2 * np.pi * (months - peak_month) / 12)) / 2
+    return pd.Series(profile, index=months)
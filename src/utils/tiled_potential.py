@@ -0,0 +1,236 @@
+"""
+Gekachelte Potenzialanalyse für Gebiete, deren Grid nicht in den Speicher passt
+
+Das Grid wird in Kacheln aus chunk_size x chunk_size Metern zerlegt, die
+Worker-Prozesse unabhängig bewerten. Jede Kachel liest die POIs und den
+Ausschnitt des Hotspot-Rasters mit einem Rand (Halo) von der Breite des
+Suchradius, damit Zählung und gleitendes Mittel am Kachelrand dieselben
+Werte ergeben wie auf dem ganzen Grid. Die Zellen werden als Parquet-Teile
+in parts_dir geschrieben; im Speicher liegt nur je eine Kachel pro Worker.
+
+Der Potenzialwert normiert mit den Maxima des ganzen Gebiets, deshalb zwei
+Durchgänge: der erste zählt und liefert die Maxima je Kachel, der zweite
+bewertet die Teile und füllt eine mergebare Quantilskizze, aus der die
+Schwelle für die obersten Zellen folgt.
+
+Die Grid-Punkte liegen auf demselben Raster wie bei utils.potential.grid_points;
+die grid_id setzt sich aus Spalten- und Zeilenindex zusammen ('grid_<i>_<j>').
+"""
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from utils.instrumentation import phase
+from utils.potential import poi_counts, potential_scores
+from utils.raster import Raster, read_raster
+from utils.storage import PROCESSED_DIR
+
+PARTS_DIR = os.path.join(PROCESSED_DIR, 'high_potential_areas.parts')
+# Kantenlänge einer Kachel in Metern
+CHUNK_SIZE = 5000
+# Ab so vielen Zellen in der Bounding Box wird automatisch gekachelt
+TILED_MIN_CELLS = 2_000_000
+# Klassen der Quantilskizze über [0, 1]; Fehler der Schwelle höchstens 1 / SKETCH_BINS
+SKETCH_BINS = 10_000
+
+
+class HistogramSketch:
+    """
+    Mergebare Quantilskizze für Werte in [low, high]: Histogramm mit festen
+    Klassen. Skizzen aus verschiedenen Prozessen werden addiert (merge); das
+    Quantil ist die untere Grenze der Klasse, in die es fällt. Eine Auswahl
+    mit >= quantile() enthält daher mindestens den verlangten Anteil.
+    """
+
+    def __init__(self, bins=SKETCH_BINS, low=0.0, high=1.0):
+        self.low = low
+        self.high = high
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        values = np.clip(values[~np.isnan(values)], self.low, self.high)
+        bins = len(self.counts)
+        index = ((values - self.low) / (self.high - self.low) * bins).astype(np.int64)
+        self.counts += np.bincount(np.minimum(index, bins - 1), minlength=bins)
+
+    def merge(self, other):
+        if len(other.counts) != len(self.counts) or (other.low, other.high) != (self.low, self.high):
+            raise ValueError("Skizzen mit unterschiedlichen Klassen lassen sich nicht zusammenführen")
+        self.counts += other.counts
+        return self
+
+    def quantile(self, q):
+        if self.n == 0:
+            return self.low
+        # Position wie bei pandas (lineare Interpolation zwischen Rang floor und ceil)
+        rank = int(np.floor(q * (self.n - 1)))
+        k = int(np.searchsorted(np.cumsum(self.counts), rank + 1))
+        return self.low + k * (self.high - self.low) / len(self.counts)
+
+
+def grid_shape(bounds, cell_size):
+    """Anzahl Grid-Spalten und -Zeilen über bounds (wie np.arange in grid_points)"""
+    minx, miny, maxx, maxy = bounds
+    return (max(0, int(np.ceil((maxx - minx) / cell_size))),
+            max(0, int(np.ceil((maxy - miny) / cell_size))))
+
+
+def chunk_windows(bounds, cell_size, chunk_size=CHUNK_SIZE):
+    """Kacheln als Indexbereiche (i0, i1, j0, j1) der Grid-Spalten und -Zeilen"""
+    n_x, n_y = grid_shape(bounds, cell_size)
+    step = max(1, int(chunk_size // cell_size))
+    return [(i0, min(i0 + step, n_x), j0, min(j0 + step, n_y))
+            for i0 in range(0, n_x, step) for j0 in range(0, n_y, step)]
+
+
+# Zustand der Worker-Prozesse (init_worker)
+_worker = {}
+
+
+def init_worker(config):
+    """
+    Initialisierer: Stadtgrenze (WKB), POI-Koordinaten (Memory-Map, nach x
+    sortiert) und Raster (Memory-Map) einmal pro Prozess öffnen
+    """
+    _worker.clear()
+    _worker.update(config)
+    boundary = shapely.from_wkb(config['boundary'])
+    shapely.prepare(boundary)
+    _worker['boundary'] = boundary
+    _worker['pois'] = np.load(config['poi_path'], mmap_mode='r')
+    _worker['hotspots'] = read_raster(config['hotspot_name'], config['raster_dir'])
+    _worker['accessibility'] = (read_raster('accessibility', config['raster_dir'])
+                                if config['access_band'] else None)
+
+
+def _pois_near(xmin, ymin, xmax, ymax):
+    """POI-Koordinaten in der (erweiterten) Kachel über die x-Sortierung"""
+    pois = _worker['pois']
+    lo = np.searchsorted(pois[:, 0], xmin, side='left')
+    hi = np.searchsorted(pois[:, 0], xmax, side='right')
+    candidates = np.asarray(pois[lo:hi], dtype=float)
+    inside = (candidates[:, 1] >= ymin) & (candidates[:, 1] <= ymax)
+    return candidates[inside]
+
+
+def _hotspot_values(x, y, box, halo):
+    """Gleitendes Mittel im Rasterausschnitt der Kachel samt Halo, gelesen an x/y"""
+    hotspots = _worker['hotspots']
+    xmin, ymin, xmax, ymax = box
+    values, transform = hotspots.window((xmin - halo, ymin - halo, xmax + halo, ymax + halo))
+    if values.size == 0:
+        return np.zeros(len(x))
+    local = Raster(np.asarray(values)[None], ['density'], transform, hotspots.crs)
+    return local.sample(x, y, values=local.focal_mean(_worker['buffer']))
+
+
+def score_chunk(window):
+    """
+    Zählt POIs und liest Hotspot- und Erreichbarkeitswerte für die Zellen
+    einer Kachel, schreibt sie als Parquet-Teil. Liefert (Pfad, Zellen,
+    grösste POI-Zahl, grösster Hotspot-Wert) oder None ohne Zellen.
+    """
+    i0, i1, j0, j1 = window
+    (minx, miny), cell_size, buffer = _worker['origin'], _worker['cell_size'], _worker['buffer']
+    I, J = np.meshgrid(np.arange(i0, i1), np.arange(j0, j1), indexing='ij')
+    I, J = I.ravel(), J.ravel()
+    X, Y = minx + I * cell_size, miny + J * cell_size
+    inside = shapely.contains_xy(_worker['boundary'], X, Y)
+    if not inside.any():
+        return None
+    I, J, X, Y = I[inside], J[inside], X[inside], Y[inside]
+    box = (X.min(), Y.min(), X.max(), Y.max())
+
+    # POIs bis zum Suchradius ausserhalb der Kachel mitzählen
+    near = _pois_near(box[0] - buffer, box[1] - buffer, box[2] + buffer, box[3] + buffer)
+    cells = pd.DataFrame({
+        'grid_id': ['grid_%d_%d' % ij for ij in zip(I.tolist(), J.tolist())],
+        'x': X,
+        'y': Y,
+        'poi_count': poi_counts(shapely.points(X, Y), shapely.points(near), buffer),
+    })
+    # Halo des Rasterausschnitts: Suchradius plus zwei Rasterzellen
+    halo = buffer + 2 * _worker['hotspots'].cell_size
+    cells['hotspot_value'] = _hotspot_values(X, Y, box, halo)
+
+    if _worker['accessibility'] is not None:
+        cells['walk_minutes'] = _worker['accessibility'].sample(X, Y, band=_worker['access_band'],
+                                                                fill=np.nan)
+        cells['access'] = (1 - cells['walk_minutes'] / _worker['access_minutes']).clip(0, 1).fillna(0)
+
+    path = os.path.join(_worker['parts_dir'], f'part-{i0:06d}-{j0:06d}.parquet')
+    cells.to_parquet(path, index=False)
+    return path, len(cells), int(cells['poi_count'].max()), float(np.nanmax(cells['hotspot_value']))
+
+
+def score_part(task):
+    """Zweiter Durchgang: Potenzial eines Teils mit den Maxima des Gebiets; liefert die Skizze"""
+    path, max_count, max_hotspot = task
+    cells = pd.read_parquet(path)
+    cells['potential'] = potential_scores(cells['poi_count'], cells['hotspot_value'],
+                                          cells['access'] if 'access' in cells else None,
+                                          max_count=max_count, max_hotspot=max_hotspot)
+    cells.to_parquet(path, index=False)
+    sketch = HistogramSketch()
+    sketch.add(cells['potential'])
+    return sketch
+
+
+def score_tiled(boundary_geom, poi_xy, cell_size, buffer, access_band=None, access_minutes=15,
+                chunk_size=CHUNK_SIZE, quantile=0.9, processes=None,
+                hotspot_name='hotspot_analysis', raster_dir=PROCESSED_DIR, parts_dir=PARTS_DIR):
+    """
+    Bewertet das Grid über boundary_geom (LV95) kachelweise. poi_xy sind die
+    POI-Koordinaten (n x 2). Liefert (Schwelle des Quantils, Pfade der Teile).
+    """
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    os.makedirs(parts_dir)
+    # POI-Koordinaten nach x sortiert ablegen, die Worker öffnen sie als Memory-Map.
+    # float32 genügt: in LV95 (Werte um 2.6 Mio.) sind das 0.25 m Auflösung
+    poi_xy = np.asarray(poi_xy, dtype=np.float32).reshape(-1, 2)
+    poi_path = os.path.join(parts_dir, 'pois.npy')
+    np.save(poi_path, poi_xy[np.argsort(poi_xy[:, 0], kind='stable')])
+
+    windows = chunk_windows(boundary_geom.bounds, cell_size, chunk_size)
+    config = {'boundary': shapely.to_wkb(boundary_geom), 'origin': boundary_geom.bounds[:2],
+              'cell_size': cell_size, 'buffer': buffer, 'poi_path': poi_path,
+              'hotspot_name': hotspot_name, 'raster_dir': raster_dir, 'access_band': access_band,
+              'access_minutes': access_minutes, 'parts_dir': parts_dir}
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                             initargs=(config,)) as pool:
+        with phase('tiles', rows_in=len(windows)) as record:
+            chunks = [chunk for chunk in pool.map(score_chunk, windows) if chunk is not None]
+            record.rows_out = sum(n for _, n, _, _ in chunks)
+        if not chunks:
+            return 0.0, []
+
+        max_count = max(count for _, _, count, _ in chunks)
+        max_hotspot = max(hotspot for _, _, _, hotspot in chunks)
+        paths = [path for path, _, _, _ in chunks]
+        with phase('scoring', rows_in=record.rows_out):
+            sketch = HistogramSketch()
+            for part_sketch in pool.map(score_part, [(path, max_count, max_hotspot)
+                                                     for path in paths]):
+                sketch.merge(part_sketch)
+    return sketch.quantile(quantile), paths
+
+
+def high_potential_cells(paths, threshold, crs):
+    """GeoDataFrames der Zellen mit potential >= threshold, Teil für Teil"""
+    for path in paths:
+        cells = pd.read_parquet(path, filters=[('potential', '>=', threshold)])
+        if len(cells) == 0:
+            continue
+        geometry = gpd.points_from_xy(cells.pop('x'), cells.pop('y'))
+        yield gpd.GeoDataFrame(cells, geometry=geometry, crs=crs)
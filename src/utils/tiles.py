@@ -0,0 +1,45 @@
+"""
+Kachelmathematik für Web Mercator (EPSG:3857) im XYZ-Schema
+
+Gemeinsam genutzt vom Vector-Tile-Export und vom Kachel-Cache der
+Hintergrundkarten.
+"""
+import math
+
+HALF_WORLD = 20037508.342789244
+
+
+def tile_size(z):
+    """Kantenlänge einer Kachel in Metern (Web Mercator)"""
+    return 2 * HALF_WORLD / 2 ** z
+
+
+def tile_bounds(z, x, y):
+    """(xmin, ymin, xmax, ymax) einer XYZ-Kachel in Web Mercator"""
+    size = tile_size(z)
+    xmin = -HALF_WORLD + x * size
+    ymax = HALF_WORLD - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def tiles_for_bounds(bounds, z):
+    """Alle Kacheln einer Zoomstufe, die bounds (Web Mercator) berühren"""
+    size = tile_size(z)
+    xmin, ymin, xmax, ymax = bounds
+    n = 2 ** z
+    x0 = max(0, int((xmin + HALF_WORLD) // size))
+    x1 = min(n - 1, int((xmax + HALF_WORLD) // size))
+    y0 = max(0, int((HALF_WORLD - ymax) // size))
+    y1 = min(n - 1, int((HALF_WORLD - ymin) // size))
+    return [(z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def children(tile):
+    z, x, y = tile
+    return [(z + 1, 2 * x + dx, 2 * y + dy) for dx in (0, 1) for dy in (0, 1)]
+
+
+def mercator_to_lonlat(x, y):
+    lon = x / HALF_WORLD * 180
+    lat = math.degrees(2 * math.atan(math.exp(y / HALF_WORLD * math.pi)) - math.pi / 2)
+    return lon, lat
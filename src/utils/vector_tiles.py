@@ -0,0 +1,214 @@
+"""
+Export von Layern als Mapbox-Vector-Tile-Pyramide (MVT)
+
+Die Layer werden einmal nach Web Mercator projiziert und pro Prozess in einen
+STRtree geladen. Für jede Kachel werden die Geometrien an der Kachel (plus
+Rand) zugeschnitten, passend zur Zoomstufe vereinfacht und mit
+mapbox_vector_tile kodiert. Pro Zoomstufe entfallen
+  - Layer unterhalb ihrer minzoom,
+  - Flächen, die kleiner als MIN_AREA_PX Pixel wären,
+  - Punkte über MAX_FEATURES_PER_TILE (die mit der höchsten Priorität bleiben).
+Kinder werden nur für Kacheln erzeugt, in denen überhaupt Daten liegen.
+Ausgabe als MBTiles (SQLite, gzip) oder als Verzeichnis z/x/y.pbf.
+"""
+import gzip
+import json
+import os
+import sqlite3
+
+import geopandas as gpd
+import mapbox_vector_tile
+import numpy as np
+import pandas as pd
+import shapely
+
+from utils.tiles import tile_bounds, tile_size
+
+MERCATOR_CRS = 3857
+EXTENT = 4096
+BUFFER_PX = 64
+SIMPLIFY_PX = 1.0
+MIN_AREA_PX = 4.0
+MAX_FEATURES_PER_TILE = 5000
+
+_layers = {}
+
+
+def prepare_layer(gdf, columns, priority=None, minzoom=0):
+    """Projiziert gdf nach Web Mercator und baut Index und Attribute für render_tile"""
+    columns = [col for col in columns if col in gdf.columns]
+    gdf = gdf[columns + [gdf.geometry.name]].to_crs(MERCATOR_CRS)
+    gdf = gdf[~gdf.geometry.is_empty & gdf.geometry.notna()].reset_index(drop=True)
+    geometry = np.asarray(gdf.geometry.values)
+    return {
+        'geometry': geometry,
+        'tree': shapely.STRtree(geometry),
+        'bounds': shapely.total_bounds(geometry),
+        'properties': gdf[columns].astype(object).where(gdf[columns].notna(), None)
+                                  .to_dict('records'),
+        'priority': (gdf[priority].fillna(0).to_numpy()
+                     if priority in gdf.columns else -np.arange(len(gdf), dtype=float)),
+        'minzoom': minzoom,
+        'fields': {col: 'Number' if pd.api.types.is_numeric_dtype(gdf[col]) else 'String'
+                   for col in columns},
+    }
+
+
+def load_layers(sources):
+    """
+    Lädt die Layer gemäss sources (Liste von Dicts mit 'name', 'layer' oder
+    'path', 'columns', optional 'minzoom' und 'priority') in Web Mercator
+    """
+    from utils.storage import layer_exists, read_layer
+
+    layers = {}
+    for source in sources:
+        if 'layer' in source:
+            # Optionale Layer (z.B. seasonal_pois ohne Saisonprofil) dürfen fehlen
+            if not layer_exists(source['layer']):
+                continue
+            gdf = read_layer(source['layer'], columns=source['columns'])
+        elif os.path.exists(source['path']):
+            gdf = gpd.read_file(source['path'])
+        else:
+            continue
+        layers[source['name']] = prepare_layer(gdf, source['columns'], source.get('priority'),
+                                               source.get('minzoom', 0))
+    return layers
+
+
+def init_worker(sources):
+    """Initialisierer für die Worker-Prozesse"""
+    _layers.clear()
+    _layers.update(load_layers(sources))
+
+
+def use_layers(layers):
+    """Setzt bereits vorbereitete Layer für render_tile im aktuellen Prozess"""
+    _layers.clear()
+    _layers.update(layers)
+
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def render_tile(tile):
+    """
+    Kodiert eine Kachel. Liefert (tile, mvt_bytes oder None, has_data);
+    has_data ist wahr, sobald irgendein Layer die Kachel berührt (auch
+    unterhalb seiner minzoom), damit die Kinder noch erzeugt werden.
+    """
+    z, x, y = tile
+    bounds = tile_bounds(z, x, y)
+    pixel = tile_size(z) / EXTENT
+    margin = BUFFER_PX * pixel
+    clip_box = (bounds[0] - margin, bounds[1] - margin, bounds[2] + margin, bounds[3] + margin)
+    query_box = shapely.box(*clip_box)
+
+    has_data = False
+    encoded_layers = []
+    for name, layer in _layers.items():
+        idx = layer['tree'].query(query_box, predicate='intersects')
+        if len(idx) == 0:
+            continue
+        has_data = True
+        if z < layer['minzoom']:
+            continue
+
+        geoms = layer['geometry'][idx]
+        type_id = shapely.get_type_id(geoms)
+        is_point = np.isin(type_id, [0, 4])
+        # Flächen und Linien, die auf dieser Zoomstufe kaum sichtbar wären, fallen weg
+        too_small = (np.isin(type_id, [3, 6]) & (shapely.area(geoms) < MIN_AREA_PX * pixel ** 2)) | \
+            (np.isin(type_id, [1, 2, 5]) & (shapely.length(geoms) < pixel))
+        idx, geoms, is_point = idx[~too_small], geoms[~too_small], is_point[~too_small]
+        if is_point.sum() > MAX_FEATURES_PER_TILE:
+            point_idx = idx[is_point]
+            top = point_idx[np.argsort(-layer['priority'][point_idx], kind='stable')]
+            dropped = np.isin(idx, top[MAX_FEATURES_PER_TILE:])
+            idx, geoms = idx[~dropped], geoms[~dropped]
+
+        geoms = shapely.clip_by_rect(geoms, *clip_box)
+        geoms = shapely.simplify(geoms, SIMPLIFY_PX * pixel, preserve_topology=True)
+        features = [
+            {'geometry': geom,
+             'properties': {k: _json_value(v) for k, v in layer['properties'][i].items()
+                            if v is not None}}
+            for i, geom in zip(idx, geoms) if not geom.is_empty
+        ]
+        if features:
+            encoded_layers.append({'name': name, 'features': features})
+
+    if not encoded_layers:
+        return tile, None, has_data
+    data = mapbox_vector_tile.encode(
+        encoded_layers,
+        default_options={'quantize_bounds': bounds, 'extents': EXTENT, 'y_coord_down': False},
+    )
+    return tile, data, has_data
+
+
+class MBTilesWriter:
+    """Schreibt Kacheln gzip-komprimiert in eine MBTiles-Datei (TMS-Zeilen)"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE metadata (name TEXT, value TEXT)')
+        self.db.execute('CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, '
+                        'tile_row INTEGER, tile_data BLOB)')
+        self.db.execute('CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)')
+
+    def write(self, tile, data):
+        z, x, y = tile
+        self.db.execute('INSERT INTO tiles VALUES (?, ?, ?, ?)',
+                        (z, x, 2 ** z - 1 - y, gzip.compress(data)))
+
+    def close(self, metadata):
+        self.db.executemany('INSERT INTO metadata VALUES (?, ?)', metadata.items())
+        self.db.commit()
+        self.db.close()
+
+
+class DirectoryWriter:
+    """Schreibt Kacheln als z/x/y.pbf (unkomprimiert) plus metadata.json"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, tile, data):
+        z, x, y = tile
+        tile_path = os.path.join(self.path, str(z), str(x), f'{y}.pbf')
+        os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+        with open(tile_path, 'wb') as f:
+            f.write(data)
+
+    def close(self, metadata):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, 'metadata.json'), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+
+def tileset_metadata(name, layers, bounds_lonlat, minzoom, maxzoom):
+    """Metadaten nach MBTiles-Spezifikation inkl. vector_layers"""
+    west, south, east, north = bounds_lonlat
+    vector_layers = [
+        {'id': layer_name, 'minzoom': max(minzoom, layer['minzoom']), 'maxzoom': maxzoom,
+         'fields': layer['fields']}
+        for layer_name, layer in layers.items()
+    ]
+    return {
+        'name': name,
+        'format': 'pbf',
+        'type': 'overlay',
+        'minzoom': str(minzoom),
+        'maxzoom': str(maxzoom),
+        'bounds': f'{west:.6f},{south:.6f},{east:.6f},{north:.6f}',
+        'center': f'{(west + east) / 2:.6f},{(south + north) / 2:.6f},{minzoom}',
+        'json': json.dumps({'vector_layers': vector_layers}),
+    }
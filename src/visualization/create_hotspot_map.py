@@ -1,18 +1,31 @@
 import geopandas as gpd
 import matplotlib.pyplot as plt
-import contextily as cx
+import argparse
 import os
+import sys
 import numpy as np
+from pyproj import Transformer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils import basemap
+from utils.instrumentation import phase
+from utils.raster import read_raster
+from utils.region import boundary_path, current_region, file_prefix
+from utils.storage import read_layer
+
+parser = argparse.ArgumentParser(description="Hotspot-Karte erstellen")
+parser.add_argument('--offline', action='store_true',
+                    help="Hintergrundkarte nur aus dem Kachel-Cache (cache/tiles)")
+args = parser.parse_args()
 
 # Daten laden
 print("Lade Daten für Hotspot-Map...")
-zurich_boundary = gpd.read_file('data/raw/zurich_boundary.geojson')
-hotspots = gpd.read_file('data/processed/hotspot_analysis.geojson')
-pois = gpd.read_file('data/processed/categorized_pois.geojson')
+zurich_boundary = gpd.read_file(boundary_path())
+hotspots = read_raster('hotspot_analysis')
+pois = read_layer('categorized_pois', columns=['category'])
 
 # Auf Web Mercator (EPSG:3857) umprojizieren für Hintergrundkarte
 zurich_boundary = zurich_boundary.to_crs(epsg=3857)
-hotspots = hotspots.to_crs(epsg=3857)
 pois = pois.to_crs(epsg=3857)
 
 # Plot erstellen
@@ -21,39 +34,15 @@ fig, ax = plt.subplots(figsize=(12, 10))
 # Hintergrundkarte und Grenzen hinzufügen
 zurich_boundary.plot(ax=ax, alpha=0.5, edgecolor='k')
 
-# Hotspots als Heatmap visualisieren
-# Punkte in ein Grid umwandeln
-from matplotlib.colors import LinearSegmentedColormap
-
-# Hotspot-Intensitäten in ein Grid umwandeln
-x = hotspots.geometry.x.values
-y = hotspots.geometry.y.values
-z = hotspots.density.values
+# Hotspots als Heatmap visualisieren: Zellmittelpunkte des Rasters direkt
+# nach Web Mercator umrechnen, eine Neu-Interpolation ist nicht nötig
+x_centers, y_centers = hotspots.centers()
+X, Y = np.meshgrid(x_centers, y_centers)
+transformer = Transformer.from_crs(hotspots.crs, 'EPSG:3857', always_xy=True)
+Xm, Ym = transformer.transform(X, Y)
+Z = np.asarray(hotspots.band('density'))
 
-# Konturplot erstellen
-try:
-    # Versuche mit matplotlib's griddata
-    from matplotlib.tri import Triangulation, LinearTriInterpolator
-    
-    triang = Triangulation(x, y)
-    interpolator = LinearTriInterpolator(triang, z)
-    
-    # Neues Grid erstellen
-    xi = np.linspace(min(x), max(x), 100)
-    yi = np.linspace(min(y), max(y), 100)
-    Xi, Yi = np.meshgrid(xi, yi)
-    
-    # Interpolieren
-    zi = interpolator(Xi, Yi)
-    
-    # Hotspot-Karte erstellen
-    contour = ax.contourf(Xi, Yi, zi, levels=15, cmap='hot_r', alpha=0.7)
-except Exception as e:
-    print(f"Konturplot konnte nicht erstellt werden: {e}")
-    print("Erstelle stattdessen Scatterplot...")
-    # Fallback: Scatter Plot
-    scatter = ax.scatter(x, y, c=z, cmap='hot_r', alpha=0.7, s=50)
-    plt.colorbar(scatter, ax=ax, label='Dichte')
+contour = ax.contourf(Xm, Ym, Z, levels=15, cmap='hot_r', alpha=0.7)
 
 # POIs nach Kategorie hinzufügen
 categories = pois['category'].unique()
@@ -64,19 +53,21 @@ for category in categories:
 # Legende hinzufügen
 ax.legend(title='Kategorien', loc='upper right')
 
-# Hintergrundkarte hinzufügen
-try:
-    cx.add_basemap(ax, source=cx.providers.CartoDB.Positron)
-except Exception as e:
-    print(f"Hintergrundkarte konnte nicht hinzugefügt werden: {e}")
+# Hintergrundkarte hinzufügen: gleicher Ausschnitt und gleiche Zoomstufe wie
+# seed_basemap.py, damit --offline mit den vorab geladenen Kacheln auskommt
+bounds = basemap.map_bounds(zurich_boundary.total_bounds)
+ax.set_xlim(bounds[0], bounds[2])
+ax.set_ylim(bounds[1], bounds[3])
+basemap.add_basemap(ax, zoom=basemap.auto_zoom(bounds), offline=args.offline)
 
 # Layout und Titel
-plt.title('Touristische Hotspots in Zürich', fontsize=16)
+plt.title(f"Touristische Hotspots in {current_region()['name']}", fontsize=16)
 plt.tight_layout()
 
 # Speichern
 output_dir = 'results/maps'
 os.makedirs(output_dir, exist_ok=True)
-plt.savefig(f'{output_dir}/zurich_hotspots.png', dpi=300)
-print(f"Hotspot-Karte gespeichert unter: {output_dir}/zurich_hotspots.png")
+with phase('write_map'):
+    plt.savefig(f'{output_dir}/{file_prefix()}_hotspots.png', dpi=300)
+print(f"Hotspot-Karte gespeichert unter: {output_dir}/{file_prefix()}_hotspots.png")
 plt.close()
\ No newline at end of file
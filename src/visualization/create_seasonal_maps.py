@@ -1,92 +1,133 @@
 import geopandas as gpd
-import matplotlib.pyplot as plt
-import contextily as cx
+import argparse
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-# Daten laden
-print("Lade Daten für saisonale Karten...")
-try:
-    zurich_boundary = gpd.read_file('data/raw/zurich_boundary.geojson').to_crs(epsg=3857)
-    print("Zürich-Grenzen geladen")
-except Exception as e:
-    print(f"Fehler beim Laden der Zürich-Grenzen: {e}")
-    # Erstelle einen leeren GeoDataFrame als Fallback
-    zurich_boundary = gpd.GeoDataFrame()
-
-try:
-    seasonal_pois = gpd.read_file('data/processed/seasonal_pois.geojson').to_crs(epsg=3857)
-    print(f"Saisonale POIs geladen: {len(seasonal_pois)}")
-except Exception as e:
-    print(f"Fehler beim Laden der saisonalen POIs: {e}")
-    print("Beende Skript, da saisonale Daten fehlen.")
-    exit(1)
-
-# Prüfen, ob die erwarteten Spalten vorhanden sind
-required_columns = ['weight_sommer', 'weight_winter', 'category']
-missing_columns = [col for col in required_columns if col not in seasonal_pois.columns]
-
-if missing_columns:
-    print(f"Fehlende Spalten in den saisonalen Daten: {missing_columns}")
-    print("Verfügbare Spalten:", seasonal_pois.columns.tolist())
-    # Erstelle Dummy-Spalten für fehlende Spalten
-    for col in missing_columns:
-        if col.startswith('weight_'):
-            seasonal_pois[col] = 0.5  # Standardgewicht
-        else:
-            seasonal_pois[col] = 'Unknown'  # Standardkategorie
-    print("Dummy-Spalten wurden erstellt.")
-
-# Saisonale Karten erstellen
-seasons = ['sommer', 'winter']
-print("Erstelle saisonale Karten...")
-
-for season in seasons:
-    print(f"Erstelle Karte für {season.capitalize()}...")
-    fig, ax = plt.subplots(figsize=(12, 10))
-    
-    # Hintergrund und Grenzen
-    if not zurich_boundary.empty:
-        zurich_boundary.plot(ax=ax, alpha=0.5, edgecolor='k')
-    
-    # POIs mit saisonaler Gewichtung
-    weight_col = f'weight_{season}'
-    
-    # Sicherstellen, dass die Spalte existiert und numerisch ist
-    if weight_col in seasonal_pois.columns and seasonal_pois[weight_col].dtype in ['float64', 'int64']:
-        # Erstelle ein neues GeoDataFrame mit nur validen Geometrien
-        valid_pois = seasonal_pois[seasonal_pois.geometry.is_valid]
-        
-        # Plotte die POIs
-        valid_pois.plot(
-            ax=ax,
-            column=weight_col,
-            cmap='viridis',
-            markersize=valid_pois[weight_col] * 100,  # Größe proportional zur Gewichtung
-            legend=True,
-            legend_kwds={'label': f'Besucheranteil {season.capitalize()}'},
-            alpha=0.7
-        )
-    else:
-        print(f"Warnung: Spalte '{weight_col}' nicht verfügbar oder nicht numerisch.")
-        # Plotte einfache Punkte ohne Farbcodierung
-        seasonal_pois.plot(ax=ax, alpha=0.7)
-    
-    # Basemap hinzufügen
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils import basemap
+from utils.instrumentation import phase
+from utils.map_render import init_worker, render_weight_map
+from utils.region import boundary_path, current_region, file_prefix
+from utils.seasonal import MONTHS, month_column
+from utils.storage import read_layer
+
+MONTH_NAMES = ['Januar', 'Februar', 'März', 'April', 'Mai', 'Juni', 'Juli',
+               'August', 'September', 'Oktober', 'November', 'Dezember']
+
+
+def load_layers():
+    """Lädt Grenze und saisonale POIs einmal und projiziert sie nach Web Mercator"""
+    print("Lade Daten für saisonale Karten...")
     try:
-        cx.add_basemap(ax, source=cx.providers.CartoDB.Positron)
+        zurich_boundary = gpd.read_file(boundary_path()).to_crs(epsg=3857)
+        print("Stadtgrenzen geladen")
     except Exception as e:
-        print(f"Hintergrundkarte konnte nicht hinzugefügt werden: {e}")
-    
-    # Titel und Layout
-    plt.title(f'Touristische Aktivität in Zürich - {season.capitalize()}', fontsize=16)
-    plt.tight_layout()
-    
-    # Speichern
+        print(f"Fehler beim Laden der Stadtgrenzen: {e}")
+        zurich_boundary = None
+
+    try:
+        seasonal_pois = read_layer('seasonal_pois', columns=['category', 'weight_*']).to_crs(epsg=3857)
+        print(f"Saisonale POIs geladen: {len(seasonal_pois)}")
+    except Exception as e:
+        print(f"Fehler beim Laden der saisonalen POIs: {e}")
+        print("Beende Skript, da saisonale Daten fehlen.")
+        sys.exit(1)
+
+    # Prüfen, ob die erwarteten Spalten vorhanden sind
+    required_columns = ['weight_sommer', 'weight_winter', 'category']
+    missing_columns = [col for col in required_columns if col not in seasonal_pois.columns]
+    if missing_columns:
+        print(f"Fehlende Spalten in den saisonalen Daten: {missing_columns}")
+        print("Verfügbare Spalten:", seasonal_pois.columns.tolist())
+        # Erstelle Dummy-Spalten für fehlende Spalten
+        for col in missing_columns:
+            if col.startswith('weight_'):
+                seasonal_pois[col] = 0.5  # Standardgewicht
+            else:
+                seasonal_pois[col] = 'Unknown'  # Standardkategorie
+        print("Dummy-Spalten wurden erstellt.")
+
+    # Nur valide Geometrien zeichnen
+    seasonal_pois = seasonal_pois[seasonal_pois.geometry.is_valid]
+    return {'boundary': zurich_boundary, 'pois': seasonal_pois}
+
+
+def map_specs(pois, output_dir, dpi, months=False, categories=False, region_name='Zürich',
+              prefix='zurich'):
+    """Liste der zu zeichnenden Karten"""
+    seasons = ['sommer', 'winter'] + [s for s in ['fruehling', 'herbst']
+                                      if f'weight_{s}' in pois.columns]
+    specs = []
+    for season in seasons:
+        specs.append({
+            'column': f'weight_{season}',
+            'title': f'Touristische Aktivität in {region_name} - {season.capitalize()}',
+            'label': f'Besucheranteil {season.capitalize()}',
+            'output': f'{output_dir}/{prefix}_tourism_{season}.png',
+            'dpi': dpi,
+        })
+        if categories:
+            for category in sorted(pois['category'].dropna().unique()):
+                specs.append({
+                    'column': f'weight_{season}',
+                    'category': category,
+                    'title': f'{category} in {region_name} - {season.capitalize()}',
+                    'label': f'Besucheranteil {season.capitalize()}',
+                    'output': f'{output_dir}/categories/{prefix}_{category.lower()}_{season}.png',
+                    'dpi': dpi,
+                })
+    if months:
+        for month in MONTHS:
+            column = month_column(month)
+            if column not in pois.columns:
+                continue
+            specs.append({
+                'column': column,
+                'title': f'Touristische Aktivität in {region_name} - {MONTH_NAMES[month - 1]}',
+                'label': f'Besucheranteil {MONTH_NAMES[month - 1]}',
+                'output': f'{output_dir}/months/{prefix}_tourism_{month:02d}.png',
+                'dpi': dpi,
+            })
+    return specs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Saisonale Karten parallel erzeugen")
+    parser.add_argument('--months', action='store_true', help="Zusätzlich eine Karte pro Monat")
+    parser.add_argument('--categories', action='store_true',
+                        help="Zusätzlich eine Karte pro Saison und Kategorie")
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--processes', type=int, default=None, help="Anzahl Worker-Prozesse")
+    parser.add_argument('--offline', action='store_true',
+                        help="Hintergrundkarte nur aus dem Kachel-Cache (cache/tiles)")
+    args = parser.parse_args()
+
+    layers = load_layers()
     output_dir = 'results/maps'
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = f'{output_dir}/zurich_tourism_{season}.png'
-    plt.savefig(output_path, dpi=300)
-    print(f"Karte für {season} gespeichert unter: {output_path}")
-    plt.close()
+    specs = map_specs(layers['pois'], output_dir, args.dpi, args.months, args.categories,
+                      region_name=current_region()['name'], prefix=file_prefix())
+
+    # Hintergrundkacheln einmal für alle Karten laden (mit Rand für die Achsen)
+    extent_layer = layers['boundary'] if layers['boundary'] is not None else layers['pois']
+    bounds = basemap.map_bounds(extent_layer.total_bounds)
+    zoom = basemap.auto_zoom(bounds)
+    if not args.offline:
+        available, missing = basemap.seed(bounds, [zoom])
+        print(f"Hintergrundkacheln: {available} im Cache, {missing} nicht verfügbar (Zoom {zoom})")
+
+    print(f"Erstelle {len(specs)} saisonale Karten...")
+    with phase('render_maps', rows_in=len(specs)) as record, \
+            ProcessPoolExecutor(max_workers=args.processes, initializer=init_worker,
+                                initargs=(layers, zoom, args.offline)) as pool:
+        record.rows_out = 0
+        for output_path, missing in pool.map(render_weight_map, specs):
+            note = f" (ohne {missing} Hintergrundkacheln)" if missing else ""
+            print(f"Karte gespeichert unter: {output_path}{note}")
+            record.rows_out += 1
+
+    print("Saisonale Karten wurden erstellt.")
+
 
-print("Saisonale Karten wurden erstellt.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Export der Analyseergebnisse als Vector-Tile-Pyramide für das Web-Frontend
+#
+#   python src/visualization/export_vector_tiles.py                 # MBTiles
+#   python src/visualization/export_vector_tiles.py --format dir    # z/x/y.pbf
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.instrumentation import phase
+from utils.region import current_region, file_prefix
+from utils.tiles import children, mercator_to_lonlat, tiles_for_bounds
+from utils.vector_tiles import (DirectoryWriter, MBTilesWriter, init_worker, load_layers,
+                                render_tile, tileset_metadata)
+
+# Layer der Kacheln: Quelle, übernommene Attribute, ab welcher Zoomstufe sichtbar
+# und nach welcher Spalte Punkte bei zu vielen Objekten pro Kachel ausgewählt werden
+SOURCES = [
+    {'name': 'potential_areas', 'layer': 'high_potential_areas',
+     'columns': ['grid_id', 'potential', 'poi_count', 'hotspot_value'], 'minzoom': 8,
+     'priority': 'potential'},
+    {'name': 'isochrones', 'path': 'data/processed/isochrones.geojson',
+     'columns': ['category', 'poi_name', 'time'], 'minzoom': 11},
+    {'name': 'pois', 'layer': 'categorized_pois',
+     'columns': ['name', 'category'], 'minzoom': 12},
+    {'name': 'seasonal_pois', 'layer': 'seasonal_pois',
+     'columns': ['name', 'category', 'weight_sommer', 'weight_winter'], 'minzoom': 10,
+     'priority': 'weight_sommer'},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector Tiles (MVT) aus den Analyseergebnissen erzeugen")
+    parser.add_argument('--format', choices=['mbtiles', 'dir'], default='mbtiles')
+    parser.add_argument('--output', default=None,
+                        help="Zieldatei bzw. -ordner (Standard: results/tiles/<präfix>.mbtiles bzw. results/tiles/<präfix>)")
+    parser.add_argument('--minzoom', type=int, default=8)
+    parser.add_argument('--maxzoom', type=int, default=16)
+    parser.add_argument('--processes', type=int, default=None, help="Anzahl Worker-Prozesse")
+    args = parser.parse_args()
+
+    prefix = file_prefix()
+    output = args.output or (f'results/tiles/{prefix}.mbtiles' if args.format == 'mbtiles'
+                             else f'results/tiles/{prefix}')
+
+    print("Lade Layer für Vector Tiles...")
+    layers = load_layers(SOURCES)
+    if not layers:
+        print("Keine Layer gefunden. Bitte zuerst die Analysen ausführen.")
+        sys.exit(1)
+    for name, layer in layers.items():
+        print(f"  {name}: {len(layer['geometry'])} Objekte")
+
+    all_bounds = np.array([layer['bounds'] for layer in layers.values()])
+    bounds = (np.nanmin(all_bounds[:, 0]), np.nanmin(all_bounds[:, 1]),
+              np.nanmax(all_bounds[:, 2]), np.nanmax(all_bounds[:, 3]))
+    west, south = mercator_to_lonlat(bounds[0], bounds[1])
+    east, north = mercator_to_lonlat(bounds[2], bounds[3])
+
+    writer = MBTilesWriter(output) if args.format == 'mbtiles' else DirectoryWriter(output)
+
+    # Zoomstufe für Zoomstufe; Kinder nur unter Kacheln, in denen Daten liegen
+    tiles = tiles_for_bounds(bounds, args.minzoom)
+    n_written = 0
+    with ProcessPoolExecutor(max_workers=args.processes, initializer=init_worker,
+                             initargs=(SOURCES,)) as pool:
+        for z in range(args.minzoom, args.maxzoom + 1):
+            next_tiles = []
+            count = 0
+            chunksize = max(1, len(tiles) // (4 * (args.processes or os.cpu_count() or 1)))
+            with phase(f'tiles:z{z}', rows_in=len(tiles)) as record:
+                for tile, data, has_data in pool.map(render_tile, tiles, chunksize=chunksize):
+                    if data is not None:
+                        writer.write(tile, data)
+                        count += 1
+                    if has_data and z < args.maxzoom:
+                        next_tiles.extend(children(tile))
+                record.rows_out = count
+            print(f"Zoomstufe {z}: {count} Kacheln ({len(tiles)} geprüft)")
+            n_written += count
+            tiles = next_tiles
+
+    writer.close(tileset_metadata(f"{current_region()['name']} Geo-Marketing", layers, (west, south, east, north),
+                                  args.minzoom, args.maxzoom))
+    print(f"{n_written} Vector Tiles gespeichert unter: {output}")
+
+
+if __name__ == "__main__":
+    main()